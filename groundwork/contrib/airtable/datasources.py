@@ -1,14 +1,93 @@
-from typing import Any, Dict, Iterable, Optional, TypeVar
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
 
 import dataclasses
+import queue
+import threading
+import time
 
+import requests
 from django.conf import settings
 from rest_framework_dataclasses.field_utils import get_type_info
 
+from groundwork.core import metrics
 from groundwork.core.datasources import RestDatasource
+from groundwork.core.metrics import SyncSummary
 
 ResourceT = TypeVar("ResourceT")
 
+MAX_PAGE_SIZE = 100
+"""
+Maximum number of records Airtable returns in a page.
+"""
+
+MAX_RECORDS_PER_WRITE = 10
+"""
+Maximum number of records Airtable accepts in a single create or update request.
+"""
+
+MAX_MERGE_FIELDS = 3
+"""
+Maximum number of fields Airtable accepts to match records on when upserting.
+"""
+
+
+class RateLimiter:
+    """
+    Spaces out requests so that no more than a fixed number are made per second. Thread-safe.
+    """
+
+    def __init__(self, requests_per_second: float) -> None:
+        self.interval = 1 / requests_per_second
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self) -> None:
+        """
+        Block until another request can be made.
+        """
+
+        with self.lock:
+            now = time.monotonic()
+            scheduled = max(now, self.next_time)
+            self.next_time = scheduled + self.interval
+
+        if scheduled > now:
+            time.sleep(scheduled - now)
+
+
+_rate_limiters: Dict[str, RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(base_id: str, requests_per_second: float) -> RateLimiter:
+    """
+    Return the rate limiter shared by every datasource in the current process that uses an Airtable base.
+
+    Args:
+        base_id: ID of the Airtable base.
+        requests_per_second: Rate limit to use if this is the first datasource for the base.
+
+    Returns:
+        The base's rate limiter.
+    """
+
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(base_id)
+        if limiter is None:
+            limiter = _rate_limiters[base_id] = RateLimiter(requests_per_second)
+
+        return limiter
+
 
 def airtable_field(name: str, **kwargs: Dict[str, Any]) -> dataclasses.Field:
     """
@@ -49,6 +128,49 @@ def airtable_field(name: str, **kwargs: Dict[str, Any]) -> dataclasses.Field:
     return dataclasses.field(metadata=metadata, **kwargs)
 
 
+@dataclasses.dataclass
+class AirtableWriteFailure:
+    """
+    A batch of records that Airtable failed to write.
+    """
+
+    resources: List[Any]
+    """
+    The resources in the batch. Airtable rejects the whole batch if any record in it is invalid.
+    """
+
+    error: Exception
+    """
+    The error raised while writing the batch, such as an `OSError` for a rejected request.
+    """
+
+
+@dataclasses.dataclass
+class AirtableWriteResult:
+    """
+    Outcome of writing resources to Airtable in batches. Batches that fail don't stop later batches being written.
+    """
+
+    created: List[str] = dataclasses.field(default_factory=list)
+    """
+    IDs of the records created, in the order of the resources written.
+    """
+
+    updated: List[str] = dataclasses.field(default_factory=list)
+    """
+    IDs of the records updated, in the order of the resources written.
+    """
+
+    failed: List[AirtableWriteFailure] = dataclasses.field(default_factory=list)
+    """
+    Batches that couldn't be written.
+    """
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed
+
+
 class AirtableDatasource(RestDatasource[ResourceT]):
     """
     Base class for implementing clients to Airtable bases and converting their responses to resource objects.
@@ -87,6 +209,18 @@ class AirtableDatasource(RestDatasource[ResourceT]):
     )
     ```
 
+    Requests to each base are rate limited to Airtable's limit of 5 per second. To overlap fetching with syncing on
+    large tables, pass `prefetch` to fetch pages in the background.
+
+    Local changes can be written back to Airtable in batches with `create_many()`, `update_many()` and
+    `upsert_many()`:
+
+    ```python
+    result = my_datasource.upsert_many(people, merge_on=["first_name", "last_name"])
+    for failure in result.failed:
+        logging.error("Failed to write %d people: %s", len(failure.resources), failure.error)
+    ```
+
     As with other datasource types, configuration can all either be provided as keyword-args to the constructor, or
     overridden in subclasses.
     """
@@ -109,6 +243,30 @@ class AirtableDatasource(RestDatasource[ResourceT]):
     Name of the table to fetch from.
     """
 
+    project_fields: bool = True
+    """
+    Only fetch the columns mapped onto fields of the resource type, using the `fields[]` query parameter. Disable this
+    if you override `deserialize` to read other columns.
+    """
+
+    page_size: Optional[int] = None
+    """
+    Number of records to fetch in each page, up to `MAX_PAGE_SIZE`. Defaults to Airtable's default, which is the
+    maximum.
+    """
+
+    prefetch: int = 0
+    """
+    Number of pages to fetch in the background while earlier pages are processed. By default, each page is only
+    fetched once the previous page has been processed.
+    """
+
+    requests_per_second: float = 5
+    """
+    Maximum rate of requests to the base, shared by every datasource in the process that uses the same base. Airtable
+    allows 5 requests per second for each base.
+    """
+
     def __init__(self, resource_type: ResourceT, base=None, table=None, **kwargs):
         super().__init__(resource_type=resource_type, **kwargs)
 
@@ -120,7 +278,74 @@ class AirtableDatasource(RestDatasource[ResourceT]):
         if not hasattr(self, "api_key"):
             self.api_key = getattr(settings, "AIRTABLE_API_KEY", None)
 
+        if self.page_size is not None and not 1 <= self.page_size <= MAX_PAGE_SIZE:
+            raise ValueError(f"page_size must be between 1 and {MAX_PAGE_SIZE}")
+
+        self.field_plan = self.get_field_plan()
+        self.columns = [
+            (self._get_mapped_field_name(field), field.name)
+            for field in dataclasses.fields(self.resource_type)
+            # The id field holds the record id rather than a column, unless it is explicitly mapped
+            if field.name != "id" or __name__ in field.metadata
+        ]
+        self.rate_limiter = get_rate_limiter(
+            self.base_id or self.path.split("/")[1], self.requests_per_second
+        )
+
+    def get(self, id: str, **kwargs: Dict[str, Any]) -> ResourceT:
+        return super().get(id, **self.get_query(kwargs))
+
+    def list(self, **kwargs: Dict[str, Any]) -> Iterable[ResourceT]:
+        return super().list(**self.get_query(kwargs))
+
+    def get_query(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Add the `fields[]` parameter to a query, if `project_fields` is enabled and the query doesn't already select
+        fields.
+
+        Args:
+            query: Query params passed to the API call.
+
+        Returns:
+            The query params to send.
+        """
+
+        if not self.project_fields or "fields[]" in query:
+            return query
+
+        return {**query, "fields[]": self.get_field_names()}
+
+    def get_field_names(self) -> List[str]:
+        """
+        Returns:
+            The Airtable column names mapped onto fields of the resource type.
+        """
+
+        return [column for column, _ in self.columns]
+
     def paginate(self, **query: Dict[str, Any]) -> Iterable[ResourceT]:
+        if self.page_size is not None:
+            query["pageSize"] = self.page_size
+
+        pages = (
+            self.fetch_pages(query)
+            if self.prefetch <= 0
+            else self.prefetch_pages(query)
+        )
+        for page in pages:
+            yield from page["records"]
+
+    def fetch_pages(self, query: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        Fetch each page of a list query in turn.
+
+        Args:
+            query: Query params passed to the API call.
+
+        Yields:
+            Raw response data for each page.
+        """
+
         offset = None
 
         while True:
@@ -128,22 +353,287 @@ class AirtableDatasource(RestDatasource[ResourceT]):
                 query["offset"] = offset
             data = self.fetch_url(self.url, query)
 
-            yield from data["records"]
+            yield data
 
             offset = data.get("offset")
             if offset is None:
                 return
 
+    def prefetch_pages(self, query: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        Fetch the pages of a list query on a background thread, up to `prefetch` pages ahead of the consumer.
+
+        Counters recorded while fetching, such as `pages_fetched`, are added to the consumer's metrics. Time spent
+        waiting for a page is recorded as the `fetch` phase.
+
+        Args:
+            query: Query params passed to the API call.
+
+        Yields:
+            Raw response data for each page.
+        """
+
+        pages: "queue.Queue[Any]" = queue.Queue(maxsize=self.prefetch)
+        stopped = threading.Event()
+
+        def put(item: Any) -> None:
+            while not stopped.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+
+        def produce() -> None:
+            try:
+                fetched = self.fetch_pages(query)
+
+                while not stopped.is_set():
+                    summary = SyncSummary(model=self.url)
+                    with metrics.recording(summary):
+                        page = next(fetched, None)
+
+                    if page is None:
+                        break
+
+                    put((page, summary))
+
+                put(None)
+            except Exception as e:
+                put(e)
+
+        thread = threading.Thread(
+            target=produce, name="groundwork-airtable-prefetch", daemon=True
+        )
+        thread.start()
+
+        try:
+            while True:
+                with metrics.phase("fetch"):
+                    item = pages.get()
+
+                if item is None:
+                    return
+
+                if isinstance(item, Exception):
+                    raise item
+
+                page, summary = item
+                for key, value in summary.counters.items():
+                    metrics.incr(key, value)
+
+                yield page
+        finally:
+            stopped.set()
+
+    def fetch_url(self, url: str, query: Dict[str, Any]) -> Any:
+        self.rate_limiter.wait()
+        return super().fetch_url(url, query)
+
     def deserialize(self, data: Dict[str, Any]) -> ResourceT:
-        field_data = data["fields"]
+        with metrics.phase("deserialize"):
+            field_data = data["fields"]
 
-        mapped_data = {
-            field.name: self._get_mapped_field_value(field, field_data)
-            for field in dataclasses.fields(self.resource_type)
+            mapped_data = {
+                name: field_data[column] if column in field_data else get_default()
+                for column, name, get_default in self.field_plan
+            }
+            mapped_data["id"] = data["id"]
+
+            return super().deserialize(mapped_data)
+
+    def serialize(
+        self, resource: ResourceT, fields: Optional[Iterable[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Convert a resource into the field values of an Airtable record, using the same mapping as `deserialize`.
+
+        Args:
+            resource: The resource to convert.
+            fields: Names of the resource fields to include. Defaults to every field mapped onto a column.
+
+        Returns:
+            Field values keyed by Airtable column name.
+        """
+
+        data = self.serializer_class(resource).data
+        included = None if fields is None else set(fields)
+
+        return {
+            column: data[name]
+            for column, name in self.columns
+            if included is None or name in included
         }
-        mapped_data["id"] = data["id"]
 
-        return super().deserialize(mapped_data)
+    def create_many(
+        self,
+        resources: Iterable[ResourceT],
+        fields: Optional[Iterable[str]] = None,
+        typecast: bool = False,
+    ) -> AirtableWriteResult:
+        """
+        Create a record for each resource, in batches of `MAX_RECORDS_PER_WRITE`.
+
+        Args:
+            resources: The resources to create records for.
+            fields: Names of the resource fields to write. Defaults to every field mapped onto a column.
+            typecast: Ask Airtable to convert values to the column types, for example creating new select options.
+
+        Returns:
+            The IDs of the created records, and any batches that failed.
+        """
+
+        return self._write_many(
+            "POST",
+            resources,
+            lambda resource: {"fields": self.serialize(resource, fields)},
+            {"typecast": typecast},
+        )
+
+    def update_many(
+        self,
+        resources: Iterable[ResourceT],
+        fields: Optional[Iterable[str]] = None,
+        typecast: bool = False,
+    ) -> AirtableWriteResult:
+        """
+        Update the record with the id of each resource, in batches of `MAX_RECORDS_PER_WRITE`. Columns that aren't
+        written are left unchanged.
+
+        Args:
+            resources: The resources to update records from.
+            fields: Names of the resource fields to write. Defaults to every field mapped onto a column.
+            typecast: Ask Airtable to convert values to the column types, for example creating new select options.
+
+        Returns:
+            The IDs of the updated records, and any batches that failed.
+        """
+
+        return self._write_many(
+            "PATCH",
+            resources,
+            lambda resource: {
+                "id": self.get_id(resource),
+                "fields": self.serialize(resource, fields),
+            },
+            {"typecast": typecast},
+        )
+
+    def upsert_many(
+        self,
+        resources: Iterable[ResourceT],
+        merge_on: Iterable[str],
+        fields: Optional[Iterable[str]] = None,
+        typecast: bool = False,
+    ) -> AirtableWriteResult:
+        """
+        Update the record matching each resource, or create one if there isn't a match, in batches of
+        `MAX_RECORDS_PER_WRITE`.
+
+        Args:
+            resources: The resources to write.
+            merge_on: Names of the resource fields used to match resources to existing records. Between 1 and
+                `MAX_MERGE_FIELDS` fields, which must be written.
+            fields: Names of the resource fields to write. Defaults to every field mapped onto a column.
+            typecast: Ask Airtable to convert values to the column types, for example creating new select options.
+
+        Raises:
+            ValueError: If `merge_on` is empty, has too many fields, or names a field that isn't written.
+
+        Returns:
+            The IDs of the created and updated records, and any batches that failed.
+        """
+
+        merge_on = list(merge_on)
+        fields = None if fields is None else list(fields)
+        columns = {name: column for column, name in self.columns}
+
+        if not 1 <= len(merge_on) <= MAX_MERGE_FIELDS:
+            raise ValueError(
+                f"Expected 1 to {MAX_MERGE_FIELDS} fields to merge on, got {len(merge_on)}"
+            )
+
+        for name in merge_on:
+            if name not in columns:
+                raise ValueError(f"Can't merge on {name}: not mapped onto a column")
+
+            if fields is not None and name not in fields:
+                raise ValueError(f"Can't merge on {name}: not in the fields written")
+
+        return self._write_many(
+            "PATCH",
+            resources,
+            lambda resource: {"fields": self.serialize(resource, fields)},
+            {
+                "typecast": typecast,
+                "performUpsert": {
+                    "fieldsToMergeOn": [columns[name] for name in merge_on]
+                },
+            },
+        )
+
+    def _write_many(
+        self,
+        method: str,
+        resources: Iterable[ResourceT],
+        get_record: Callable[[ResourceT], Dict[str, Any]],
+        options: Dict[str, Any],
+    ) -> AirtableWriteResult:
+        result = AirtableWriteResult()
+        resources = list(resources)
+
+        for i in range(0, len(resources), MAX_RECORDS_PER_WRITE):
+            batch = resources[i : i + MAX_RECORDS_PER_WRITE]
+
+            # Any error only fails its own batch, so that the results of batches already written aren't lost
+            try:
+                data = self.send(
+                    method,
+                    self.url,
+                    {"records": [get_record(x) for x in batch], **options},
+                )
+
+                created: List[str] = []
+                updated: List[str] = []
+                if "performUpsert" in options:
+                    created = data.get("createdRecords", [])
+                    updated = data.get("updatedRecords", [])
+                elif method == "POST":
+                    created = [record["id"] for record in data["records"]]
+                else:
+                    updated = [record["id"] for record in data["records"]]
+            except Exception as e:
+                result.failed.append(AirtableWriteFailure(batch, e))
+                continue
+
+            result.created.extend(created)
+            result.updated.extend(updated)
+
+        return result
+
+    def send(self, method: str, url: str, body: Dict[str, Any]) -> Any:
+        """
+        Send a JSON request to Airtable, subject to the base's rate limit.
+
+        Args:
+            method: HTTP method.
+            url: URL to send the request to.
+            body: JSON request body.
+
+        Raises:
+            OSError: If the server response does not have a 2xx status code.
+
+        Returns:
+            The parsed JSON response.
+        """
+
+        self.rate_limiter.wait()
+        res = requests.request(method, url, json=body, headers=self.get_headers())
+
+        if not res.ok:
+            raise OSError(f"{url}: http {res.status_code}: {res.text}")
+
+        return res.json()
 
     def get_headers(self) -> Dict[str, str]:
         headers = {}
@@ -169,38 +659,49 @@ class AirtableDatasource(RestDatasource[ResourceT]):
 
         return field.metadata[__name__]["airtable_field"]
 
-    def _get_mapped_field_value(
-        self, field: dataclasses.Field, data: Dict[str, Any]
-    ) -> Any:
+    def get_field_plan(self) -> List[Tuple[str, str, Callable[[], Any]]]:
+        """
+        Work out how to map Airtable columns onto fields of the resource type. Called once, when the datasource is
+        created, so that deserializing each record doesn't need to introspect the resource type.
+
+        Returns:
+            The Airtable column name, resource field name and a function returning the value to use if the column is
+            missing, for each field of the resource type.
+        """
+
+        return [
+            (
+                self._get_mapped_field_name(field),
+                field.name,
+                self._get_missing_value_factory(field),
+            )
+            for field in dataclasses.fields(self.resource_type)
+        ]
+
+    def _get_missing_value_factory(self, field: dataclasses.Field) -> Callable[[], Any]:
         """
         Handle the fact that Airtable omits fields for 'falsy' values. Use the field metadata to determine if we have
-        a type supporting a 'falsy' value and return it if missing from the airtable response.
+        a type supporting a 'falsy' value, to substitute for the value if it is missing from the Airtable response.
 
         Args:
             field: Dataclass field descriptor for the resource field.
-            data: The raw json object containing field values returned by Airtable.
 
         Returns:
-            The value in `data` identified by `field`, with the appropriate 'falsy' value substituted for missing values
-            if relevant to the field type.
+            A function returning the appropriate 'falsy' value for the field type, or `None` if there isn't one.
         """
 
-        mapped_name = self._get_mapped_field_name(field)
-        if mapped_name in data:
-            return data[mapped_name]
-
         type_info = get_type_info(field.type)
 
         if type_info.base_type == bool:
-            return False
+            return bool
 
         if type_info.base_type == str:
-            return ""
+            return str
 
         if type_info.is_mapping:
-            return {}
+            return dict
 
         if type_info.is_many:
-            return []
+            return list
 
-        return None
+        return type(None)
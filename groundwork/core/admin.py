@@ -0,0 +1,43 @@
+from datetime import timedelta
+
+from django.contrib import admin
+from django.utils import timezone
+
+from groundwork.core.internal.cron_report import get_cron_reports
+from groundwork.core.models import CronTaskRun, CronTaskState
+
+
+@admin.register(CronTaskState)
+class CronTaskStateAdmin(admin.ModelAdmin):
+    list_display = ("name", "last_run", "next_run")
+    search_fields = ("name",)
+
+
+@admin.register(CronTaskRun)
+class CronTaskRunAdmin(admin.ModelAdmin):
+    """
+    Lists cron task runs, with a summary of durations, overruns and a timeline of recent runs for each task.
+    """
+
+    list_display = ("task_name", "start_time", "duration", "lag", "outcome")
+    list_filter = ("outcome", "task_name")
+    date_hierarchy = "start_time"
+    search_fields = ("task_name",)
+    readonly_fields = [field.name for field in CronTaskRun._meta.fields]
+
+    summary_period = timedelta(days=7)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {
+            **(extra_context or {}),
+            "cron_reports": get_cron_reports(timezone.now() - self.summary_period),
+            "summary_period": self.summary_period,
+        }
+
+        return super().changelist_view(request, extra_context=extra_context)
@@ -0,0 +1,377 @@
+"""
+Harness for measuring sync throughput against synthetic datasources, without hitting live APIs.
+
+Synthetic resources are generated by introspecting the model being synced, along with any `SyncedModel`s it
+references. This is what the `benchmark_sync` management command uses:
+
+```bash
+python manage.py benchmark_sync test.SomeSyncedModel --resources 5000 --save-baseline sync-baseline.json
+python manage.py benchmark_sync test.SomeSyncedModel --resources 5000 --baseline sync-baseline.json
+```
+"""
+
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional, Type
+
+import dataclasses
+import json
+import logging
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from django.db import connections, models, router, transaction
+from django.utils import timezone
+
+from groundwork.core.datasources import MockDatasource, SyncedModel
+from groundwork.core.internal.sync_manager import SyncManager
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # type: ignore
+
+
+@dataclass
+class BenchmarkOptions:
+    """
+    Shape of the synthetic data to sync.
+    """
+
+    resources: int = 1000
+    """
+    Number of resources returned by the benchmarked model's datasource.
+    """
+
+    fanout: int = 10
+    """
+    Number of resources referencing each related resource through a foreign key.
+    """
+
+    m2m_width: int = 3
+    """
+    Number of related resources referenced by each many-to-many relationship.
+    """
+
+    embedded_ratio: float = 0.0
+    """
+    Proportion of foreign key values that are embedded resources rather than identifiers.
+    """
+
+    seed: int = 0
+    """
+    Random seed, so that runs with the same options sync the same data.
+    """
+
+
+@dataclass
+class BenchmarkResult:
+    """
+    Measurements from a benchmark run.
+    """
+
+    model: str
+    rows: int
+    duration: float
+    rows_per_second: float
+    queries: int
+    queries_per_row: float
+    peak_rss_mb: Optional[float]
+    timings: Dict[str, float] = field(default_factory=dict)
+    counters: Dict[str, int] = field(default_factory=dict)
+    options: Optional[BenchmarkOptions] = None
+
+    def to_json(self) -> str:
+        return json.dumps(dataclasses.asdict(self), indent=2, sort_keys=True)
+
+    @classmethod
+    def from_json(cls, data: str) -> "BenchmarkResult":
+        attrs = json.loads(data)
+        if attrs.get("options") is not None:
+            attrs["options"] = BenchmarkOptions(**attrs["options"])
+
+        return cls(**attrs)
+
+
+BASELINE_METRICS = {
+    "rows_per_second": True,
+    "queries_per_row": False,
+    "peak_rss_mb": False,
+}
+"""
+Metrics compared against a baseline, mapped to whether a higher value is better.
+"""
+
+
+def run_sync_benchmark(
+    model: Type[SyncedModel], options: BenchmarkOptions, commit: bool = False
+) -> BenchmarkResult:
+    """
+    Sync synthetic resources into a model and measure how long it takes.
+
+    The datasources of the model and any related models are replaced with in-memory datasources for the duration of
+    the benchmark.
+
+    Args:
+        model: The model to benchmark.
+        options: Shape of the synthetic data.
+        commit: Keep the synced rows. By default, the benchmark runs in a transaction that is rolled back.
+
+    Returns:
+        Measurements from the run.
+    """
+
+    datasets = generate_datasets(model, options)
+    queries = 0
+
+    def count_query(execute: Any, *args: Any) -> Any:
+        nonlocal queries
+        queries += 1
+        return execute(*args)
+
+    using = router.db_for_write(model)
+
+    with _replace_datasources(datasets), transaction.atomic(using=using):
+        with connections[using].execute_wrapper(count_query):
+            start = time.perf_counter()
+            summary = SyncManager().sync_model(model)
+            duration = time.perf_counter() - start
+
+        if not commit:
+            transaction.set_rollback(True, using=using)
+
+    rows = summary.counters["rows_synced"]
+
+    return BenchmarkResult(
+        model=model._meta.label,
+        rows=rows,
+        duration=duration,
+        rows_per_second=rows / duration if duration else 0.0,
+        queries=queries,
+        queries_per_row=queries / rows if rows else 0.0,
+        peak_rss_mb=get_peak_rss_mb(),
+        timings=dict(summary.timings),
+        counters=dict(summary.counters),
+        options=options,
+    )
+
+
+def compare_to_baseline(
+    result: BenchmarkResult, baseline: BenchmarkResult, tolerance: float = 0.1
+) -> List[str]:
+    """
+    Compare a benchmark run against a baseline run of the same model with the same options.
+
+    Args:
+        result: The run to check.
+        baseline: The run to compare against.
+        tolerance: Proportion by which a metric may get worse before it is reported.
+
+    Raises:
+        ValueError: If the runs benchmarked different models, or synced data of a different shape.
+
+    Returns:
+        A description of each metric that regressed by more than the tolerance.
+    """
+
+    if result.model != baseline.model:
+        raise ValueError(f"Baseline is for {baseline.model}, not {result.model}")
+
+    if result.options is None or baseline.options is None:
+        logging.warning(
+            "Benchmark options weren't recorded, so the baseline may not be comparable"
+        )
+    elif result.options != baseline.options:
+        differences = [
+            f"{name}={expected!r} (got {getattr(result.options, name)!r})"
+            for name, expected in dataclasses.asdict(baseline.options).items()
+            if getattr(result.options, name) != expected
+        ]
+        raise ValueError(
+            "Baseline was run with different options: " + ", ".join(differences)
+        )
+
+    regressions = []
+
+    for key, higher_is_better in BASELINE_METRICS.items():
+        value = getattr(result, key)
+        expected = getattr(baseline, key)
+
+        if value is None or not expected:
+            continue
+
+        change = (value - expected) / expected
+        if (-change if higher_is_better else change) > tolerance:
+            regressions.append(f"{key}: {expected:.4g} -> {value:.4g} ({change:+.1%})")
+
+    return regressions
+
+
+def get_peak_rss_mb() -> Optional[float]:
+    """
+    Returns:
+        The peak resident set size of the current process in megabytes, or `None` if this can't be measured on this
+        platform.
+    """
+
+    if resource is None:
+        return None
+
+    # Linux reports this in kilobytes
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def generate_datasets(
+    model: Type[SyncedModel], options: BenchmarkOptions
+) -> Dict[Type[SyncedModel], List[Any]]:
+    """
+    Generate synthetic resources for a model and every `SyncedModel` it references.
+
+    Args:
+        model: The model to generate resources for.
+        options: Shape of the synthetic data.
+
+    Returns:
+        The generated resources for each model.
+    """
+
+    generator = _ResourceGenerator(options)
+    generator.generate(model, options.resources)
+
+    return generator.datasets
+
+
+class _ResourceGenerator:
+    max_depth = 3
+
+    def __init__(self, options: BenchmarkOptions) -> None:
+        self.options = options
+        self.random = random.Random(options.seed)
+        self.datasets: Dict[Type[SyncedModel], List[Any]] = {}
+        self.now = timezone.now()
+
+    def generate(self, model: Type[SyncedModel], count: int, depth: int = 0) -> None:
+        if model in self.datasets:
+            return
+
+        # Register the model before generating its resources so that cyclic references terminate
+        self.datasets[model] = []
+        self.datasets[model] = [
+            self.resource(model, i, count, depth) for i in range(count)
+        ]
+
+    def resource(self, model: Type[SyncedModel], i: int, count: int, depth: int) -> Any:
+        attrs = {"id": self.identifier(model, i)}
+        ignored = {field.name for field in SyncedModel._meta.get_fields()}
+
+        for field in model._meta.get_fields():
+            if field.name in ignored or field.name == model.sync_config.external_id:
+                continue
+
+            if field.many_to_many and field.concrete:
+                if self.is_synced(field.related_model) and depth < self.max_depth:
+                    pool = self.pool(field.related_model, count, depth)
+                    attrs[field.name] = [
+                        self.identifier(
+                            field.related_model, self.random.randrange(pool)
+                        )
+                        for _ in range(self.options.m2m_width)
+                    ]
+
+            elif field.many_to_one and field.concrete:
+                if field.related_model is model:
+                    attrs[field.name] = self.identifier(model, i // 2)
+
+                elif self.is_synced(field.related_model) and depth < self.max_depth:
+                    pool = self.pool(field.related_model, count, depth)
+                    ref = i % pool
+
+                    if self.random.random() < self.options.embedded_ratio:
+                        attrs[field.name] = self.resource(
+                            field.related_model, ref, pool, depth + 1
+                        )
+                    else:
+                        attrs[field.name] = self.identifier(field.related_model, ref)
+
+            elif not field.is_relation and field.concrete:
+                value = self.value(field, i)
+                if value is not None:
+                    attrs[field.name] = value
+
+        return SimpleNamespace(**attrs)
+
+    def pool(self, model: Type[SyncedModel], count: int, depth: int) -> int:
+        size = max(1, count // max(self.options.fanout, 1))
+        self.generate(model, size, depth + 1)
+        return len(self.datasets[model]) or size
+
+    def identifier(self, model: Type[SyncedModel], i: int) -> Any:
+        field = model._meta.get_field(model.sync_config.external_id)
+        if isinstance(field, models.IntegerField):
+            return i
+
+        return str(i)
+
+    def is_synced(self, model: Any) -> bool:
+        return isinstance(model, type) and issubclass(model, SyncedModel)
+
+    def value(self, field: models.Field, i: int) -> Any:
+        if isinstance(field, models.BooleanField):
+            return i % 2 == 0
+        if isinstance(field, (models.IntegerField, models.FloatField)):
+            return i
+        if isinstance(field, models.DecimalField):
+            return i
+        if isinstance(field, models.DateTimeField):
+            return self.now
+        if isinstance(field, models.DateField):
+            return self.now.date()
+        if isinstance(field, models.UUIDField):
+            return uuid.UUID(int=self.random.getrandbits(128))
+        if isinstance(field, models.URLField):
+            return f"https://example.com/{i}"
+        if isinstance(field, models.EmailField):
+            return f"user{i}@example.com"
+        if isinstance(field, (models.CharField, models.TextField)):
+            value = f"{field.name}-{i}"
+            return value[: field.max_length] if field.max_length else value
+
+        return None
+
+
+class _IndexedMockDatasource(MockDatasource[Any]):
+    """
+    Mock datasource with constant-time lookups, so that the benchmark measures the sync rather than the mock.
+    """
+
+    def __init__(self, data: List[Any], **kwargs: Any) -> None:
+        super().__init__(data, **kwargs)
+        self.index = {getattr(x, self.identifer): x for x in data}
+
+    def get(self, id: Any) -> Any:
+        return self.index[id]
+
+
+@contextmanager
+def _replace_datasources(
+    datasets: Dict[Type[SyncedModel], List[Any]]
+) -> Iterator[None]:
+    configs = {model: model.sync_config for model in datasets}
+
+    try:
+        for model, data in datasets.items():
+            model.sync_config = dataclasses.replace(
+                model.sync_config,
+                datasource=_IndexedMockDatasource(data),
+                field_map=None,
+                stale_policy=None,
+                partitions=None,
+            )
+
+        yield
+
+    finally:
+        for model, config in configs.items():
+            model.sync_config = config
@@ -1,47 +1,1257 @@
-from typing import Any, Callable, TypeVar
+"""
+Decorators for caching the results of expensive functions in the Django cache.
 
+When a popular cached value expires under load, every caller misses at once and recomputes it. `django_cached` can
+protect against this with one of two strategies, chosen with its `stampede` argument:
+
+- `"lock"`: the first caller to miss takes a lock and recomputes the value. Other callers serve the expired value if
+  there is one, or wait for the recompute to finish.
+- `"early"`: each caller may recompute the value shortly before it expires, with a probability that rises as expiry
+  approaches and the longer the value takes to compute ("probabilistic early expiration"). One caller usually
+  recomputes the value before anyone misses.
+
+Hot values can also be kept in an in-process LRU cache in front of the Django cache, by passing `local_ttl`. This
+saves a round trip to the cache backend for every call. Calling `invalidate()` on the decorated function's `cache`
+attribute clears the in-process caches of every process within about a second, by bumping a generation number kept in
+the Django cache.
+
+Values that can tolerate being slightly out of date can be served stale while they are refreshed, by passing
+`stale_ttl`. Once the value's TTL passes, callers keep getting the cached value for up to `stale_ttl` more seconds while
+a single background thread recomputes it. The size of the background thread pool is set by
+`settings.GROUNDWORK_CACHE_REFRESH_WORKERS` (2 by default).
+
+`None` and empty results are cached like any other value, but for `negative_ttl` seconds, which is usually shorter than
+the TTL of other values. Passing `exception_ttl` also caches exceptions raised by the function, so that a failing
+upstream isn't called again on every request during an outage.
+
+Large values can be stored compressed and split across several cache keys, to stay under the item size limits of
+backends like Memcached, by passing `chunk_threshold`. Values that pickle to more than this many bytes are compressed
+(with lz4 if it is installed, otherwise zlib) and stored in chunks of `settings.GROUNDWORK_CACHE_CHUNK_SIZE` bytes
+(512KiB by default). The chunks of each version of a value have their own keys, and are only read through a manifest
+stored under the value's key, so readers never see a partially replaced value. A version's chunks are deleted once the
+value is replaced or invalidated. Writers of the same chunked value hold a short lock in the cache while replacing it,
+so that concurrent writes never leave chunks behind.
+
+`django_cached_batch` caches functions that look up many values at once, such as enriching a list of postcodes. Cached
+values are fetched with a single `get_many`, and the function is only called for the values that are missing.
+
+Values cached by `django_cached_model_property` on Django models are keyed by a version number for the model, which
+`SyncManager` increments whenever a sync changes the model's rows. Long TTLs can safely be used for values derived
+from synced data, as they are invalidated as soon as the data changes.
+
+With `settings.GROUNDWORK_CACHE_STATS = True`, hits, misses, recompute times, value sizes and cache backend latency
+are recorded for each prefix, exported as `cache.*` metrics and summarised by the `cache_report` management command.
+
+`django_cached` can also decorate coroutine functions, for use in async views and datasources. These use the async
+cache API, and concurrent calls that miss the cache share a single call to the function.
+"""
+
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+)
+
+import asyncio
+import functools
+import inspect
+import logging
+import math
+import pickle
+import random
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from collections.abc import Sized
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from django.conf import settings
 from django.core.cache import cache
-from django.db.models import QuerySet
+from django.db import close_old_connections
+from django.db.models import Model, QuerySet
 
+from groundwork.core.internal import cache_stats
 from groundwork.core.types import Decorator
 
+try:
+    import lz4.frame
+except ImportError:  # pragma: no cover
+    lz4 = None  # type: ignore
+
+
+@dataclass
+class _CacheEntry:
+    value: Any
+    expires: float
+    delta: float
+    error: Optional[BaseException] = None
+
+    def get(self) -> Any:
+        if self.error is not None:
+            raise self.error.with_traceback(None)
+
+        return self.value
+
+
+def _is_empty(value: Any) -> bool:
+    return value is None or (isinstance(value, Sized) and len(value) == 0)
+
+
+def _get_size(value: Any, size: Optional[int] = None) -> Optional[int]:
+    # Pickling a value just to measure it is expensive, so only do it if asked to
+    if size is not None or not cache_stats.is_measuring_sizes():
+        return size
+
+    try:
+        return len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return None
+
+
+def _get_ttl(
+    value: Any, ttl: Optional[int], negative_ttl: Optional[int]
+) -> Optional[int]:
+    if not _is_empty(value) or negative_ttl is None:
+        return ttl
+
+    return negative_ttl if ttl is None else min(ttl, negative_ttl)
+
+
+@dataclass
+class _ChunkManifest:
+    version: str
+    count: int
+    codec: str
+
+    def get_chunk_keys(self, key: str) -> List[str]:
+        return [f"{key}.{self.version}.{i}" for i in range(self.count)]
+
+
+def _get_chunk_keys(key: str, entry: Any) -> List[str]:
+    if isinstance(entry, _CacheEntry) and isinstance(entry.value, _ChunkManifest):
+        return entry.value.get_chunk_keys(key)
+
+    return []
+
+
+def _compress(data: bytes) -> Tuple[str, bytes]:
+    if lz4 is not None:
+        return "lz4", lz4.frame.compress(data)
+
+    return "zlib", zlib.compress(data)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "lz4":
+        if lz4 is None:
+            raise ValueError("lz4 is not installed")
+
+        return lz4.frame.decompress(data)
+
+    return zlib.decompress(data)
+
+
+QUERYSET_CHUNK_SIZE = 2000
+"""
+Number of rows fetched at a time when materializing a QuerySet returned by a cached function.
+"""
+
+
+GENERATION_CHECK_INTERVAL = 1.0
+"""
+Seconds between checks of whether a function's in-process cache has been invalidated by another process.
+"""
+
+
+_refresh_pool: Optional[ThreadPoolExecutor] = None
+_refresh_pool_lock = threading.Lock()
+
+
+def _get_refresh_pool() -> ThreadPoolExecutor:
+    global _refresh_pool
+
+    with _refresh_pool_lock:
+        if _refresh_pool is None:
+            _refresh_pool = ThreadPoolExecutor(
+                max_workers=getattr(settings, "GROUNDWORK_CACHE_REFRESH_WORKERS", 2),
+                thread_name_prefix="groundwork-cache-refresh",
+            )
+
+        return _refresh_pool
+
+
+class LocalCache:
+    """
+    Thread-safe, in-process LRU cache whose entries expire after a TTL or when the cache's generation changes.
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        """
+        Args:
+            max_size: Maximum number of entries. The least recently used entries are evicted first.
+            ttl: Seconds after which entries expire.
+        """
+
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str, generation: int) -> Optional[Any]:
+        """
+        Args:
+            key: Key to look up.
+            generation: Current generation. Entries from other generations are treated as missing.
+
+        Returns:
+            The cached value, or `None` if it is missing or expired.
+        """
+
+        with self.lock:
+            hit = self.entries.get(key)
+            if hit is None:
+                return None
+
+            value, expires, entry_generation = hit
+            if entry_generation != generation or time.monotonic() >= expires:
+                del self.entries[key]
+                return None
+
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, generation: int) -> None:
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.ttl, generation)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+
+class CachedFunction:
+    """
+    Caches the results of a function in the default cache. Usually created by the `django_cached` decorator, and
+    available as the `cache` attribute of the decorated function.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[..., Any],
+        prefix: str,
+        get_key: Any = None,
+        ttl: Optional[int] = 500,
+        stampede: Optional[str] = None,
+        lock_timeout: float = 30,
+        early_beta: float = 1.0,
+        local_ttl: Optional[float] = None,
+        local_size: int = 256,
+        stale_ttl: Optional[int] = None,
+        negative_ttl: Optional[int] = 60,
+        exception_ttl: Optional[int] = None,
+        chunk_threshold: Optional[int] = None,
+        aget_key: Any = None,
+    ) -> None:
+        """
+        Args:
+            fn: The function to cache.
+            prefix: Prefix applied to the cache key.
+            get_key: Return a cache key given the arguments to the function.
+            ttl: TTL in seconds.
+            stampede: Strategy for stopping concurrent callers recomputing an expired value: `"lock"`, `"early"` or
+                `None`.
+            lock_timeout: With the `"lock"` strategy, maximum time in seconds to wait for another caller to recompute
+                the value. Also the maximum time to wait for another caller to finish replacing a chunked value.
+            early_beta: With the `"early"` strategy, how eagerly to recompute values before they expire. Values above 1
+                favour earlier recomputes.
+            local_ttl: If provided, also cache values in an in-process LRU cache for this many seconds. Values are
+                shared between callers in the same process, so must not be mutated.
+            local_size: Maximum number of values in the in-process cache.
+            stale_ttl: If provided, keep serving values for this many seconds after their TTL passes, while they are
+                recomputed in the background.
+            negative_ttl: TTL in seconds for `None` and empty results, if shorter than `ttl`. If `None`, they are cached
+                for `ttl`.
+            exception_ttl: If provided, cache exceptions raised by the function for this many seconds, and re-raise them
+                to callers in the meantime.
+            chunk_threshold: If provided, compress values that pickle to more than this many bytes and split them
+                across several cache keys.
+            aget_key: Coroutine function used instead of `get_key` by `acall`, for keys that need the cache to build.
+        """
+
+        if stampede not in (None, "lock", "early"):
+            raise ValueError(f"Unknown stampede strategy: {stampede}")
+
+        self.fn = fn
+        self.prefix = prefix
+        self.key_fn = get_key
+        self.akey_fn = aget_key
+        self.ttl = ttl
+        self.stampede = stampede
+        self.lock_timeout = lock_timeout
+        self.early_beta = early_beta
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.exception_ttl = exception_ttl
+        self.chunk_threshold = chunk_threshold
+        self.local = None if local_ttl is None else LocalCache(local_size, local_ttl)
+        self.generation = 0
+        self.generation_checked = -math.inf
+        self.in_flight: Dict[Tuple[int, str], "asyncio.Future[Any]"] = {}
+        self.background_tasks: Set["asyncio.Future[Any]"] = set()
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        key = self.get_key(args, kwargs)
+        stats = cache_stats.is_enabled()
+
+        if self.local is not None:
+            entry = self.local.get(key, self.get_generation())
+            if entry is not None and not self.should_recompute(entry):
+                if stats:
+                    cache_stats.record_hit(self.prefix)
+                return entry.get()
+
+        start = time.perf_counter()
+        entry = self.load(key, cache.get(key))
+        lookup_time = time.perf_counter() - start
+
+        fresh = isinstance(entry, _CacheEntry) and not self.should_recompute(entry)
+        stale = not fresh and self.is_servable_while_stale(entry)
+        if stats:
+            hit = fresh or stale
+            cache_stats.record_lookup(self.prefix, lookup_time, int(hit), int(not hit))
+
+        if fresh:
+            self.remember(key, entry)
+            return entry.get()
+
+        if stale:
+            self.refresh_in_background(key, args, kwargs)
+            return entry.get()
+
+        if self.stampede == "lock":
+            return self.recompute_with_lock(key, entry, args, kwargs)
+
+        return self.recompute(key, args, kwargs)
+
+    async def acall(self, *args: Any, **kwargs: Any) -> Any:
+        """
+        Call a coroutine function, using the async cache API. Concurrent calls in the same event loop that miss the
+        cache share a single call to the function.
+
+        Args:
+            args: Positional arguments to the function.
+            kwargs: Keyword arguments to the function.
+
+        Returns:
+            The result of awaiting the function.
+        """
+
+        key = await self.aget_key(args, kwargs)
+        stats = cache_stats.is_enabled()
+
+        if self.local is not None:
+            entry = self.local.get(key, await self.aget_generation())
+            if entry is not None and not self.should_recompute(entry):
+                if stats:
+                    cache_stats.record_hit(self.prefix, flush=False)
+                    await cache_stats.amaybe_flush()
+                return entry.get()
+
+        start = time.perf_counter()
+        entry = await self.aload(key, await cache.aget(key))
+        lookup_time = time.perf_counter() - start
+
+        fresh = isinstance(entry, _CacheEntry) and not self.should_recompute(entry)
+        stale = not fresh and self.is_servable_while_stale(entry)
+        if stats:
+            hit = fresh or stale
+            cache_stats.record_lookup(
+                self.prefix, lookup_time, int(hit), int(not hit), flush=False
+            )
+            await cache_stats.amaybe_flush()
+
+        if fresh:
+            self.remember(key, entry)
+            return entry.get()
+
+        if stale:
+            await self.arefresh_in_background(key, args, kwargs)
+            return entry.get()
+
+        if self.stampede == "lock":
+            return await self.await_in_flight(
+                key, lambda: self.arecompute_with_lock(key, entry, args, kwargs)
+            )
+
+        return await self.await_in_flight(
+            key, lambda: self.arecompute(key, args, kwargs)
+        )
+
+    def get_key(self, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> str:
+        """
+        Args:
+            args: Positional arguments to the function.
+            kwargs: Keyword arguments to the function.
+
+        Returns:
+            The cache key for the result of calling the function with these arguments.
+        """
+
+        key = self.prefix
+        if self.key_fn is not None:
+            key += "." + str(self.key_fn(*args, **kwargs))
+
+        return key
+
+    async def aget_key(self, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> str:
+        """
+        Like `get_key`, but uses `aget_key` if it was provided.
+
+        Args:
+            args: Positional arguments to the function.
+            kwargs: Keyword arguments to the function.
+
+        Returns:
+            The cache key for the result of calling the function with these arguments.
+        """
+
+        if self.akey_fn is None:
+            return self.get_key(args, kwargs)
+
+        return f"{self.prefix}.{await self.akey_fn(*args, **kwargs)}"
+
+    def invalidate(self, *args: Any, **kwargs: Any) -> None:
+        """
+        Remove the cached result of calling the function with some arguments, and clear the in-process caches of every
+        process.
+
+        Args:
+            args: Positional arguments to the function.
+            kwargs: Keyword arguments to the function.
+        """
+
+        key = self.get_key(args, kwargs)
+        lock_key = self.lock_chunks(key)
+
+        try:
+            chunk_keys = self.get_stored_chunk_keys(key)
+            cache.delete_many([key, *chunk_keys])
+        finally:
+            if lock_key is not None:
+                cache.delete(lock_key)
+
+        if self.local is not None:
+            self.bump_generation()
+            self.local.clear()
+
+    def get_generation(self) -> int:
+        now = time.monotonic()
+
+        if now - self.generation_checked >= GENERATION_CHECK_INTERVAL:
+            self.generation = cache.get(self.get_generation_key(), 0)
+            self.generation_checked = now
+
+        return self.generation
+
+    async def aget_generation(self) -> int:
+        now = time.monotonic()
+
+        if now - self.generation_checked >= GENERATION_CHECK_INTERVAL:
+            self.generation = await cache.aget(self.get_generation_key(), 0)
+            self.generation_checked = now
+
+        return self.generation
+
+    def bump_generation(self) -> None:
+        key = self.get_generation_key()
+
+        try:
+            self.generation = cache.incr(key)
+        except ValueError:
+            # The key doesn't exist yet. If another process adds it first, increment theirs.
+            if cache.add(key, 1, None):
+                self.generation = 1
+            else:
+                self.generation = cache.incr(key)
+
+        self.generation_checked = time.monotonic()
+
+    def get_generation_key(self) -> str:
+        return f"{self.prefix}:generation"
+
+    def remember(self, key: str, entry: _CacheEntry) -> None:
+        # Callers have just checked the generation, so the last known one is current enough. If it has since changed,
+        # the entry is treated as missing on its next lookup.
+        if self.local is not None:
+            self.local.set(key, entry, self.generation)
+
+    def should_recompute(self, entry: _CacheEntry) -> bool:
+        now = time.time()
+
+        if self.stampede == "early":
+            # 1 - random() is in (0, 1], so the log is always defined
+            return (
+                now - entry.delta * self.early_beta * math.log(1 - random.random())
+                >= entry.expires
+            )
+
+        return now >= entry.expires
+
+    def is_servable_while_stale(self, entry: Any) -> bool:
+        return (
+            self.stale_ttl is not None
+            and isinstance(entry, _CacheEntry)
+            and entry.error is None
+            and time.time() < entry.expires + self.stale_ttl
+        )
+
+    def refresh_in_background(
+        self, key: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]
+    ) -> None:
+        # The lock ensures only one refresh runs at a time across every process
+        lock_key = f"{key}.lock"
+        if cache.add(lock_key, 1, self.lock_timeout):
+            _get_refresh_pool().submit(self.refresh, key, lock_key, args, kwargs)
+
+    async def arefresh_in_background(
+        self, key: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]
+    ) -> None:
+        lock_key = f"{key}.lock"
+        if await cache.aadd(lock_key, 1, self.lock_timeout):
+            task = asyncio.ensure_future(self.arefresh(key, lock_key, args, kwargs))
+
+            # The event loop only keeps weak references to tasks
+            self.background_tasks.add(task)
+            task.add_done_callback(self.background_tasks.discard)
+
+    def refresh(
+        self, key: str, lock_key: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]
+    ) -> None:
+        try:
+            # Keep serving the stale value rather than a cached exception
+            self.recompute(key, args, kwargs, cache_errors=False)
+        except Exception:
+            logging.exception("Failed to refresh cached value %s", key)
+        finally:
+            cache.delete(lock_key)
+            close_old_connections()
+
+    async def arefresh(
+        self, key: str, lock_key: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]
+    ) -> None:
+        try:
+            await self.arecompute(key, args, kwargs, cache_errors=False)
+        except Exception:
+            logging.exception("Failed to refresh cached value %s", key)
+        finally:
+            await cache.adelete(lock_key)
+
+    async def await_in_flight(
+        self, key: str, get_awaitable: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Await a recompute of a value, or join one already in progress in the current event loop.
+
+        Args:
+            key: Cache key of the value.
+            get_awaitable: Called to start a new recompute if none is in progress.
+
+        Returns:
+            The recomputed value.
+        """
+
+        in_flight_key = (id(asyncio.get_running_loop()), key)
+        task = self.in_flight.get(in_flight_key)
+
+        if task is None:
+            task = asyncio.ensure_future(get_awaitable())
+            self.in_flight[in_flight_key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(in_flight_key, None))
+
+        # Cancelling one caller shouldn't cancel the recompute for the others
+        return await asyncio.shield(task)
+
+    def recompute(
+        self,
+        key: str,
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+        cache_errors: bool = True,
+    ) -> Any:
+        start = time.perf_counter()
+
+        try:
+            value = self.fn(*args, **kwargs)
+        except Exception as error:
+            if cache_errors and self.exception_ttl is not None:
+                self.store_error(key, error, time.perf_counter() - start)
+            raise
+
+        if isinstance(value, QuerySet):
+            value = tuple(value.iterator(chunk_size=QUERYSET_CHUNK_SIZE))
+
+        delta = time.perf_counter() - start
+        size = self.store(
+            key,
+            _CacheEntry(value, 0, delta),
+            _get_ttl(value, self.ttl, self.negative_ttl),
+        )
+
+        if cache_stats.is_enabled():
+            cache_stats.record_recompute(self.prefix, delta, _get_size(value, size))
+
+        return value
+
+    async def arecompute(
+        self,
+        key: str,
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+        cache_errors: bool = True,
+    ) -> Any:
+        start = time.perf_counter()
+
+        try:
+            value = await self.fn(*args, **kwargs)
+        except Exception as error:
+            if cache_errors and self.exception_ttl is not None:
+                await self.astore_error(key, error, time.perf_counter() - start)
+            raise
+
+        if isinstance(value, QuerySet):
+            value = tuple([row async for row in value])
+
+        delta = time.perf_counter() - start
+        size = await self.astore(
+            key,
+            _CacheEntry(value, 0, delta),
+            _get_ttl(value, self.ttl, self.negative_ttl),
+        )
+
+        if cache_stats.is_enabled():
+            cache_stats.record_recompute(
+                self.prefix, delta, _get_size(value, size), flush=False
+            )
+            await cache_stats.amaybe_flush()
+
+        return value
+
+    def recompute_with_lock(
+        self,
+        key: str,
+        entry: Any,
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+    ) -> Any:
+        lock_key = f"{key}.lock"
+
+        if cache.add(lock_key, 1, self.lock_timeout):
+            try:
+                return self.recompute(key, args, kwargs)
+            finally:
+                cache.delete(lock_key)
+
+        # Another caller is recomputing the value. Serve the expired value if we have one, or wait for theirs.
+        if isinstance(entry, _CacheEntry):
+            return entry.get()
+
+        deadline = time.monotonic() + self.lock_timeout
+        delay = 0.05
+
+        while time.monotonic() < deadline:
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+            entry = self.load(key, cache.get(key))
+            if isinstance(entry, _CacheEntry) and time.time() < entry.expires:
+                self.remember(key, entry)
+                return entry.get()
+
+            if cache.get(lock_key) is None:
+                break
+
+        return self.recompute(key, args, kwargs)
+
+    async def arecompute_with_lock(
+        self,
+        key: str,
+        entry: Any,
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+    ) -> Any:
+        lock_key = f"{key}.lock"
+
+        if await cache.aadd(lock_key, 1, self.lock_timeout):
+            try:
+                return await self.arecompute(key, args, kwargs)
+            finally:
+                await cache.adelete(lock_key)
+
+        if isinstance(entry, _CacheEntry):
+            return entry.get()
+
+        deadline = time.monotonic() + self.lock_timeout
+        delay = 0.05
+
+        while time.monotonic() < deadline:
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
 
-def django_cached(prefix: str, get_key: Any = None, ttl: int = 500) -> Decorator:
+            entry = await self.aload(key, await cache.aget(key))
+            if isinstance(entry, _CacheEntry) and time.time() < entry.expires:
+                self.remember(key, entry)
+                return entry.get()
+
+            if await cache.aget(lock_key) is None:
+                break
+
+        return await self.arecompute(key, args, kwargs)
+
+    def store_error(self, key: str, error: Exception, delta: float) -> None:
+        try:
+            self.store(key, _CacheEntry(None, 0, delta, error), self.exception_ttl)
+        except Exception:
+            # Not every exception can be pickled
+            logging.exception("Failed to cache exception for %s", key)
+
+    async def astore_error(self, key: str, error: Exception, delta: float) -> None:
+        try:
+            await self.astore(
+                key, _CacheEntry(None, 0, delta, error), self.exception_ttl
+            )
+        except Exception:
+            logging.exception("Failed to cache exception for %s", key)
+
+    def store(self, key: str, entry: _CacheEntry, ttl: Optional[int]) -> Optional[int]:
+        """
+        Args:
+            key: Cache key of the value.
+            entry: The value to store.
+            ttl: TTL of the value in seconds.
+
+        Returns:
+            The size of the pickled value in bytes, if it was pickled to be split into chunks.
+        """
+
+        timeout = self.set_expiry(entry, ttl)
+        stored, chunks, size = self.split(key, entry)
+
+        # Concurrent writers take turns, so that each deletes the chunks of exactly the manifest it replaces
+        lock_key = self.lock_chunks(key)
+
+        try:
+            old_chunk_keys = self.get_stored_chunk_keys(key)
+
+            # Write the chunks under new keys before replacing the manifest, so that readers never see a mix of
+            # versions
+            if chunks:
+                cache.set_many(chunks, timeout)
+
+            cache.set(key, stored, timeout)
+
+            # Only delete the previous version's chunks once the manifest no longer refers to them, or they would be
+            # left behind forever when there is no TTL
+            if old_chunk_keys:
+                cache.delete_many(old_chunk_keys)
+        finally:
+            if lock_key is not None:
+                cache.delete(lock_key)
+
+        self.remember(key, entry)
+        return size
+
+    async def astore(
+        self, key: str, entry: _CacheEntry, ttl: Optional[int]
+    ) -> Optional[int]:
+        timeout = self.set_expiry(entry, ttl)
+        stored, chunks, size = self.split(key, entry)
+        lock_key = await self.alock_chunks(key)
+
+        try:
+            old_chunk_keys = await self.aget_stored_chunk_keys(key)
+
+            if chunks:
+                await cache.aset_many(chunks, timeout)
+
+            await cache.aset(key, stored, timeout)
+
+            if old_chunk_keys:
+                await cache.adelete_many(old_chunk_keys)
+        finally:
+            if lock_key is not None:
+                await cache.adelete(lock_key)
+
+        self.remember(key, entry)
+        return size
+
+    def lock_chunks(self, key: str) -> Optional[str]:
+        """
+        Wait for exclusive use of the chunks stored under a key. Held while replacing or deleting a value, so that
+        chunks are never left behind by a concurrent write.
+
+        Args:
+            key: Cache key of a value.
+
+        Returns:
+            The key of the lock, to delete once done, or `None` if values aren't split into chunks or the lock wasn't
+            released in time.
+        """
+
+        if self.chunk_threshold is None:
+            return None
+
+        lock_key = f"{key}.chunks_lock"
+        deadline = time.monotonic() + self.lock_timeout
+        delay = 0.01
+
+        while not cache.add(lock_key, 1, self.lock_timeout):
+            if time.monotonic() >= deadline:
+                logging.warning("Timed out waiting to replace chunks of %s", key)
+                return None
+
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+        return lock_key
+
+    async def alock_chunks(self, key: str) -> Optional[str]:
+        if self.chunk_threshold is None:
+            return None
+
+        lock_key = f"{key}.chunks_lock"
+        deadline = time.monotonic() + self.lock_timeout
+        delay = 0.01
+
+        while not await cache.aadd(lock_key, 1, self.lock_timeout):
+            if time.monotonic() >= deadline:
+                logging.warning("Timed out waiting to replace chunks of %s", key)
+                return None
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+        return lock_key
+
+    def get_stored_chunk_keys(self, key: str) -> List[str]:
+        """
+        Args:
+            key: Cache key of a value.
+
+        Returns:
+            The keys of the chunks of the value currently stored under `key`, if it was split into chunks.
+        """
+
+        if self.chunk_threshold is None:
+            return []
+
+        return _get_chunk_keys(key, cache.get(key))
+
+    async def aget_stored_chunk_keys(self, key: str) -> List[str]:
+        if self.chunk_threshold is None:
+            return []
+
+        return _get_chunk_keys(key, await cache.aget(key))
+
+    def set_expiry(self, entry: _CacheEntry, ttl: Optional[int]) -> Optional[int]:
+        """
+        Args:
+            entry: The entry to set the expiry time of.
+            ttl: TTL of the entry in seconds.
+
+        Returns:
+            The timeout to store the entry with.
+        """
+
+        entry.expires = math.inf if ttl is None else time.time() + ttl
+
+        if ttl is None:
+            return None
+
+        # Keep expired values around while they are recomputed, so that they can be served in the meantime
+        grace = 0
+        if self.stampede == "lock":
+            grace = math.ceil(self.lock_timeout)
+        if self.stale_ttl is not None:
+            grace = max(grace, self.stale_ttl)
+
+        return ttl + grace
+
+    def split(
+        self, key: str, entry: _CacheEntry
+    ) -> Tuple[_CacheEntry, Dict[str, bytes], Optional[int]]:
+        """
+        Split a large value into chunks.
+
+        Args:
+            key: Cache key of the value.
+            entry: The value to store.
+
+        Returns:
+            The entry to store under the value's cache key, the chunks to store under their own keys, and the size of
+            the pickled value in bytes if it was measured.
+        """
+
+        if self.chunk_threshold is None or entry.error is not None:
+            return entry, {}, None
+
+        data = pickle.dumps(entry.value, pickle.HIGHEST_PROTOCOL)
+        pickled_size = len(data)
+        if pickled_size <= self.chunk_threshold:
+            return entry, {}, pickled_size
+
+        codec, data = _compress(data)
+        size = getattr(settings, "GROUNDWORK_CACHE_CHUNK_SIZE", 512 * 1024)
+        manifest = _ChunkManifest(uuid.uuid4().hex, math.ceil(len(data) / size), codec)
+        chunks = {
+            chunk_key: data[i * size : (i + 1) * size]
+            for i, chunk_key in enumerate(manifest.get_chunk_keys(key))
+        }
+
+        return _CacheEntry(manifest, entry.expires, entry.delta), chunks, pickled_size
+
+    def load(self, key: str, entry: Any) -> Any:
+        """
+        Read the chunks of a large value.
+
+        Args:
+            key: Cache key of the value.
+            entry: The entry stored under the value's cache key.
+
+        Returns:
+            The entry with its value read from its chunks, or `None` if any chunks are missing.
+        """
+
+        if not isinstance(entry, _CacheEntry) or not isinstance(
+            entry.value, _ChunkManifest
+        ):
+            return entry
+
+        return self.join(key, entry, cache.get_many(entry.value.get_chunk_keys(key)))
+
+    async def aload(self, key: str, entry: Any) -> Any:
+        if not isinstance(entry, _CacheEntry) or not isinstance(
+            entry.value, _ChunkManifest
+        ):
+            return entry
+
+        return self.join(
+            key, entry, await cache.aget_many(entry.value.get_chunk_keys(key))
+        )
+
+    def join(
+        self, key: str, entry: _CacheEntry, chunks: Dict[str, bytes]
+    ) -> Optional[_CacheEntry]:
+        chunk_keys = entry.value.get_chunk_keys(key)
+        if len(chunks) < len(chunk_keys):
+            return None
+
+        try:
+            data = _decompress(
+                entry.value.codec,
+                b"".join(chunks[chunk_key] for chunk_key in chunk_keys),
+            )
+            value = pickle.loads(data)
+        except Exception:
+            logging.exception("Failed to read cached value %s", key)
+            return None
+
+        return _CacheEntry(value, entry.expires, entry.delta)
+
+
+class CachedBatchFunction:
+    """
+    Caches the results of a function that looks up many values at once. Usually created by the `django_cached_batch`
+    decorator, and available as the `cache` attribute of the decorated function.
     """
-    Decorator to cache a function using the default cache.
+
+    def __init__(
+        self,
+        fn: Callable[[List[Any]], Dict[Any, Any]],
+        prefix: str,
+        get_key: Any = None,
+        ttl: Optional[int] = 500,
+        negative_ttl: Optional[int] = 60,
+        batch_size: Optional[int] = None,
+    ) -> None:
+        """
+        Args:
+            fn: The function to cache. Called with a list of items to look up, and returns a dictionary mapping each
+                item to its value. Items missing from the dictionary are treated as having the value `None`.
+            prefix: Prefix applied to the cache key.
+            get_key: Return a cache key for an item. By default, the item is converted to a string.
+            ttl: TTL in seconds.
+            negative_ttl: TTL in seconds for `None` and empty values, if shorter than `ttl`.
+            batch_size: If provided, call the function with at most this many items at a time.
+        """
+
+        self.fn = fn
+        self.prefix = prefix
+        self.key_fn = get_key
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.batch_size = batch_size
+
+    def __call__(self, items: Iterable[Hashable]) -> Dict[Any, Any]:
+        keys = {item: self.get_key(item) for item in items}
+        results = {}
+        missing = []
+
+        start = time.perf_counter()
+        hits = cache.get_many(list(keys.values()))
+        lookup_time = time.perf_counter() - start
+        now = time.time()
+
+        for item, key in keys.items():
+            entry = hits.get(key)
+            if isinstance(entry, _CacheEntry) and now < entry.expires:
+                results[item] = entry.value
+            else:
+                missing.append(item)
+
+        stats = cache_stats.is_enabled()
+        if stats:
+            cache_stats.record_lookup(
+                self.prefix, lookup_time, len(results), len(missing)
+            )
+
+        batch_size = self.batch_size or max(len(missing), 1)
+        for i in range(0, len(missing), batch_size):
+            batch = missing[i : i + batch_size]
+
+            start = time.perf_counter()
+            values = self.fn(batch)
+            values = self.store({item: values.get(item) for item in batch})
+            results.update(values)
+
+            if stats:
+                cache_stats.record_recompute(
+                    self.prefix, time.perf_counter() - start, _get_size(values)
+                )
+
+        return results
+
+    def get_key(self, item: Any) -> str:
+        """
+        Args:
+            item: An item looked up by the function.
+
+        Returns:
+            The cache key for the item's value.
+        """
+
+        key = item if self.key_fn is None else self.key_fn(item)
+        return f"{self.prefix}.{key}"
+
+    def invalidate(self, items: Iterable[Hashable]) -> None:
+        """
+        Remove the cached values of some items.
+
+        Args:
+            items: Items to remove from the cache.
+        """
+
+        cache.delete_many([self.get_key(item) for item in items])
+
+    def store(self, values: Dict[Any, Any]) -> Dict[Any, Any]:
+        # Values with different TTLs need separate calls to set_many()
+        by_ttl: Dict[Optional[int], Dict[str, _CacheEntry]] = {}
+
+        for item, value in values.items():
+            ttl = _get_ttl(value, self.ttl, self.negative_ttl)
+            expires = math.inf if ttl is None else time.time() + ttl
+            by_ttl.setdefault(ttl, {})[self.get_key(item)] = _CacheEntry(
+                value, expires, 0
+            )
+
+        for ttl, entries in by_ttl.items():
+            cache.set_many(entries, ttl)
+
+        return values
+
+
+def django_cached(
+    prefix: str,
+    get_key: Any = None,
+    ttl: int = 500,
+    stampede: Optional[str] = None,
+    lock_timeout: float = 30,
+    early_beta: float = 1.0,
+    local_ttl: Optional[float] = None,
+    local_size: int = 256,
+    stale_ttl: Optional[int] = None,
+    negative_ttl: Optional[int] = 60,
+    exception_ttl: Optional[int] = None,
+    chunk_threshold: Optional[int] = None,
+    aget_key: Any = None,
+) -> Decorator:
+    """
+    Decorator to cache a function using the default cache. Coroutine functions are cached using the async cache API.
 
     Args:
         get_key: Return a cache key given the arguments to the function
         prefix: Prefix applied to the cache key
         ttl: TTL in seconds
+        stampede: Strategy for stopping concurrent callers recomputing an expired value: `"lock"`, `"early"` or `None`.
+        lock_timeout: With the `"lock"` strategy, maximum time in seconds to wait for another caller to recompute the
+            value.
+        early_beta: With the `"early"` strategy, how eagerly to recompute values before they expire.
+        local_ttl: If provided, also cache values in an in-process LRU cache for this many seconds.
+        local_size: Maximum number of values in the in-process cache.
+        stale_ttl: If provided, keep serving values for this many seconds after their TTL passes, while they are
+            recomputed in the background.
+        negative_ttl: TTL in seconds for `None` and empty results, if shorter than `ttl`.
+        exception_ttl: If provided, cache exceptions raised by the function for this many seconds.
+        chunk_threshold: If provided, compress values that pickle to more than this many bytes and split them across
+            several cache keys.
+        aget_key: Coroutine function used instead of `get_key` when decorating a coroutine function.
 
     Returns:
         A function decorator
     """
 
     def decorator(fn):
-        def cached_fn(*args, **kwargs):
-            key = prefix
-            if get_key != None:
-                key += "." + str(get_key(*args, **kwargs))
+        cached = CachedFunction(
+            fn,
+            prefix,
+            get_key=get_key,
+            ttl=ttl,
+            stampede=stampede,
+            lock_timeout=lock_timeout,
+            early_beta=early_beta,
+            local_ttl=local_ttl,
+            local_size=local_size,
+            stale_ttl=stale_ttl,
+            negative_ttl=negative_ttl,
+            exception_ttl=exception_ttl,
+            chunk_threshold=chunk_threshold,
+            aget_key=aget_key,
+        )
 
-            hit = cache.get(key)
-            if hit is None:
-                hit = fn(*args, **kwargs)
-                if isinstance(hit, QuerySet):
-                    hit = tuple(hit[:10000])
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def cached_fn(*args, **kwargs):
+                return await cached.acall(*args, **kwargs)
 
-                cache.set(key, hit, ttl)
+        else:
 
-            return hit
+            @functools.wraps(fn)
+            def cached_fn(*args, **kwargs):
+                return cached(*args, **kwargs)
 
+        cached_fn.cache = cached
         return cached_fn
 
     return decorator
 
 
+_model_versions: Dict[str, Tuple[int, float]] = {}
+
+
+def get_model_cache_version(model: Type[Model]) -> int:
+    """
+    The version is kept in process memory, and checked against the cache at most every `GENERATION_CHECK_INTERVAL`
+    seconds.
+
+    Args:
+        model: A model class.
+
+    Returns:
+        The current version of values cached by `django_cached_model_property` for the model.
+    """
+
+    key = _get_model_version_key(model)
+    now = time.monotonic()
+
+    known = _model_versions.get(key)
+    if known is not None and now - known[1] < GENERATION_CHECK_INTERVAL:
+        return known[0]
+
+    version = cache.get(key)
+    if version is None:
+        # Start from the current time rather than 0, so that if the version is evicted from the cache, values cached
+        # under earlier versions aren't served again.
+        cache.add(key, time.time_ns() // 1_000_000, None)
+        version = cache.get(key, 0)
+
+    _model_versions[key] = (version, now)
+    return version
+
+
+async def aget_model_cache_version(model: Type[Model]) -> int:
+    """
+    Like `get_model_cache_version`, but uses the async cache API.
+
+    Args:
+        model: A model class.
+
+    Returns:
+        The current version of values cached by `django_cached_model_property` for the model.
+    """
+
+    key = _get_model_version_key(model)
+    now = time.monotonic()
+
+    known = _model_versions.get(key)
+    if known is not None and now - known[1] < GENERATION_CHECK_INTERVAL:
+        return known[0]
+
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns() // 1_000_000, None)
+        version = await cache.aget(key, 0)
+
+    _model_versions[key] = (version, now)
+    return version
+
+
+def bump_model_cache_version(model: Type[Model]) -> None:
+    """
+    Invalidate every value cached by `django_cached_model_property` for a model. Called by `SyncManager` when a sync
+    changes the model's rows. Other processes see the new version within `GENERATION_CHECK_INTERVAL` seconds.
+
+    Args:
+        model: A model class.
+    """
+
+    key = _get_model_version_key(model)
+
+    try:
+        version = cache.incr(key)
+    except ValueError:
+        # The key doesn't exist yet. If another process adds it first, increment theirs.
+        version = time.time_ns() // 1_000_000
+        if not cache.add(key, version, None):
+            version = cache.incr(key)
+
+    _model_versions[key] = (version, time.monotonic())
+
+
+def _get_model_version_key(model: Type[Model]) -> str:
+    return f"groundwork.model_version.{model._meta.concrete_model._meta.label_lower}"
+
+
 def django_cached_model_property(
-    prefix: str, get_key: Any = None, ttl: int = 500
+    prefix: str,
+    get_key: Any = None,
+    ttl: int = 500,
+    versioned: bool = True,
+    **kwargs: Any,
 ) -> Decorator:
     """
     Decorator to cache a model method using the default cache, scoped to the model instance.
@@ -50,16 +1260,93 @@ def django_cached_model_property(
         get_key: Return a cache key given the arguments to the function
         prefix: Prefix applied to the cache key
         ttl: TTL in seconds
+        versioned: On Django models, invalidate cached values when the model's cache version is bumped, for example
+            when its rows are synced.
+        kwargs: Other options accepted by `django_cached`.
 
     Returns:
         A method decorator
     """
 
-    if get_key is None:
-        get_key_on_model = lambda self, *args, **kargs: self.id
-    else:
-        get_key_on_model = (
-            lambda self, *args, **kwargs: f"{self.id}.{get_key(self, *args, **kwargs)}"
+    def get_key_on_model(self, *args, **kwargs):
+        version = None
+        if versioned and isinstance(self, Model):
+            version = get_model_cache_version(type(self))
+
+        return format_key(self, version, args, kwargs)
+
+    async def aget_key_on_model(self, *args, **kwargs):
+        version = None
+        if versioned and isinstance(self, Model):
+            version = await aget_model_cache_version(type(self))
+
+        return format_key(self, version, args, kwargs)
+
+    def format_key(self, version, args, kwargs):
+        key = str(self.id)
+
+        if version is not None:
+            key += f".v{version}"
+
+        if get_key is not None:
+            key += f".{get_key(self, *args, **kwargs)}"
+
+        return key
+
+    return django_cached(
+        prefix,
+        get_key=get_key_on_model,
+        aget_key=aget_key_on_model,
+        ttl=ttl,
+        **kwargs,
+    )
+
+
+def django_cached_batch(
+    prefix: str,
+    get_key: Any = None,
+    ttl: int = 500,
+    negative_ttl: Optional[int] = 60,
+    batch_size: Optional[int] = None,
+) -> Decorator:
+    """
+    Decorator to cache a function that looks up many values at once using the default cache.
+
+    The decorated function is called with a list of items to look up, and returns a dictionary mapping each item to its
+    value. It is only called with the items that aren't already cached.
+
+    ```python
+    @django_cached_batch("postcodes", ttl=3600)
+    def lookup_postcodes(postcodes):
+        return {result["postcode"]: result for result in api.bulk_lookup(postcodes)}
+    ```
+
+    Args:
+        get_key: Return a cache key for an item. By default, the item is converted to a string.
+        prefix: Prefix applied to the cache key
+        ttl: TTL in seconds
+        negative_ttl: TTL in seconds for `None` and empty values, if shorter than `ttl`.
+        batch_size: If provided, call the function with at most this many items at a time.
+
+    Returns:
+        A function decorator
+    """
+
+    def decorator(fn):
+        cached = CachedBatchFunction(
+            fn,
+            prefix,
+            get_key=get_key,
+            ttl=ttl,
+            negative_ttl=negative_ttl,
+            batch_size=batch_size,
         )
 
-    return django_cached(prefix, get_key=get_key_on_model, ttl=ttl)
+        @functools.wraps(fn)
+        def cached_fn(items):
+            return cached(items)
+
+        cached_fn.cache = cached
+        return cached_fn
+
+    return decorator
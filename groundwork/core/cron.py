@@ -1,11 +1,265 @@
-from typing import Callable
+"""
+Scheduling for background tasks, such as syncing `SyncedModel`s.
 
-from datetime import timedelta
+Each task's schedule is stored in the database, so schedules survive restarts and are shared between every process
+running cron tasks (for example, one per container). A due task is claimed by exactly one process, so each task runs
+once per interval across all of them.
 
-import schedule
+Tasks with the same interval are spread across it rather than all running at once: each task's schedule is offset by
+an amount derived from its name. Tasks can also be given an explicit `offset`, random `jitter`, or a time-of-day
+`window` to run in. Concurrent executors run at most one task per `upstream` service at a time, unless configured
+otherwise with `settings.GROUNDWORK_CRON_UPSTREAM_LIMITS`.
 
+Runs that were missed while no process was running cron tasks are caught up according to the task's catch-up policy:
 
-def register_cron(fn: Callable[[], None], interval: timedelta) -> None:
+- `"once"` (the default): run the task once, then resume the schedule from then.
+- `"skip"`: skip runs that are more than a few minutes overdue, resuming at the next scheduled time.
+- `"all"`: run the task once for every missed run, in quick succession.
+
+The default policy can be changed with `settings.GROUNDWORK_CRON_CATCH_UP`.
+
+Clock processes sleep until the next task is due. Call `notify_cron()` to wake them early, for example to run a task
+on demand. With PostgreSQL, this wakes clock processes in every container using `LISTEN`/`NOTIFY`.
+
+If a task may run for longer than its interval, also configure a lock in `settings.GROUNDWORK_CRON_LOCK` so that it
+never runs in more than one process at the same time:
+
+```python
+GROUNDWORK_CRON_LOCK = {"class": "groundwork.core.cron.CacheLock", "lease": timedelta(minutes=2)}
+```
+
+Every process must share the same lock backend – a cache lock needs a shared cache such as redis or memcached.
+"""
+
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    Union,
+)
+
+import hashlib
+import logging
+import multiprocessing
+import os
+import random
+import select
+import signal
+import threading
+import traceback
+import uuid
+from abc import ABCMeta, abstractmethod
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.db import close_old_connections, connections, router
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from groundwork.core import metrics
+from groundwork.core.metrics import Metric
+
+if TYPE_CHECKING:
+    from groundwork.core.models import CronTaskRun, CronTaskState
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # type: ignore
+
+CatchUpPolicy = Literal["once", "skip", "all"]
+
+
+@dataclass
+class CronTask:
+    """
+    A task registered to run at a specified interval.
+    """
+
+    name: str
+    """
+    Stable name identifying the task.
+    """
+
+    fn: Callable[[], None]
+    """
+    Function implementing the task.
+    """
+
+    interval: timedelta
+    """
+    Interval to run the task at.
+    """
+
+    next_run: datetime
+    """
+    Time the task is next due to run.
+    """
+
+    last_run: Optional[datetime] = None
+    """
+    Time the task was last started by any process.
+    """
+
+    catch_up: Optional[CatchUpPolicy] = None
+    """
+    How to handle runs that were missed while no process was running cron tasks. Defaults to
+    `settings.GROUNDWORK_CRON_CATCH_UP`, or `"once"`.
+    """
+
+    offset: Optional[timedelta] = None
+    """
+    Phase of the task's schedule within its interval, measured from the unix epoch. Defaults to an offset derived from
+    the task's name, so that tasks with the same interval are spread evenly across it.
+    """
+
+    jitter: Optional[timedelta] = None
+    """
+    Maximum random delay added to each scheduled run.
+    """
+
+    window: Optional[Tuple[time, time]] = None
+    """
+    Time of day, in the current timezone, that the task may start between. Runs scheduled outside the window are
+    moved into the next window. The window may span midnight.
+    """
+
+    upstream: Optional[str] = None
+    """
+    Name of the service the task talks to, such as the hostname of an API. Concurrent executors limit how many tasks
+    with the same upstream run at once.
+    """
+
+    waiting: bool = False
+    """
+    Whether the task is due, but waiting for other tasks with the same upstream to finish.
+    """
+
+    def is_due(self, now: datetime) -> bool:
+        return self.next_run <= now
+
+    def get_offset(self) -> timedelta:
+        if self.offset is not None:
+            return self.offset % self.interval
+
+        digest = hashlib.blake2b(self.name.encode(), digest_size=8).digest()
+        return self.interval * (int.from_bytes(digest, "big") / 2**64)
+
+    def get_schedule_signature(self) -> str:
+        """
+        Returns:
+            A string that changes whenever the task's interval, offset or window changes.
+        """
+
+        parts = [self.interval.total_seconds(), self.get_offset().total_seconds()]
+        if self.window is not None:
+            parts.extend(t.isoformat() for t in self.window)
+
+        return ":".join(str(part) for part in parts)
+
+    def get_scheduled_time(self, after: datetime) -> datetime:
+        """
+        Args:
+            after: Time to schedule the task after.
+
+        Returns:
+            The task's first scheduled time after `after`, with its window and jitter applied.
+        """
+
+        offset = self.get_offset()
+        slots = (after - _EPOCH - offset) // self.interval + 1
+        scheduled = _EPOCH + offset + slots * self.interval
+
+        if self.window is not None:
+            scheduled = self.move_into_window(scheduled)
+
+        if self.jitter:
+            scheduled += self.jitter * random.random()
+
+        return scheduled
+
+    def move_into_window(self, scheduled: datetime) -> datetime:
+        start, end = self.window
+        local = timezone.localtime(scheduled)
+
+        if start <= end:
+            in_window = start <= local.time() < end
+        else:
+            in_window = local.time() >= start or local.time() < end
+
+        if in_window:
+            return scheduled
+
+        window_start = timezone.make_aware(datetime.combine(local.date(), start))
+        if window_start <= scheduled:
+            window_start = timezone.make_aware(
+                datetime.combine(local.date() + timedelta(days=1), start)
+            )
+
+        # Spread tasks moved into the same window across it, rather than starting them all at once
+        length = datetime.combine(local.date(), end) - datetime.combine(
+            local.date(), start
+        )
+        length %= timedelta(days=1)
+
+        return window_start + length * (self.get_offset() / self.interval)
+
+    def get_catch_up_policy(self) -> CatchUpPolicy:
+        return self.catch_up or getattr(settings, "GROUNDWORK_CRON_CATCH_UP", "once")
+
+    def reschedule(self, now: datetime) -> Tuple[bool, datetime]:
+        """
+        Apply the task's catch-up policy to decide what to do with a due run.
+
+        Args:
+            now: The current time.
+
+        Returns:
+            Whether to run the task now, and when it should next run.
+        """
+
+        policy = self.get_catch_up_policy()
+
+        if policy == "all":
+            return True, self.get_scheduled_time(self.next_run)
+
+        if policy == "skip" and now - self.next_run > MISFIRE_GRACE:
+            return False, self.get_scheduled_time(now)
+
+        return True, self.get_scheduled_time(now)
+
+
+_tasks: Dict[str, CronTask] = {}
+_EPOCH = timezone.make_aware(datetime(1970, 1, 1), timezone.get_fixed_timezone(0))
+
+
+MISFIRE_GRACE = timedelta(minutes=5)
+"""
+Time a run may be overdue by before the `"skip"` catch-up policy skips it.
+"""
+
+
+def register_cron(
+    fn: Callable[[], None],
+    interval: timedelta,
+    name: Optional[str] = None,
+    catch_up: Optional[CatchUpPolicy] = None,
+    offset: Optional[timedelta] = None,
+    jitter: Optional[timedelta] = None,
+    window: Optional[Tuple[time, time]] = None,
+    upstream: Optional[str] = None,
+) -> CronTask:
     """
     Registers a cron task to run at a specified interval.
 
@@ -15,22 +269,1058 @@ def register_cron(fn: Callable[[], None], interval: timedelta) -> None:
     Args:
         fn: Function implementing the cron task.
         interval: Interval to run the cron task at.
+        name: Stable name identifying the task. Defaults to the dotted path of `fn`. Registering a task with the same
+            name as an existing task replaces it.
+        catch_up: How to handle runs that were missed while no process was running cron tasks: `"once"`, `"skip"`
+            or `"all"`.
+        offset: Phase of the task's schedule within its interval. Defaults to an offset derived from the task's name.
+        jitter: Maximum random delay added to each scheduled run.
+        window: Time of day, in the current timezone, that the task may start between. For example,
+            `(time(2), time(4))`.
+        upstream: Name of the service the task talks to, used to limit how many tasks hit the same service at once.
+
+    Returns:
+        The registered task.
+    """
+
+    now = timezone.now()
+    task = CronTask(
+        name=name or _get_task_name(fn),
+        fn=fn,
+        interval=interval,
+        next_run=now,
+        catch_up=catch_up,
+        offset=offset,
+        jitter=jitter,
+        window=window,
+        upstream=upstream,
+    )
+    task.next_run = task.get_scheduled_time(now)
+    _tasks[task.name] = task
+
+    return task
+
+
+def get_cron_tasks() -> List[CronTask]:
+    """
+    Returns:
+        Every registered cron task.
+    """
+
+    return list(_tasks.values())
+
+
+class CronLock(metaclass=ABCMeta):
+    """
+    Abstract interface for stopping a cron task from running in more than one process at the same time.
+
+    Locks are acquired by the process running a task and held until the task completes. Implementations must release
+    locks held by processes that crash.
+    """
+
+    @abstractmethod
+    def acquire(self, name: str) -> Optional[Any]:
+        """
+        Try to acquire the lock for a task without blocking.
+
+        Args:
+            name: Name of the task.
+
+        Returns:
+            A token to pass to `release()` if the lock was acquired, otherwise `None`.
+        """
+
+    @abstractmethod
+    def release(self, name: str, token: Any) -> None:
+        """
+        Release a lock acquired by `acquire()`.
+
+        Args:
+            name: Name of the task.
+            token: Token returned by `acquire()`.
+        """
+
+
+class CacheLock(CronLock):
+    """
+    Lock held as a lease in the Django cache.
+
+    The lease is renewed in the background while the task runs. If the process holding the lock crashes, the lease
+    expires and another process can acquire the lock.
+
+    The cache must be shared between processes and support atomic `add()`, as redis, memcached and the database cache
+    do.
+    """
+
+    def __init__(
+        self, lease: timedelta = timedelta(minutes=5), cache_alias: str = "default"
+    ) -> None:
+        """
+        Args:
+            lease: Time after which the lock is released if its holder stops renewing it.
+            cache_alias: Cache to hold the lock in.
+        """
+
+        self.cache_alias = cache_alias
+        self.lease = lease
+        self.renewals: Dict[str, threading.Event] = {}
+
+    def acquire(self, name: str) -> Optional[Any]:
+        token = uuid.uuid4().hex
+        key = self.get_key(name)
+
+        if not caches[self.cache_alias].add(key, token, self.lease.total_seconds()):
+            return None
+
+        stop = threading.Event()
+        self.renewals[token] = stop
+        threading.Thread(
+            target=self.renew, args=(key, token, stop), daemon=True
+        ).start()
+
+        return token
+
+    def release(self, name: str, token: Any) -> None:
+        stop = self.renewals.pop(token, None)
+        if stop is not None:
+            stop.set()
+
+        cache = caches[self.cache_alias]
+        key = self.get_key(name)
+
+        if cache.get(key) == token:
+            cache.delete(key)
+
+    def renew(self, key: str, token: str, stop: threading.Event) -> None:
+        cache = caches[self.cache_alias]
+
+        while not stop.wait(self.lease.total_seconds() / 3):
+            if cache.get(key) != token:
+                logging.warning("Lost cron lock %s before the task completed", key)
+                return
+
+            cache.touch(key, self.lease.total_seconds())
+
+    def get_key(self, name: str) -> str:
+        return f"groundwork.cron.{name}.lock"
+
+
+class AdvisoryLock(CronLock):
+    """
+    Lock held as a PostgreSQL session-level advisory lock.
+
+    The lock is held by the database connection of the thread running the task, so PostgreSQL releases it
+    automatically if the process holding it crashes or loses its connection.
+    """
+
+    def __init__(self, using: str = "default") -> None:
+        """
+        Args:
+            using: Alias of the PostgreSQL database to hold the lock in.
+        """
+
+        self.using = using
+
+    def acquire(self, name: str) -> Optional[Any]:
+        connection = connections[self.using]
+        if connection.vendor != "postgresql":
+            raise ImproperlyConfigured("AdvisoryLock requires a PostgreSQL database")
+
+        key = self.get_key(name)
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", [key])
+            (acquired,) = cursor.fetchone()
+
+        return key if acquired else None
+
+    def release(self, name: str, token: Any) -> None:
+        with connections[self.using].cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [token])
+
+    def get_key(self, name: str) -> int:
+        digest = hashlib.blake2b(f"groundwork.cron.{name}".encode(), digest_size=8)
+        return int.from_bytes(digest.digest(), "big", signed=True)
+
+
+_configured_lock: Any = False
+
+
+def get_cron_lock() -> Optional[CronLock]:
+    """
+    Returns:
+        The lock configured in `settings.GROUNDWORK_CRON_LOCK`, or `None` if cron tasks are not coordinated between
+        processes.
+    """
+
+    global _configured_lock
+
+    if _configured_lock is False:
+        config = getattr(settings, "GROUNDWORK_CRON_LOCK", None)
+
+        if isinstance(config, str):
+            config = {"class": config}
+
+        if config is None or isinstance(config, CronLock):
+            _configured_lock = config
+        else:
+            kwargs = dict(config)
+            _configured_lock = import_string(kwargs.pop("class"))(**kwargs)
+
+    return _configured_lock
+
+
+@receiver(setting_changed)
+def _reset_cron_lock(setting: str, **kwargs: Any) -> None:
+    global _configured_lock
+
+    if setting == "GROUNDWORK_CRON_LOCK":
+        _configured_lock = False
+
+
+def run_cron_task(name: str, scheduled_time: Optional[datetime] = None) -> None:
+    """
+    Run a registered cron task immediately in the current thread.
+
+    Database connections are cleaned up before and after the task, as Django does for each request. Errors raised by
+    the task are logged rather than raised, so that one failing task doesn't interrupt the others.
+
+    If a cron lock is configured, the task is skipped if it is already running in another process.
+
+    Each run is recorded as a `CronTaskRun` and exported to the configured metrics exporters.
+
+    Args:
+        name: Name of the task to run.
+        scheduled_time: Time the run was scheduled for, used to measure how late it started.
+    """
+
+    task = _tasks[name]
+    lock = get_cron_lock()
+    token = None
+    from groundwork.core.models import CronTaskRun
+
+    run = None
+    close_old_connections()
+
+    try:
+        if lock is not None:
+            token = lock.acquire(name)
+            if token is None:
+                logging.info("Cron task %s is running elsewhere. Skipping.", name)
+                record_skipped_run(name, scheduled_time, "Running in another process")
+                return
+
+        run = _start_run(name, scheduled_time)
+        logging.info("Running cron task %s", name)
+        task.fn()
+    except Exception:
+        logging.exception("Cron task %s failed", name)
+        _finish_run(run, task, CronTaskRun.Outcome.FAILED, traceback.format_exc())
+    else:
+        _finish_run(run, task, CronTaskRun.Outcome.SUCCEEDED)
+    finally:
+        if token is not None:
+            try:
+                lock.release(name, token)
+            except Exception:
+                logging.exception("Failed to release cron lock for %s", name)
+
+        close_old_connections()
+
+
+def record_skipped_run(
+    name: str, scheduled_time: Optional[datetime], reason: str
+) -> None:
+    """
+    Record that a scheduled run of a cron task was skipped.
+
+    Args:
+        name: Name of the task.
+        scheduled_time: Time the run was scheduled for.
+        reason: Why the run was skipped.
+    """
+    from groundwork.core.models import CronTaskRun
+
+    now = timezone.now()
+
+    try:
+        CronTaskRun.objects.create(
+            task_name=name,
+            scheduled_time=scheduled_time,
+            start_time=now,
+            end_time=now,
+            outcome=CronTaskRun.Outcome.SKIPPED,
+            exception=reason,
+        )
+    except Exception:
+        logging.exception("Failed to record skipped run of cron task %s", name)
+
+    metrics.export_metrics([Metric("cron.skipped", 1, "counter", {"task": name})])
+
+
+HISTORY_RETENTION = timedelta(days=30)
+"""
+Default time to keep `CronTaskRun` records for. Override with `settings.GROUNDWORK_CRON_HISTORY_RETENTION`.
+"""
+
+
+def _start_run(
+    name: str, scheduled_time: Optional[datetime]
+) -> Optional["CronTaskRun"]:
+    from groundwork.core.models import CronTaskRun
+
+    now = timezone.now()
+
+    try:
+        return CronTaskRun.objects.create(
+            task_name=name,
+            scheduled_time=scheduled_time,
+            start_time=now,
+            lag=(now - scheduled_time).total_seconds() if scheduled_time else None,
+        )
+    except Exception:
+        logging.exception("Failed to record run of cron task %s", name)
+        return None
+
+
+def _finish_run(
+    run: Optional["CronTaskRun"], task: CronTask, outcome: str, exception: str = ""
+) -> None:
+    from groundwork.core.models import CronTaskRun
+
+    if run is None:
+        return
+
+    run.end_time = timezone.now()
+    run.duration = (run.end_time - run.start_time).total_seconds()
+    run.outcome = outcome
+    run.exception = exception
+
+    labels = {"task": task.name}
+    measurements = [
+        Metric("cron.duration", run.duration, "timer", labels),
+        Metric(f"cron.{outcome}", 1, "counter", labels),
+    ]
+    if run.lag is not None:
+        measurements.append(Metric("cron.lag", run.lag, "timer", labels))
+    if run.duration > task.interval.total_seconds():
+        measurements.append(Metric("cron.overruns", 1, "counter", labels))
+
+    retention = getattr(
+        settings, "GROUNDWORK_CRON_HISTORY_RETENTION", HISTORY_RETENTION
+    )
+
+    try:
+        run.save()
+        CronTaskRun.objects.filter(
+            task_name=task.name, start_time__lt=run.end_time - retention
+        ).delete()
+    except Exception:
+        logging.exception("Failed to record run of cron task %s", task.name)
+
+    metrics.export_metrics(measurements)
+
+
+class CronExecutor(metaclass=ABCMeta):
+    """
+    Abstract interface for running due cron tasks.
+    """
+
+    @abstractmethod
+    def submit(self, task: CronTask, scheduled_time: Optional[datetime] = None) -> bool:
+        """
+        Start running a task, unless it is already running.
+
+        Args:
+            task: The task to run.
+            scheduled_time: Time the run was scheduled for.
+
+        Returns:
+            True if the task was started.
+        """
+
+    def is_available(self, task: CronTask) -> bool:
+        """
+        Args:
+            task: A task that is due to run.
+
+        Returns:
+            False if the task should wait until other tasks have finished before being submitted.
+        """
+
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for submitted tasks to finish.
+
+        Args:
+            timeout: Maximum number of seconds to wait.
+
+        Returns:
+            True if all submitted tasks have finished.
+        """
+
+        return True
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop accepting tasks and release any workers. Tasks that have been submitted but not started are cancelled.
+
+        Args:
+            wait: Wait for running tasks to finish.
+        """
+
+
+class InlineExecutor(CronExecutor):
+    """
+    Runs each task to completion in the calling thread, one after another.
+    """
+
+    def submit(self, task: CronTask, scheduled_time: Optional[datetime] = None) -> bool:
+        run_cron_task(task.name, scheduled_time)
+        return True
+
+
+class PoolExecutor(CronExecutor):
+    """
+    Runs tasks concurrently on a bounded pool of worker threads or processes.
+
+    A task is never run twice concurrently: if a task is still running when it next becomes due, that run is skipped.
+
+    The number of tasks with the same upstream that run at once is also limited, by default to one. Limits for
+    specific upstreams can be set in `settings.GROUNDWORK_CRON_UPSTREAM_LIMITS`, for example
+    `{"members-api.parliament.uk": 2}`. Tasks over the limit wait until a running task finishes.
+
+    Each worker uses its own database connections. Worker processes are forked from the current process, so can run
+    any registered task. As forked processes must not share database connections with their parent, the parent's
+    connections are closed before each task is submitted to a process pool.
+
+    On shutdown, tasks that are waiting for a free worker are cancelled. Their runs are recorded as skipped, and their
+    schedules moved back so that the next clock process runs them straight away.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        processes: bool = False,
+        upstream_limits: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """
+        Args:
+            max_workers: Maximum number of tasks to run at once.
+            processes: Run tasks in worker processes rather than threads.
+            upstream_limits: Maximum number of tasks to run at once for each upstream. Defaults to
+                `settings.GROUNDWORK_CRON_UPSTREAM_LIMITS`.
+        """
+
+        self.processes = processes
+        self.upstream_limits = (
+            getattr(settings, "GROUNDWORK_CRON_UPSTREAM_LIMITS", {})
+            if upstream_limits is None
+            else upstream_limits
+        )
+        self.running: Dict[str, Future] = {}
+        self.scheduled_times: Dict[str, Optional[datetime]] = {}
+        self.lock = threading.Lock()
+        self.finished = threading.Condition(self.lock)
+
+        self.pool: Executor
+        if processes:
+            self.pool = ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context("fork")
+            )
+        else:
+            self.pool = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="groundwork-cron"
+            )
+
+    def submit(self, task: CronTask, scheduled_time: Optional[datetime] = None) -> bool:
+        with self.lock:
+            running = task.name in self.running
+
+            if not running:
+                if self.processes:
+                    connections.close_all()
+
+                future = self.pool.submit(self.get_runner(), task.name, scheduled_time)
+                self.running[task.name] = future
+                self.scheduled_times[task.name] = scheduled_time
+
+        if running:
+            logging.warning(
+                "Cron task %s is still running. Skipping this run.", task.name
+            )
+            record_skipped_run(task.name, scheduled_time, "Still running")
+            return False
+
+        future.add_done_callback(lambda _: self._complete(task.name))
+        return True
+
+    def get_runner(self) -> Callable[[str, Optional[datetime]], Any]:
+        """
+        Returns:
+            Function called by the pool to run a task.
+        """
+
+        return run_cron_task
+
+    def is_available(self, task: CronTask) -> bool:
+        if task.upstream is None:
+            return True
+
+        with self.lock:
+            running = sum(
+                1
+                for name in self.running
+                if name in _tasks and _tasks[name].upstream == task.upstream
+            )
+
+        return running < self.upstream_limits.get(task.upstream, 1)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        # Tasks are removed from `running` by a done callback, which runs after the future's waiters are notified
+        with self.finished:
+            return self.finished.wait_for(lambda: not self.running, timeout)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self.lock:
+            submitted = [
+                (name, future, self.scheduled_times.get(name))
+                for name, future in self.running.items()
+            ]
+
+        # Cancelling a future calls its done callbacks, which take the lock
+        for name, future, scheduled_time in submitted:
+            if future.cancel():
+                _release_cancelled_run(name, scheduled_time)
+
+        self.pool.shutdown(wait=wait)
+
+    def _complete(self, name: str) -> None:
+        with self.lock:
+            self.running.pop(name, None)
+            self.scheduled_times.pop(name, None)
+            self.finished.notify_all()
+
+        # Let the clock submit any tasks that were waiting for this one to finish
+        if any(task.waiting for task in get_cron_tasks()):
+            for wakeup in list(_wakeups):
+                wakeup.wake()
+
+
+def _release_cancelled_run(name: str, scheduled_time: Optional[datetime]) -> None:
+    from groundwork.core.models import CronTaskState
+
+    logging.warning("Cron task %s was cancelled by shutdown before it started", name)
+    record_skipped_run(name, scheduled_time, "Cancelled by shutdown")
+
+    task = _tasks.get(name)
+    if task is None:
+        return
+
+    # Move the schedule back so that the run isn't lost, unless another process has moved it on since it was claimed
+    next_run = scheduled_time or timezone.now()
+
+    try:
+        if CronTaskState.objects.filter(name=name, next_run=task.next_run).update(
+            next_run=next_run
+        ):
+            task.next_run = next_run
+    except Exception:
+        logging.exception("Failed to reschedule cancelled run of cron task %s", name)
+
+
+class IsolatedExecutor(PoolExecutor):
+    """
+    Runs each task in a child process, so that memory a task leaks or fragments is returned to the system when the
+    child is recycled rather than accumulating in the clock process.
+
+    Child processes are forked from the clock process and reused for several tasks. A child is recycled once it has
+    run `max_tasks_per_worker` tasks, or once its resident memory exceeds `max_worker_memory_mb`. A child that exceeds
+    the time limit is killed, and its run recorded as failed.
+
+    Run history is recorded by the child, and metrics exported by the task (including sync summaries) are passed back
+    to the clock process to export.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 1,
+        max_tasks_per_worker: Optional[int] = None,
+        max_worker_memory_mb: Optional[float] = None,
+        memory_limit_mb: Optional[float] = None,
+        time_limit: Optional[timedelta] = None,
+        upstream_limits: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """
+        Args:
+            max_workers: Maximum number of tasks to run at once.
+            max_tasks_per_worker: Recycle each child process after it has run this many tasks.
+            max_worker_memory_mb: Recycle each child process once its resident memory exceeds this many megabytes.
+            memory_limit_mb: Hard limit on the address space of each child process. Tasks that exceed it fail with
+                `MemoryError`.
+            time_limit: Kill tasks that run for longer than this.
+            upstream_limits: Maximum number of tasks to run at once for each upstream. Defaults to
+                `settings.GROUNDWORK_CRON_UPSTREAM_LIMITS`.
+        """
+
+        super().__init__(max_workers=max_workers, upstream_limits=upstream_limits)
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.max_worker_memory_mb = max_worker_memory_mb
+        self.memory_limit_mb = memory_limit_mb
+        self.time_limit = time_limit
+        self.workers: List[_ChildWorker] = []
+        self.local = threading.local()
+
+    def get_runner(self) -> Callable[[str, Optional[datetime]], Any]:
+        return self.run_in_child
+
+    def run_in_child(self, name: str, scheduled_time: Optional[datetime]) -> None:
+        worker = getattr(self.local, "worker", None)
+        if worker is None or not worker.is_alive():
+            worker = self.start_worker()
+
+        start_time = timezone.now()
+        timeout = self.time_limit.total_seconds() if self.time_limit else None
+        result = worker.run(name, scheduled_time, timeout)
+
+        if result is None:
+            reason = (
+                f"Killed after exceeding the time limit of {self.time_limit}"
+                if worker.is_alive()
+                else "Worker process exited unexpectedly"
+            )
+            logging.error("Cron task %s failed: %s", name, reason)
+            _fail_unfinished_runs(name, start_time, reason)
+            self.stop_worker(worker, kill=True)
+            return
+
+        rss_mb, measurements = result
+        metrics.export_metrics(measurements)
+
+        if (
+            self.max_tasks_per_worker is not None
+            and worker.tasks >= self.max_tasks_per_worker
+        ) or (
+            self.max_worker_memory_mb is not None and rss_mb > self.max_worker_memory_mb
+        ):
+            logging.info(
+                "Recycling cron worker after %d tasks using %.1f MB",
+                worker.tasks,
+                rss_mb,
+            )
+            self.stop_worker(worker)
+
+    def start_worker(self) -> "_ChildWorker":
+        # The child must not share this thread's database connections
+        connections.close_all()
+
+        worker = _ChildWorker(self.memory_limit_mb)
+        self.local.worker = worker
+        with self.lock:
+            self.workers.append(worker)
+
+        return worker
+
+    def stop_worker(self, worker: "_ChildWorker", kill: bool = False) -> None:
+        worker.stop(kill=kill)
+        self.local.worker = None
+        with self.lock:
+            if worker in self.workers:
+                self.workers.remove(worker)
+
+    def shutdown(self, wait: bool = True) -> None:
+        super().shutdown(wait=wait)
+
+        with self.lock:
+            workers = list(self.workers)
+            self.workers.clear()
+
+        for worker in workers:
+            worker.stop()
+
+
+class _ChildWorker:
+    def __init__(self, memory_limit_mb: Optional[float]) -> None:
+        context = multiprocessing.get_context("fork")
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(
+            target=_run_child_worker,
+            args=(child_connection, memory_limit_mb),
+            daemon=True,
+        )
+        self.process.start()
+        child_connection.close()
+        self.tasks = 0
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def run(
+        self, name: str, scheduled_time: Optional[datetime], timeout: Optional[float]
+    ) -> Optional[Tuple[float, List[Metric]]]:
+        self.tasks += 1
+
+        try:
+            self.connection.send((name, scheduled_time))
+            if not self.connection.poll(timeout):
+                return None
+
+            return self.connection.recv()
+        except (EOFError, OSError):
+            return None
+
+    def stop(self, kill: bool = False) -> None:
+        if self.process.is_alive() and not kill:
+            try:
+                self.connection.send(None)
+            except OSError:
+                pass
+
+            self.process.join(5)
+
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+
+        self.connection.close()
+
+
+def _run_child_worker(connection: Any, memory_limit_mb: Optional[float]) -> None:
+    if memory_limit_mb is not None and resource is not None:
+        limit = int(memory_limit_mb * 1024 * 1024)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    # Signals sent to the clock's process group are handled by the clock, which stops children once their tasks finish
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+
+    try:
+        for name, scheduled_time in iter(connection.recv, None):
+            with metrics.capturing() as measurements:
+                run_cron_task(name, scheduled_time)
+
+            connection.send((get_rss_mb(), measurements))
+    except EOFError:
+        pass
+    finally:
+        connections.close_all()
+
+
+def _fail_unfinished_runs(name: str, since: datetime, reason: str) -> None:
+    from groundwork.core.models import CronTaskRun
+
+    now = timezone.now()
+
+    try:
+        for run in CronTaskRun.objects.filter(
+            task_name=name, outcome=CronTaskRun.Outcome.RUNNING, start_time__gte=since
+        ):
+            run.end_time = now
+            run.duration = (now - run.start_time).total_seconds()
+            run.outcome = CronTaskRun.Outcome.FAILED
+            run.exception = reason
+            run.save()
+    except Exception:
+        logging.exception("Failed to record run of cron task %s", name)
+
+    metrics.export_metrics([Metric("cron.failed", 1, "counter", {"task": name})])
+
+
+def get_rss_mb() -> float:
+    """
+    Returns:
+        The resident set size of the current process in megabytes. Where this can't be measured, the peak resident set
+        size is returned instead.
     """
-    schedule.every(interval=interval.total_seconds()).seconds.do(fn)
 
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            pages = int(statm.read().split()[1])
+
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        pass
+
+    if resource is None:
+        return 0.0
+
+    # Linux reports this in kilobytes
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
 
-def run_pending_cron_tasks(all: bool = False) -> None:
+
+def run_pending_cron_tasks(
+    all: bool = False,
+    executor: Optional[CronExecutor] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> None:
     """
     Runs all pending cron tasks then returns.
 
+    Schedules are loaded from the database first. Each due task is claimed by moving its schedule on, so that if
+    several processes call this at once, only one of them runs the task.
+
     You usually won't want to call this – unless yu are implementing a custom clock process. In general, you'll want
     the management command `run_pending_cron_tasks`, which calls this for you on a loop.
 
     Args:
         all: Run all tasks regardless of whether they're scheduled
+        executor: Executor used to run the tasks. By default, tasks are run one after another in the calling thread.
+            If the executor runs tasks concurrently, this returns once they have been started.
+        should_stop: Checked before claiming each task. If it returns True, the remaining tasks are left due and this
+            returns early.
     """
 
-    if all:
-        schedule.run_all()
-    else:
-        schedule.run_pending()
+    executor = executor or InlineExecutor()
+    tasks = get_cron_tasks()
+    load_cron_state(tasks)
+    now = timezone.now()
+
+    for task in tasks:
+        if should_stop is not None and should_stop():
+            return
+
+        task.waiting = False
+        scheduled_time = None if all else task.next_run
+
+        if all:
+            run, next_run = True, task.get_scheduled_time(now)
+        elif task.is_due(now):
+            run, next_run = task.reschedule(now)
+        else:
+            continue
+
+        if run and not executor.is_available(task):
+            # Leave the task due, so that it runs once the executor has capacity
+            task.waiting = True
+            continue
+
+        if not _claim_cron_task(task, now, run, next_run, force=all):
+            continue
+
+        if run:
+            executor.submit(task, scheduled_time)
+        else:
+            logging.info(
+                "Skipped missed runs of cron task %s. Next run at %s",
+                task.name,
+                next_run,
+            )
+
+
+def load_cron_state(tasks: List[CronTask]) -> None:
+    """
+    Update the schedule of cron tasks from the database, recording the schedule of any new tasks. Tasks whose interval,
+    offset or window has changed since their next run was recorded are rescheduled.
+
+    Args:
+        tasks: The tasks to update.
+    """
+    from groundwork.core.models import CronTaskState
+
+    states = CronTaskState.objects.in_bulk(
+        [task.name for task in tasks], field_name="name"
+    )
+    new_states = []
+    now = timezone.now()
+
+    for task in tasks:
+        state = states.get(task.name)
+        schedule = task.get_schedule_signature()
+
+        if state is None:
+            new_states.append(
+                CronTaskState(name=task.name, next_run=task.next_run, schedule=schedule)
+            )
+            continue
+
+        task.last_run = state.last_run
+        task.next_run = state.next_run
+
+        if state.schedule != schedule:
+            _reschedule_changed_task(task, state, schedule, now)
+
+    # Another process may record the same task at the same time. If so, the losing process picks up the winner's
+    # schedule the next time it loads state.
+    CronTaskState.objects.bulk_create(new_states, ignore_conflicts=True)
+
+
+def _reschedule_changed_task(
+    task: CronTask, state: "CronTaskState", schedule: str, now: datetime
+) -> None:
+    from groundwork.core.models import CronTaskState
+
+    # Runs that are already due still go ahead. Schedules recorded before signatures were stored are kept as they are.
+    next_run = state.next_run
+    if state.schedule and next_run > now:
+        next_run = task.get_scheduled_time(now)
+
+    # Only one process records the new schedule. Any others pick it up the next time they load state.
+    if CronTaskState.objects.filter(name=task.name, schedule=state.schedule).update(
+        schedule=schedule, next_run=next_run
+    ):
+        task.next_run = next_run
+
+
+def _claim_cron_task(
+    task: CronTask, now: datetime, run: bool, next_run: datetime, force: bool
+) -> bool:
+    from groundwork.core.models import CronTaskState
+
+    state = CronTaskState.objects.filter(name=task.name)
+
+    # Only one process can move the schedule on from the time it last loaded. Any others have lost the race.
+    if not force:
+        state = state.filter(next_run=task.next_run)
+
+    updates: Dict[str, Any] = {"next_run": next_run}
+    if run:
+        updates["last_run"] = now
+
+    if not state.update(**updates):
+        return False
+
+    task.next_run = next_run
+    if run:
+        task.last_run = now
+
+    return True
+
+
+def get_next_run_time() -> Optional[datetime]:
+    """
+    Returns:
+        The time the next registered cron task is due, as of the last call to `run_pending_cron_tasks()`. Tasks
+        waiting for capacity are ignored, as executors wake the clock when they finish a task.
+    """
+
+    return min(
+        (task.next_run for task in get_cron_tasks() if not task.waiting), default=None
+    )
+
+
+NOTIFY_CHANNEL = "groundwork_cron"
+"""
+PostgreSQL channel used to wake clock processes.
+"""
+
+
+def notify_cron(task: Union[str, Callable[[], None], None] = None) -> None:
+    """
+    Wake clock processes so that they check for due tasks immediately.
+
+    In-process clocks are always woken. With PostgreSQL, clock processes in other processes and containers are woken
+    when the current transaction commits.
+
+    Args:
+        task: Name or function of a task to run as soon as possible, rather than at its next scheduled time.
+    """
+    from groundwork.core.models import CronTaskState
+
+    using = router.db_for_write(CronTaskState)
+
+    if task is not None:
+        name = task if isinstance(task, str) else _get_task_name(task)
+        CronTaskState.objects.using(using).update_or_create(
+            name=name, defaults={"next_run": timezone.now()}
+        )
+
+    for wakeup in list(_wakeups):
+        wakeup.wake()
+
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, '')", [NOTIFY_CHANNEL])
+
+
+_wakeups: List["CronWakeup"] = []
+
+
+class CronWakeup:
+    """
+    Lets a clock process sleep until its next task is due, while still being woken early by `notify_cron()`.
+
+    Wakeups from the current process are delivered through a pipe, so `wake()` is safe to call from signal handlers.
+    With PostgreSQL, a dedicated connection also listens for notifications from other processes.
+    """
+
+    def __init__(self) -> None:
+        from groundwork.core.models import CronTaskState
+
+        self.read_fd, self.write_fd = os.pipe()
+        os.set_blocking(self.read_fd, False)
+        os.set_blocking(self.write_fd, False)
+
+        self.listener: Any = None
+        using = router.db_for_write(CronTaskState)
+
+        if connections[using].vendor == "postgresql":
+            # Use a connection of our own, so that running tasks can't close it
+            self.listener = connections.create_connection(using)
+            self.listener.ensure_connection()
+            self.listener.set_autocommit(True)
+
+            with self.listener.cursor() as cursor:
+                cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+
+        _wakeups.append(self)
+
+    def wake(self) -> None:
+        try:
+            os.write(self.write_fd, b"\0")
+        except BlockingIOError:
+            # The pipe is full of wakeups that haven't been handled yet
+            pass
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        """
+        Sleep until woken, or until a timeout elapses.
+
+        Args:
+            timeout: Maximum number of seconds to sleep for, or `None` to sleep until woken.
+
+        Returns:
+            True if woken before the timeout elapsed.
+        """
+
+        fds: List[Any] = [self.read_fd]
+        if self.listener is not None:
+            fds.append(self.listener.connection)
+
+        ready, _, _ = select.select(
+            fds, [], [], None if timeout is None else max(timeout, 0)
+        )
+
+        if self.read_fd in ready:
+            try:
+                while os.read(self.read_fd, 512):
+                    pass
+            except BlockingIOError:
+                pass
+
+        if self.listener is not None:
+            self.listener.connection.poll()
+            self.listener.connection.notifies.clear()
+
+        return bool(ready)
+
+    def close(self) -> None:
+        if self in _wakeups:
+            _wakeups.remove(self)
+
+        if self.listener is not None:
+            self.listener.close()
+
+        os.close(self.read_fd)
+        os.close(self.write_fd)
+
+
+def _get_task_name(fn: Callable[[], None]) -> str:
+    owner = getattr(fn, "__self__", None)
+    if isinstance(owner, type):
+        return f"{owner.__module__}.{owner.__qualname__}.{fn.__name__}"
+
+    return f"{fn.__module__}.{fn.__qualname__}"
@@ -6,6 +6,7 @@ from typing import (
     Iterable,
     List,
     Optional,
+    Tuple,
     Type,
     TypeVar,
     cast,
@@ -13,10 +14,12 @@ from typing import (
 
 import dataclasses
 import uuid
+import zlib
 from abc import ABCMeta, abstractmethod
-from dataclasses import dataclass
-from datetime import timedelta
+from dataclasses import dataclass, field
+from datetime import time, timedelta
 from io import BytesIO
+from urllib.parse import urlparse
 
 import requests
 from django.db import models
@@ -24,11 +27,95 @@ from rest_framework import parsers, serializers
 from rest_framework_dataclasses.field_utils import get_type_info
 from rest_framework_dataclasses.serializers import DataclassSerializer
 
-from groundwork.core.cron import register_cron
+from groundwork.core import metrics
+from groundwork.core.cron import notify_cron, register_cron
+from groundwork.core.metrics import SyncSummary
+from groundwork.core.stale import StalePolicy
 
 ResourceT = TypeVar("ResourceT")
 
 
+class ResourceNotFound(OSError):
+    """
+    Raised by a datasource's `get()` method when the requested resource does not exist, for example because it has
+    been deleted upstream.
+    """
+
+
+@dataclass
+class SyncPartition:
+    """
+    A slice of a datasource that can be synced independently of, and in parallel with, the other slices.
+    """
+
+    index: int
+    """
+    Position of this partition, counting from zero.
+    """
+
+    count: int
+    """
+    Total number of partitions the datasource has been split into.
+    """
+
+    query: Dict[str, Any] = field(default_factory=dict)
+    """
+    Keyword arguments passed to the datasource's `list()` method to fetch this partition.
+    """
+
+    by_hash: bool = False
+    """
+    If true, every partition lists the whole datasource and only keeps resources whose identifier hashes into this
+    partition. Used for datasources that can't be split remotely. This spreads database work, but not network work,
+    across workers.
+    """
+
+    def includes(self, identifier: Any) -> bool:
+        """
+        Return whether a resource belongs in this partition.
+
+        Args:
+            identifier: The resource's identifier.
+
+        Returns:
+            True if the resource should be synced by this partition.
+        """
+
+        if not self.by_hash:
+            return True
+
+        return zlib.crc32(str(identifier).encode()) % self.count == self.index
+
+
+def offset_partitions(
+    total: int, count: int, offset_param: str, stop_param: str = "stop"
+) -> List[SyncPartition]:
+    """
+    Split a datasource paginated by offset into contiguous ranges.
+
+    Args:
+        total: Total number of resources in the datasource.
+        count: Maximum number of partitions to return.
+        offset_param: Query param that the datasource's `list()` method uses as the starting offset.
+        stop_param: Query param that the datasource's `list()` method uses to stop before an offset.
+
+    Returns:
+        Partitions covering every offset in the datasource.
+    """
+
+    size = max(1, -(-total // max(count, 1)))
+    count = max(1, -(-total // size))
+
+    return [
+        SyncPartition(
+            index=i,
+            count=count,
+            query={offset_param: i * size, stop_param: min((i + 1) * size, total)},
+        )
+        for i in range(count)
+    ]
+
+
 class Datasource(Generic[ResourceT], metaclass=ABCMeta):
     """
     Abstract interface for reading from an external resource.
@@ -64,6 +151,22 @@ class Datasource(Generic[ResourceT], metaclass=ABCMeta):
     def get_id(self, resource):
         return getattr(resource, self.identifer)
 
+    def get_partitions(self, count: int) -> List[SyncPartition]:
+        """
+        Split this datasource into partitions that can be synced in parallel.
+
+        The default implementation partitions resources by a hash of their identifier. Override this if the remote API
+        supports fetching part of the datasource, for example by offset.
+
+        Args:
+            count: Maximum number of partitions to return.
+
+        Returns:
+            Partitions that, taken together, cover every resource in the datasource.
+        """
+
+        return [SyncPartition(index=i, count=count, by_hash=True) for i in range(count)]
+
 
 class MockDatasource(Datasource[ResourceT]):
     """
@@ -82,7 +185,10 @@ class MockDatasource(Datasource[ResourceT]):
         return self.data
 
     def get(self, id: str) -> ResourceT:
-        return next(x for x in self.data if getattr(x, self.identifer) == id)
+        try:
+            return next(x for x in self.data if getattr(x, self.identifer) == id)
+        except StopIteration:
+            raise ResourceNotFound(id)
 
 
 class RestDatasource(Datasource[ResourceT]):
@@ -195,6 +301,9 @@ class RestDatasource(Datasource[ResourceT]):
             id: External identifier for the fetched resource
             **kwargs: Query params passed to the API call.
 
+        Raises:
+            ResourceNotFound: If the resource does not exist.
+
         Returns:
             A resource instance representing the remote datasource.
         """
@@ -250,12 +359,14 @@ class RestDatasource(Datasource[ResourceT]):
 
         """
 
-        serializer = self.serializer_class(data=data)
+        with metrics.phase("deserialize"):
+            serializer = self.serializer_class(data=data)
 
-        if not serializer.is_valid():
-            errors = serializer.errors.items()
-            raise TypeError("; ".join(f"{key}: {str(err)}" for key, err in errors))
+            if not serializer.is_valid():
+                errors = serializer.errors.items()
+                raise TypeError("; ".join(f"{key}: {str(err)}" for key, err in errors))
 
+        metrics.incr("rows_deserialized")
         return cast(ResourceT, serializer.validated_data)
 
     def fetch_url(self, url: str, query: Dict[str, Any]) -> Any:
@@ -271,6 +382,7 @@ class RestDatasource(Datasource[ResourceT]):
             query: Query params passed to the GET request.
 
         Raises:
+            ResourceNotFound: If the server response has a 404 status code.
             OSError: If the server response does not have a 2xx status code.
 
         Returns:
@@ -278,16 +390,24 @@ class RestDatasource(Datasource[ResourceT]):
 
         """
 
-        res: requests.Response = requests.get(
-            url, params=query, headers=self.get_headers()
-        )
+        with metrics.phase("fetch"):
+            res: requests.Response = requests.get(
+                url, params=query, headers=self.get_headers()
+            )
+
+        metrics.incr("pages_fetched")
+        metrics.incr("bytes_fetched", len(res.content))
+
+        if res.status_code == 404:
+            raise ResourceNotFound(f"{url}: http 404")
 
         if not res.ok:
             raise OSError(f"{url}: http {res.status_code}")
 
-        return self.parser.parse(
-            BytesIO(res.content), media_type=res.headers.get("content-type")
-        )
+        with metrics.phase("deserialize"):
+            return self.parser.parse(
+                BytesIO(res.content), media_type=res.headers.get("content-type")
+            )
 
     def paginate(self, **query: Dict[str, Any]) -> Iterable[ResourceT]:
         """
@@ -344,6 +464,74 @@ class SyncConfig:
     populate when referenced by another synced model, or `sync()` is explicitly called.
     """
 
+    sync_offset: Optional[timedelta] = None
+    """
+    Phase of the sync schedule within `sync_interval`. Defaults to an offset derived from the model's name, so that
+    models with the same interval don't all sync at once.
+    """
+
+    sync_jitter: Optional[timedelta] = None
+    """
+    Maximum random delay added to each scheduled sync.
+    """
+
+    sync_window: Optional[Tuple[time, time]] = None
+    """
+    Time of day, in the current timezone, that scheduled syncs may start between. For example, `(time(2), time(4))`.
+    """
+
+    upstream: Optional[str] = None
+    """
+    Name of the service the datasource fetches from, used to limit how many syncs hit the same service at once.
+    Defaults to the hostname of the datasource's `base_url`, if it has one.
+    """
+
+    stale_policy: Optional[StalePolicy] = None
+    """
+    What to do with local rows whose resource is no longer returned by the datasource. Applied after each successful
+    full sync, but never after partial syncs such as `SyncedModel.sync_ids()`.
+
+    If not provided, stale rows are kept.
+    """
+
+    partitions: Optional[List[Dict[str, Any]]] = None
+    """
+    Queries passed to the datasource's `list()` method to split it into partitions when calling `sync_partitioned()`.
+    For example, a list of Airtable views or `filterByFormula` buckets.
+
+    If not provided, the datasource decides how to partition itself.
+    """
+
+    def get_upstream(self) -> Optional[str]:
+        """
+        Returns:
+            Name of the service the datasource fetches from, if known.
+        """
+
+        if self.upstream is not None:
+            return self.upstream
+
+        return urlparse(getattr(self.datasource, "base_url", "")).hostname
+
+    def get_partitions(self, count: int) -> List[SyncPartition]:
+        """
+        Return the partitions used to sync this model in parallel.
+
+        Args:
+            count: Maximum number of partitions to return. Ignored if `partitions` is provided.
+
+        Returns:
+            Partitions that, taken together, cover every resource in the datasource.
+        """
+
+        if self.partitions is None:
+            return self.datasource.get_partitions(count)
+
+        return [
+            SyncPartition(index=i, count=len(self.partitions), query=query)
+            for i, query in enumerate(self.partitions)
+        ]
+
 
 class SyncedModel(models.Model):
     """
@@ -380,13 +568,78 @@ class SyncedModel(models.Model):
 
         # Register the subclass with the cron manager
         if not cls.Meta.abstract and cls.sync_config.sync_interval is not None:
-            register_cron(cls.sync, cls.sync_config.sync_interval)
+            register_cron(
+                cls.sync,
+                cls.sync_config.sync_interval,
+                offset=cls.sync_config.sync_offset,
+                jitter=cls.sync_config.sync_jitter,
+                window=cls.sync_config.sync_window,
+                upstream=cls.sync_config.get_upstream(),
+            )
 
     @classmethod
-    def sync(cls):
+    def sync(cls) -> SyncSummary:
         """
         Synchronizes the class immediately.
+
+        Returns:
+            A summary of the sync, with counters and per-phase timings.
+        """
+        from groundwork.core.internal.sync_manager import SyncManager
+
+        return SyncManager().sync_model(cls)
+
+    @classmethod
+    def sync_partitioned(
+        cls,
+        partitions: int,
+        processes: Optional[int] = None,
+        on_progress: Optional[Callable[[Any], None]] = None,
+    ) -> SyncSummary:
+        """
+        Synchronizes the class immediately, splitting the datasource into partitions synced by parallel worker
+        processes.
+
+        Workers write to the database concurrently, so this needs a database that supports concurrent writers, such
+        as PostgreSQL. The external id field of this model, and of every synced model it refers to, must be unique, so
+        that workers creating the same related resource at the same time don't insert it twice.
+
+        Args:
+            partitions: Number of partitions to split the datasource into.
+            processes: Number of worker processes. Defaults to one per partition. If zero, partitions are synced one
+                after another in the current process.
+            on_progress: Called with a `PartitionProgress` as each partition makes progress. Defaults to logging.
+
+        Returns:
+            A summary of the sync, combining every partition.
+        """
+        from groundwork.core.internal.partitioned_sync import PartitionedSync
+
+        return PartitionedSync(
+            cls, partitions, processes=processes, on_progress=on_progress
+        ).run()
+
+    @classmethod
+    def sync_ids(cls, ids: Iterable[Any]) -> SyncSummary:
+        """
+        Synchronizes specific resources, identified by their external id, immediately.
+
+        Args:
+            ids: External identifiers of the resources to sync.
+
+        Returns:
+            A summary of the sync.
         """
         from groundwork.core.internal.sync_manager import SyncManager
 
-        SyncManager().sync_model(cls)
+        return SyncManager().sync_model_ids(cls, ids)
+
+    @classmethod
+    def request_sync(cls) -> None:
+        """
+        Asks the cron process to sync the class as soon as possible, rather than at its next scheduled sync.
+
+        The class must have a `sync_interval` configured.
+        """
+
+        notify_cron(cls.sync)
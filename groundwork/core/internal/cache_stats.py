@@ -0,0 +1,313 @@
+"""
+Hit rates, latencies and value sizes of cached functions, aggregated by cache key prefix.
+
+Collection is off by default. Set `settings.GROUNDWORK_CACHE_STATS = True` to turn it on.
+
+Measurements are accumulated in memory and flushed every `FLUSH_INTERVAL` seconds, both to the metrics exporters and
+to running totals kept in the cache, which the `cache_report` management command reads. This keeps the overhead of a
+cache hit or recompute to a few additions. Async callers flush in a worker thread, so that neither exporting metrics
+nor updating the totals blocks the event loop.
+
+Measuring the size of a value means pickling it, so sizes are only recorded for values that are pickled anyway to be
+split into chunks, unless `settings.GROUNDWORK_CACHE_STATS_SIZES = True`.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import dataclasses
+import threading
+import time
+from dataclasses import dataclass
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from groundwork.core.metrics import Metric, export_metrics
+
+FLUSH_INTERVAL = 10.0
+"""
+Seconds between flushes of accumulated measurements.
+"""
+
+STATS_KEY_PREFIX = "groundwork.cache_stats"
+
+
+@dataclass
+class CacheReport:
+    """
+    Running totals for the cached functions using a cache key prefix. Durations are in seconds.
+    """
+
+    prefix: str
+    hits: int = 0
+    misses: int = 0
+    recomputes: int = 0
+    recompute_time: float = 0.0
+    value_bytes: int = 0
+    sized: int = 0
+    lookups: int = 0
+    lookup_time: float = 0.0
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        total = self.hits + self.misses
+        return self.hits / total if total else None
+
+    @property
+    def mean_recompute_time(self) -> Optional[float]:
+        return self.recompute_time / self.recomputes if self.recomputes else None
+
+    @property
+    def mean_value_bytes(self) -> Optional[float]:
+        return self.value_bytes / self.sized if self.sized else None
+
+    @property
+    def mean_lookup_time(self) -> Optional[float]:
+        return self.lookup_time / self.lookups if self.lookups else None
+
+    @property
+    def time_saved(self) -> float:
+        """
+        Estimated time saved by caching: the time hits would have spent recomputing, less the time spent looking up
+        values in the cache.
+        """
+
+        return self.hits * (self.mean_recompute_time or 0.0) - self.lookup_time
+
+
+_FIELDS = [
+    field.name for field in dataclasses.fields(CacheReport) if field.name != "prefix"
+]
+_TIME_FIELDS = {"recompute_time", "lookup_time"}
+
+_pending: Dict[str, CacheReport] = {}
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def is_enabled() -> bool:
+    return getattr(settings, "GROUNDWORK_CACHE_STATS", False)
+
+
+def is_measuring_sizes() -> bool:
+    return getattr(settings, "GROUNDWORK_CACHE_STATS_SIZES", False)
+
+
+def record_lookup(
+    prefix: str, duration: float, hits: int, misses: int, flush: bool = True
+) -> None:
+    """
+    Record a read from the cache.
+
+    Args:
+        prefix: Cache key prefix of the cached function.
+        duration: Seconds spent reading from the cache backend.
+        hits: Number of values found.
+        misses: Number of values that had to be recomputed.
+        flush: Flush accumulated measurements if they are due. Async callers pass `False` and await `amaybe_flush()`
+            instead, so as not to block the event loop.
+    """
+
+    with _pending_lock:
+        report = _get_pending(prefix)
+        report.lookups += 1
+        report.lookup_time += duration
+        report.hits += hits
+        report.misses += misses
+
+    if flush:
+        _maybe_flush()
+
+
+def record_hit(prefix: str, flush: bool = True) -> None:
+    """
+    Record a value served without reading from the cache backend, for example from an in-process cache.
+
+    Args:
+        prefix: Cache key prefix of the cached function.
+        flush: Flush accumulated measurements if they are due.
+    """
+
+    with _pending_lock:
+        _get_pending(prefix).hits += 1
+
+    if flush:
+        _maybe_flush()
+
+
+def record_recompute(
+    prefix: str, duration: float, size: Optional[int], flush: bool = True
+) -> None:
+    """
+    Record a call to a cached function whose result was missing or expired. The mean recompute time and value size
+    since the last flush are exported as a `cache.recompute` timer and a `cache.value_size` gauge.
+
+    Args:
+        prefix: Cache key prefix of the cached function.
+        duration: Seconds spent calling the function.
+        size: Size of the pickled result in bytes, if known.
+        flush: Flush accumulated measurements if they are due.
+    """
+
+    with _pending_lock:
+        report = _get_pending(prefix)
+        report.recomputes += 1
+        report.recompute_time += duration
+        if size is not None:
+            report.value_bytes += size
+            report.sized += 1
+
+    if flush:
+        _maybe_flush()
+
+
+def flush_cache_stats() -> None:
+    """
+    Export accumulated measurements and add them to the running totals kept in the cache.
+    """
+
+    global _pending, _last_flush
+
+    with _pending_lock:
+        pending, _pending = _pending, {}
+        _last_flush = time.monotonic()
+
+    if not pending:
+        return
+
+    metrics = []
+    for prefix, report in pending.items():
+        labels = {"prefix": prefix}
+        metrics.append(Metric("cache.hits", report.hits, "counter", labels))
+        metrics.append(Metric("cache.misses", report.misses, "counter", labels))
+
+        if report.lookups:
+            metrics.append(
+                Metric("cache.lookup_time", report.mean_lookup_time, "gauge", labels)
+            )
+
+        if report.recomputes:
+            metrics.append(
+                Metric("cache.recompute", report.mean_recompute_time, "timer", labels)
+            )
+
+        if report.sized:
+            metrics.append(
+                Metric("cache.value_size", report.mean_value_bytes, "gauge", labels)
+            )
+
+        for name in _FIELDS:
+            value = getattr(report, name)
+            if name in _TIME_FIELDS:
+                # cache.incr() only accepts integers
+                value = round(value * 1_000_000)
+
+            if value:
+                _incr(_get_stats_key(prefix, name), value)
+
+    export_metrics(metrics)
+
+    for prefix in pending:
+        _register_prefix(prefix)
+
+
+def get_cache_reports() -> List[CacheReport]:
+    """
+    Returns:
+        Running totals for every cache key prefix with recorded measurements, ranked by the estimated time saved by
+        caching.
+    """
+
+    reports = []
+
+    for prefix in _get_prefixes():
+        keys = {_get_stats_key(prefix, name): name for name in _FIELDS}
+        values: Dict[str, Any] = {
+            keys[key]: value for key, value in cache.get_many(list(keys)).items()
+        }
+
+        for name in _TIME_FIELDS:
+            values[name] = values.get(name, 0) / 1_000_000
+
+        reports.append(CacheReport(prefix, **values))
+
+    return sorted(reports, key=lambda report: report.time_saved, reverse=True)
+
+
+def reset_cache_stats() -> None:
+    """
+    Clear the running totals kept in the cache.
+    """
+
+    count = cache.get(_get_stats_key(None, "prefix_count"), 0)
+    cache.delete_many(
+        [
+            _get_stats_key(prefix, name)
+            for prefix in _get_prefixes()
+            for name in _FIELDS + ["registered"]
+        ]
+        + [_get_stats_key(None, f"prefix.{index}") for index in range(1, count + 1)]
+        + [_get_stats_key(None, "prefix_count")]
+    )
+
+
+async def amaybe_flush() -> None:
+    """
+    Flush accumulated measurements if they are due, in a worker thread so as not to block the event loop.
+    """
+
+    if _is_flush_due():
+        await sync_to_async(flush_cache_stats)()
+
+
+def _get_pending(prefix: str) -> CacheReport:
+    report = _pending.get(prefix)
+    if report is None:
+        report = _pending[prefix] = CacheReport(prefix)
+
+    return report
+
+
+def _maybe_flush() -> None:
+    if _is_flush_due():
+        flush_cache_stats()
+
+
+def _is_flush_due() -> bool:
+    return time.monotonic() - _last_flush >= FLUSH_INTERVAL
+
+
+def _incr(key: str, value: int) -> int:
+    try:
+        return cache.incr(key, value)
+    except ValueError:
+        # The key doesn't exist yet. If another process adds it first, increment theirs.
+        if cache.add(key, value, None):
+            return value
+
+        return cache.incr(key, value)
+
+
+def _register_prefix(prefix: str) -> None:
+    # Each prefix is added to the index once, in its own numbered slot, so that processes flushing at the same time
+    # never overwrite each other's prefixes.
+    if cache.add(_get_stats_key(prefix, "registered"), True, None):
+        index = _incr(_get_stats_key(None, "prefix_count"), 1)
+        cache.set(_get_stats_key(None, f"prefix.{index}"), prefix, None)
+
+
+def _get_prefixes() -> List[str]:
+    count = cache.get(_get_stats_key(None, "prefix_count"), 0)
+    slots = cache.get_many(
+        [_get_stats_key(None, f"prefix.{index}") for index in range(1, count + 1)]
+    )
+
+    return list(slots.values())
+
+
+def _get_stats_key(prefix: Optional[str], name: str) -> str:
+    if prefix is None:
+        return f"{STATS_KEY_PREFIX}.{name}"
+
+    return f"{STATS_KEY_PREFIX}.{prefix}.{name}"
@@ -1,4 +1,4 @@
-from typing import Iterable, Tuple, TypeVar
+from typing import Iterable, Sequence, Tuple, TypeVar
 
 KeyT = TypeVar("KeyT")
 ValT = TypeVar("ValT")
@@ -8,3 +8,7 @@ def compact_values(
     dictlike: Iterable[Tuple[KeyT, ValT]]
 ) -> Iterable[Tuple[KeyT, ValT]]:
     return ((key, val) for key, val in dictlike if val is not None)
+
+
+def batched(items: Sequence[ValT], size: int) -> Iterable[Sequence[ValT]]:
+    return (items[i : i + size] for i in range(0, len(items), size))
@@ -0,0 +1,120 @@
+from typing import Dict, List, Optional
+
+import math
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from groundwork.core.cron import get_cron_tasks
+from groundwork.core.models import CronTaskRun
+
+TIMELINE_SYMBOLS = {
+    CronTaskRun.Outcome.SUCCEEDED: ".",
+    CronTaskRun.Outcome.FAILED: "F",
+    CronTaskRun.Outcome.SKIPPED: "s",
+    CronTaskRun.Outcome.RUNNING: "r",
+}
+"""
+Symbol used for each run outcome in text timelines. Runs that took longer than their interval are shown as `O`.
+"""
+
+
+@dataclass
+class CronTaskReport:
+    """
+    Summary of the recorded runs of a cron task.
+    """
+
+    name: str
+    interval: Optional[timedelta]
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0
+    overruns: int = 0
+    p50: Optional[float] = None
+    p95: Optional[float] = None
+    max: Optional[float] = None
+    lag_p95: Optional[float] = None
+    timeline: List[CronTaskRun] = field(default_factory=list)
+
+    def is_overrun(self, run: CronTaskRun) -> bool:
+        return (
+            self.interval is not None
+            and run.duration is not None
+            and run.duration > self.interval.total_seconds()
+        )
+
+    def get_timeline_text(self) -> str:
+        return "".join(
+            "O" if self.is_overrun(run) else TIMELINE_SYMBOLS[run.outcome]
+            for run in self.timeline
+        )
+
+
+def get_cron_reports(
+    since: datetime, timeline_length: int = 48
+) -> List[CronTaskReport]:
+    """
+    Summarise the recorded runs of every cron task.
+
+    Args:
+        since: Only include runs that started after this time.
+        timeline_length: Number of recent runs to include in each report's timeline.
+
+    Returns:
+        A report for each task with recorded runs, ordered by name.
+    """
+
+    intervals = {task.name: task.interval for task in get_cron_tasks()}
+    runs: Dict[str, List[CronTaskRun]] = {}
+
+    for run in CronTaskRun.objects.filter(start_time__gte=since).order_by("start_time"):
+        runs.setdefault(run.task_name, []).append(run)
+
+    reports = []
+
+    for name, task_runs in sorted(runs.items()):
+        report = CronTaskReport(name=name, interval=intervals.get(name))
+        durations = []
+        lags = []
+
+        for run in task_runs:
+            if run.outcome == CronTaskRun.Outcome.SKIPPED:
+                report.skipped += 1
+                continue
+
+            report.runs += 1
+            if run.outcome == CronTaskRun.Outcome.FAILED:
+                report.failures += 1
+            if run.duration is not None:
+                durations.append(run.duration)
+            if run.lag is not None:
+                lags.append(run.lag)
+            if report.is_overrun(run):
+                report.overruns += 1
+
+        report.p50 = percentile(durations, 50)
+        report.p95 = percentile(durations, 95)
+        report.max = max(durations, default=None)
+        report.lag_p95 = percentile(lags, 95)
+        report.timeline = task_runs[-timeline_length:]
+        reports.append(report)
+
+    return reports
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """
+    Args:
+        values: Values to take the percentile of.
+        p: Percentile, from 0 to 100.
+
+    Returns:
+        The nearest-rank percentile of the values, or `None` if there are none.
+    """
+
+    if not values:
+        return None
+
+    ordered = sorted(values)
+    rank = max(math.ceil(p / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
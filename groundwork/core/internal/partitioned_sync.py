@@ -0,0 +1,261 @@
+from typing import Any, Callable, List, Optional, Set, Type
+
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.apps import apps
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.utils import timezone
+
+from groundwork.core import metrics
+from groundwork.core.datasources import SyncedModel, SyncPartition
+from groundwork.core.internal.sync_manager import SyncManager
+from groundwork.core.metrics import SyncSummary
+
+
+@dataclass
+class PartitionProgress:
+    """
+    Progress report for one partition of a partitioned sync.
+    """
+
+    model: str
+    index: int
+    count: int
+    synced: int
+    done: bool = False
+
+
+class PartitionedSync:
+    """
+    Coordinates syncing a model's datasource as several partitions in parallel worker processes.
+
+    Every partition shares the same sync time, and `SyncManager.complete_sync()` is only called once all partitions
+    have synced successfully.
+
+    Partitions synced in parallel may create the same related resources at the same time. The external id field of
+    the model, and of every synced model it refers to, must be unique so that these creates are merged rather than
+    duplicated.
+    """
+
+    def __init__(
+        self,
+        model: Type[SyncedModel],
+        partitions: int,
+        processes: Optional[int] = None,
+        on_progress: Optional[Callable[[PartitionProgress], None]] = None,
+    ) -> None:
+        self.model = model
+        self.partitions = model.sync_config.get_partitions(partitions)
+        self.processes = len(self.partitions) if processes is None else processes
+        self.on_progress = on_progress or _log_progress
+        self.sync_time = timezone.now()
+
+    def run(self) -> SyncSummary:
+        """
+        Sync every partition, then complete the sync.
+
+        Raises:
+            ImproperlyConfigured: If partitions would be synced in parallel into models without a unique external id.
+            RuntimeError: If any partition failed to sync.
+
+        Returns:
+            A summary of the sync, combining every partition.
+        """
+
+        if self.processes != 0:
+            self.check_unique_external_ids()
+
+        logging.info(
+            "Beginning partitioned sync of %s in %d partitions…",
+            self.model._meta.verbose_name,
+            len(self.partitions),
+        )
+        start_time = datetime.now()
+
+        summary = SyncSummary(model=self.model._meta.label)
+        partition_summaries = (
+            self.run_inline() if self.processes == 0 else self.run_in_processes()
+        )
+        for partition_summary in partition_summaries:
+            summary.merge(partition_summary)
+
+        manager = SyncManager(sync_time=self.sync_time)
+        with metrics.recording(summary):
+            manager.complete_sync(self.model)
+            manager.invalidate_caches()
+
+        duration = datetime.now() - start_time
+        summary.duration = duration.total_seconds()
+        logging.info(
+            "Completed partitioned sync of %s in %s",
+            self.model._meta.verbose_name,
+            duration,
+        )
+
+        manager.report(self.model, summary)
+        return summary
+
+    def check_unique_external_ids(self) -> None:
+        """
+        Check that the external id field of the model, and of every synced model it refers to, is unique.
+
+        Raises:
+            ImproperlyConfigured: If any of these fields is not unique.
+        """
+
+        for model in _get_synced_models(self.model, set()):
+            field_name = model.sync_config.external_id
+            field = model._meta.get_field(field_name)
+
+            if not field.unique and not any(
+                getattr(constraint, "fields", None) == (field_name,)
+                and getattr(constraint, "condition", None) is None
+                for constraint in model._meta.constraints
+            ):
+                raise ImproperlyConfigured(
+                    f"{model._meta.label}.{field_name} must be unique for partitions to be synced in parallel"
+                )
+
+    def run_inline(self) -> List[SyncSummary]:
+        return [
+            _sync_partition(
+                self.model._meta.label, partition, self.sync_time, self.on_progress
+            )
+            for partition in self.partitions
+        ]
+
+    def run_in_processes(self) -> List[SyncSummary]:
+        # Forked workers must not share the parent's database connections.
+        connections.close_all()
+
+        context = multiprocessing.get_context("fork")
+        queue = context.Queue()
+        reporter = threading.Thread(
+            target=_report_progress, args=(queue, self.on_progress), daemon=True
+        )
+        reporter.start()
+
+        failures: List[BaseException] = []
+        summaries: List[SyncSummary] = []
+
+        try:
+            with ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(queue,),
+            ) as pool:
+                futures = [
+                    pool.submit(
+                        _sync_partition_in_worker,
+                        self.model._meta.label,
+                        partition,
+                        self.sync_time,
+                    )
+                    for partition in self.partitions
+                ]
+
+                for future in as_completed(futures):
+                    try:
+                        summaries.append(future.result())
+                    except Exception as err:
+                        logging.exception(
+                            "Partition of %s failed", self.model._meta.verbose_name
+                        )
+                        failures.append(err)
+        finally:
+            queue.put(None)
+            reporter.join()
+
+        if failures:
+            raise RuntimeError(
+                f"{len(failures)} of {len(self.partitions)} partitions of "
+                f"{self.model._meta.verbose_name} failed to sync"
+            ) from failures[0]
+
+        return summaries
+
+
+def _get_synced_models(
+    model: Type[SyncedModel], seen: Set[Type[SyncedModel]]
+) -> Set[Type[SyncedModel]]:
+    seen.add(model)
+
+    for field in model._meta.fields + model._meta.many_to_many:
+        related = field.related_model
+        if (
+            isinstance(related, type)
+            and issubclass(related, SyncedModel)
+            and related not in seen
+        ):
+            _get_synced_models(related, seen)
+
+    return seen
+
+
+_worker_queue: Any = None
+
+
+def _init_worker(queue: Any) -> None:
+    global _worker_queue
+    _worker_queue = queue
+
+
+def _sync_partition_in_worker(
+    label: str, partition: SyncPartition, sync_time: datetime
+) -> SyncSummary:
+    try:
+        return _sync_partition(label, partition, sync_time, _worker_queue.put)
+    finally:
+        connections.close_all()
+
+
+def _sync_partition(
+    label: str,
+    partition: SyncPartition,
+    sync_time: datetime,
+    on_progress: Callable[[PartitionProgress], None],
+) -> SyncSummary:
+    model = apps.get_model(label)
+
+    def report(model: Type[SyncedModel], synced: int) -> None:
+        on_progress(PartitionProgress(label, partition.index, partition.count, synced))
+
+    summary = SyncManager(sync_time=sync_time, on_progress=report).sync_model(
+        model, partition
+    )
+    on_progress(
+        PartitionProgress(
+            label,
+            partition.index,
+            partition.count,
+            summary.counters["rows_synced"],
+            done=True,
+        )
+    )
+
+    return summary
+
+
+def _report_progress(
+    queue: Any, on_progress: Callable[[PartitionProgress], None]
+) -> None:
+    for progress in iter(queue.get, None):
+        on_progress(progress)
+
+
+def _log_progress(progress: PartitionProgress) -> None:
+    logging.info(
+        "%s partition %d/%d: %s %d resources",
+        progress.model,
+        progress.index + 1,
+        progress.count,
+        "completed," if progress.done else "synced",
+        progress.synced,
+    )
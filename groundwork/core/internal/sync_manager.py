@@ -1,4 +1,4 @@
-from typing import Any, DefaultDict, Dict, Optional, Type
+from typing import Any, Callable, DefaultDict, Dict, Iterable, Optional, Set, Type
 
 import logging
 import uuid
@@ -6,11 +6,15 @@ from collections import defaultdict
 from dataclasses import dataclass, field
 from datetime import datetime
 
-from django.db import models, transaction
+from django.db import IntegrityError, models, router, transaction
 from django.utils import timezone
 
-from groundwork.core.datasources import SyncedModel
+from groundwork.core import metrics
+from groundwork.core.cache import bump_model_cache_version
+from groundwork.core.datasources import ResourceNotFound, SyncedModel, SyncPartition
 from groundwork.core.internal.collection_util import compact_values
+from groundwork.core.metrics import SyncSummary
+from groundwork.core.signals import sync_completed
 
 
 @dataclass
@@ -27,34 +31,248 @@ class SyncManager:
 
     models: DefaultDict[Type[SyncedModel], ModelSyncState]
 
-    def __init__(self) -> None:
+    progress_interval: int = 100
+    """
+    Number of resources between calls to `on_progress`, and between invalidations of cached values derived from
+    changed models.
+    """
+
+    def __init__(
+        self,
+        sync_time: Optional[datetime] = None,
+        on_progress: Optional[Callable[[Type[SyncedModel], int], None]] = None,
+    ) -> None:
+        """
+        Args:
+            sync_time: Time recorded as the `last_sync_time` of synced instances. Partitions of the same sync should
+                share a sync time. Defaults to now.
+            on_progress: Called periodically during `sync_model()` with the model and the number of resources synced
+                so far.
+        """
+
         self.models = defaultdict(ModelSyncState)
-        self.sync_time = timezone.now()
+        self.sync_time = sync_time or timezone.now()
+        self.on_progress = on_progress
         self.ignored_fields = {field.name for field in SyncedModel._meta.get_fields()}
+        self.changed_models: Set[Type[models.Model]] = set()
 
-    def sync_model(self, model: Type[SyncedModel]) -> None:
+    def sync_model(
+        self, model: Type[SyncedModel], partition: Optional[SyncPartition] = None
+    ) -> SyncSummary:
         """
         Pull the result of calling list() on a `SyncedModel`'s datasource into the local database.
         Recursively resolves relationships to other SyncedModels.
 
         Args:
             model: The model class to sync from its datasource.
+            partition: Only sync this partition of the datasource. If provided, `complete_sync()` is not called and
+                metrics are not reported. Both are the responsibility of the caller once every partition has been
+                synced.
+
+        Returns:
+            A summary of the sync.
         """
 
         logging.info("Beginning sync of %s…", model._meta.verbose_name)
         start_time = datetime.now()
+        summary = SyncSummary(model=model._meta.label)
+
+        with metrics.recording(summary):
+            # Fetch all the models from remote
+            query = partition.query if partition is not None else {}
+            resources = model.sync_config.datasource.list(**query)
+
+            # Iterate over the resources and write them into the database
+            for resource in resources:
+                if partition is not None and not partition.includes(
+                    model.sync_config.datasource.get_id(resource)
+                ):
+                    continue
+
+                self.sync_resource(model, resource)
+                metrics.incr("rows_synced")
+
+                synced = summary.counters["rows_synced"]
+                if synced % self.progress_interval == 0:
+                    self.invalidate_caches()
+
+                    if self.on_progress is not None:
+                        self.on_progress(model, synced)
+
+            if self.on_progress is not None:
+                self.on_progress(model, summary.counters["rows_synced"])
+
+            if partition is None:
+                self.complete_sync(model)
+
+            self.invalidate_caches()
+
+        duration = datetime.now() - start_time
+        summary.duration = duration.total_seconds()
+        logging.info("Completed sync of %s in %s", model._meta.verbose_name, duration)
+
+        if partition is None:
+            self.report(model, summary)
+
+        return summary
+
+    def complete_sync(self, model: Type[SyncedModel]) -> None:
+        """
+        Called once every resource in a model's datasource has been synced in this session.
+
+        The default implementation sweeps rows that were not synced in this session using the model's
+        `stale_policy`. As a safeguard against upstream outages, nothing is swept if no rows were synced.
+
+        Args:
+            model: The model class that was synced.
+        """
+
+        policy = model.sync_config.stale_policy
+        if policy is None:
+            return
+
+        if not model._default_manager.filter(
+            last_sync_time__gte=self.sync_time
+        ).exists():
+            logging.warning(
+                "Not sweeping %s as no rows were synced",
+                model._meta.verbose_name_plural,
+            )
+            return
+
+        with metrics.phase("sweep"):
+            swept = policy.sweep(model, self.sync_time)
+
+        metrics.incr("rows_swept", swept)
+        if swept:
+            self.changed_models.add(model)
+
+        logging.info("Swept %d stale %s", swept, model._meta.verbose_name_plural)
+
+    def report(self, model: Type[SyncedModel], summary: SyncSummary) -> None:
+        """
+        Send the `sync_completed` signal and export metrics for a completed sync.
+
+        Args:
+            model: The model class that was synced.
+            summary: Summary of the sync.
+        """
+
+        sync_completed.send(sender=model, summary=summary)
+        metrics.export_metrics(summary.as_metrics())
+
+    def sync_model_ids(
+        self, model: Type[SyncedModel], ids: Iterable[Any]
+    ) -> SyncSummary:
+        """
+        Pull a specific set of resources from a `SyncedModel`'s datasource into the local database by calling get() for
+        each of them.
+
+        Unlike `sync_model`, this does not list the whole datasource, so is suitable for targeted resyncs in response
+        to change notifications.
+
+        A resource that can't be fetched or saved is logged and skipped, without affecting the others. A resource that
+        no longer exists upstream is removed with `remove_missing_resource`.
+
+        Args:
+            model: The model class to sync from its datasource.
+            ids: External identifiers of the resources to sync.
+
+        Returns:
+            A summary of the sync.
+        """
+
+        ids = list(ids)
+        logging.info(
+            "Beginning targeted sync of %d %s…",
+            len(ids),
+            model._meta.verbose_name_plural,
+        )
+        start_time = datetime.now()
+        summary = SyncSummary(model=model._meta.label)
+
+        with metrics.recording(summary):
+            for id in ids:
+                try:
+                    self.sync_resource(model, model.sync_config.datasource.get(id))
+                except ResourceNotFound:
+                    self.remove_missing_resource(model, id)
+                    metrics.incr("rows_missing")
+                except Exception:
+                    logging.exception(
+                        "Failed to sync %s %s", model._meta.verbose_name, id
+                    )
+                    metrics.incr("rows_failed")
+                else:
+                    metrics.incr("rows_synced")
+
+            self.invalidate_caches()
+
+        summary.duration = (datetime.now() - start_time).total_seconds()
+        self.report(model, summary)
+
+        return summary
+
+    def remove_missing_resource(self, model: Type[SyncedModel], id: Any) -> None:
+        """
+        Called when a resource being synced by id no longer exists in the datasource.
+
+        The default implementation sweeps the local row using the model's `stale_policy`, the same as if a full sync
+        had found the resource missing. If the model has no stale policy, the row is kept.
+
+        Args:
+            model: The model class being synced.
+            id: External identifier of the missing resource.
+        """
+
+        policy = model.sync_config.stale_policy
+        if policy is None:
+            return
+
+        with transaction.atomic(using=router.db_for_write(model)):
+            pks = list(
+                model._default_manager.filter(external_id=id).values_list(
+                    "pk", flat=True
+                )
+            )
+            if not pks:
+                return
+
+            with metrics.phase("sweep"):
+                policy.sweep_batch(model, pks)
+
+        metrics.incr("rows_swept", len(pks))
+        self.changed_models.add(model)
+
+    def invalidate_caches(self) -> None:
+        """
+        Invalidate values cached by `django_cached_model_property` for every model changed since the last call.
+        """
+
+        for model in self.changed_models:
+            bump_model_cache_version(model)
+
+        self.changed_models.clear()
+
+    def sync_resource(self, model: Type[SyncedModel], resource: Any) -> Any:
+        """
+        Write a single resource returned by a `SyncedModel`'s datasource into the local database, along with its
+        relationships.
+
+        Args:
+            model: The model class to sync the resource into.
+            resource: A resource returned by the datasource.
+
+        Returns:
+            The saved local model representation of the resource.
+        """
 
         # First of all, figure out how to join the remote data to the local data
         model_join_key = model.sync_config.external_id
         resource_join_key = model.sync_config.datasource.identifer
-
-        # Fetch all the models from remote
-        resources = model.sync_config.datasource.list()
         model_state = self.models[model]
 
-        # Iterate over the resources and write them into the database
-        for resource in resources:
-
+        with metrics.phase("write"):
             # We don't want to lock up the database for ages, but also we need a transaction here to ensure that any
             # referenced foreign keys are resolved into the database with this instance.
             #
@@ -71,17 +289,103 @@ class SyncManager:
 
                 model_state.resolved_instances[resource_id] = instance
 
-                for key, val in self.prepare_resource_attrs_for_save(
-                    model, resource
-                ).items():
-                    setattr(instance, key, val)
-
-                instance.save()
+                instance = self.save_or_merge_instance(
+                    instance,
+                    self.prepare_resource_attrs_for_save(model, resource),
+                    join_query,
+                )
+                model_state.resolved_instances[resource_id] = instance
 
             self.set_resource_m2m(model, resource, instance)
 
-        duration = datetime.now() - start_time
-        logging.info("Completed sync of %s in %s", model._meta.verbose_name, duration)
+        return instance
+
+    def save_or_merge_instance(
+        self, instance: Any, attrs: Dict[str, Any], join_query: Dict[str, Any]
+    ) -> Any:
+        """
+        Save an instance with `save_instance`. If it is new, but another sync (such as another partition of a
+        partitioned sync) creates a row with the same external id first, update that row instead.
+
+        Concurrent creates are only detected if the model's external id field is unique.
+
+        Args:
+            instance: The local model instance to save.
+            attrs: Properties to assign to the instance.
+            join_query: Query matching the instance's row by its external id.
+
+        Returns:
+            The saved instance.
+        """
+
+        if not instance._state.adding:
+            self.save_instance(instance, attrs)
+            return instance
+
+        try:
+            with transaction.atomic():
+                self.save_instance(instance, attrs)
+
+            return instance
+        except IntegrityError:
+            existing = type(instance).objects.filter(**join_query).first()
+            if existing is None:
+                raise
+
+            self.save_instance(existing, attrs)
+            return existing
+
+    def save_instance(self, instance: Any, attrs: Dict[str, Any]) -> None:
+        """
+        Assign attributes prepared by `prepare_resource_attrs_for_save` to an instance and save it.
+
+        If nothing other than the `last_sync_time` has changed, only the `last_sync_time` is written.
+
+        Args:
+            instance: The local model instance to update.
+            attrs: Properties to assign to the instance.
+        """
+
+        adding = instance._state.adding
+        changed = adding or any(
+            self.has_changed(instance, key, val)
+            for key, val in attrs.items()
+            if key != "last_sync_time"
+        )
+
+        for key, val in attrs.items():
+            setattr(instance, key, val)
+
+        if adding:
+            instance.save()
+            metrics.incr("rows_created")
+            self.changed_models.add(type(instance))
+        elif changed:
+            instance.save()
+            metrics.incr("rows_updated")
+            self.changed_models.add(type(instance))
+        else:
+            instance.save(update_fields=["last_sync_time"])
+            metrics.incr("rows_unchanged")
+
+    def has_changed(self, instance: Any, key: str, value: Any) -> bool:
+        """
+        Return whether assigning a value to an instance's attribute would change it.
+
+        Args:
+            instance: The local model instance.
+            key: Name of the attribute.
+            value: The value that would be assigned.
+
+        Returns:
+            True if the value differs from the instance's current value.
+        """
+
+        field = instance._meta.get_field(key)
+        if field.is_relation:
+            value = getattr(value, "pk", value)
+
+        return getattr(instance, field.attname) != value
 
     def resove_embedded_value(self, model: Type[SyncedModel], resource: Any) -> Any:
         """
@@ -101,19 +405,23 @@ class SyncManager:
 
         model_state = self.models[model]
         model_query = {model.sync_config.external_id: identifier}
+        metrics.incr("fk_lookups")
 
-        try:
-            instance = model.objects.get(**model_query)
-        except model.DoesNotExist:
-            instance = model()
+        with metrics.phase("resolve"):
+            try:
+                instance = model.objects.get(**model_query)
+            except model.DoesNotExist:
+                instance = model()
 
-        model_state.resolved_instances[identifier] = instance
+            model_state.resolved_instances[identifier] = instance
 
-        attrs = self.prepare_resource_attrs_for_save(model, resource)
-        for key, val in attrs.items():
-            setattr(instance, key, val)
+            instance = self.save_or_merge_instance(
+                instance,
+                self.prepare_resource_attrs_for_save(model, resource),
+                model_query,
+            )
+            model_state.resolved_instances[identifier] = instance
 
-        instance.save()
         return instance
 
     def resolve_by_external_id(self, model: Type[SyncedModel], id: Any) -> Any:
@@ -134,41 +442,45 @@ class SyncManager:
 
         # Get the current state for the model type in this sync session
         sync_state = self.models[model]
+        metrics.incr("fk_lookups")
 
         # If the model has already been referenced elsewhere, return the cached instance we have in memory already.
         if id in sync_state.resolved_instances:
+            metrics.incr("fk_cache_hits")
             return sync_state.resolved_instances[id]
 
         external_id_field = model.sync_config.external_id
-        try:
-            # If a local copy already exists, add it to the in-memory cache and return it
-            instance = model.objects.get(**{external_id_field: id})
-            sync_state.resolved_instances[id] = instance
-
-            return instance
-
-        except model.DoesNotExist:
-            # If a copy doesn't exist, resolve it from the dtasource. We only resolve enough of its properties
-            # to save it in the database – we don't recurse into m2m relationships yet – save that for when this model
-            # gets its own top-level sync.
-
-            # Create the model here. Store it in our cache _before_ resolving its attributes in case there are cyclic
-            # relationships.
-
-            # Note that this means that this method must be called within a transaction or else saving may throw.
-            instance = model()
-            sync_state.resolved_instances[id] = instance
-
-            # Fetch the remote referenced data and assign to the model.
-            resource = model.sync_config.datasource.get(id)
-            for key, val in self.prepare_resource_attrs_for_save(
-                model, resource
-            ).items():
-                setattr(instance, key, val)
-
-            instance.save()
-
-            return instance
+        with metrics.phase("resolve"):
+            try:
+                # If a local copy already exists, add it to the in-memory cache and return it
+                instance = model.objects.get(**{external_id_field: id})
+                sync_state.resolved_instances[id] = instance
+
+                return instance
+
+            except model.DoesNotExist:
+                # If a copy doesn't exist, resolve it from the dtasource. We only resolve enough of its properties
+                # to save it in the database – we don't recurse into m2m relationships yet – save that for when this
+                # model gets its own top-level sync.
+
+                # Create the model here. Store it in our cache _before_ resolving its attributes in case there are
+                # cyclic relationships.
+
+                # Note that this means that this method must be called within a transaction or else saving may throw.
+                instance = model()
+                sync_state.resolved_instances[id] = instance
+
+                # Fetch the remote referenced data and assign to the model.
+                metrics.incr("fk_remote_resolutions")
+                resource = model.sync_config.datasource.get(id)
+                instance = self.save_or_merge_instance(
+                    instance,
+                    self.prepare_resource_attrs_for_save(model, resource),
+                    {external_id_field: id},
+                )
+                sync_state.resolved_instances[id] = instance
+
+                return instance
 
     def prepare_resource_attrs_for_save(
         self, model: Type[SyncedModel], resource: Any
@@ -179,6 +491,7 @@ class SyncManager:
         The default implementation:
         - Strips from each resource any fields not present in the model.
         - Prepares each attribute by calling `prepare_field_for_save`.
+        - Applies any attributes required by the model's stale policy.
         - Updates the `last_sync_time` attribute with the current date & time.
 
         Args:
@@ -198,6 +511,9 @@ class SyncManager:
             )
         )
 
+        if model.sync_config.stale_policy is not None:
+            properties.update(model.sync_config.stale_policy.get_live_attrs())
+
         properties["last_sync_time"] = self.sync_time
         properties[model.sync_config.external_id] = getattr(resource, identifier)
         return properties
@@ -0,0 +1,132 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+
+from groundwork.core.benchmark import (
+    BenchmarkOptions,
+    BenchmarkResult,
+    compare_to_baseline,
+    run_sync_benchmark,
+)
+from groundwork.core.datasources import SyncedModel
+
+
+class Command(BaseCommand):
+    help = "Measure sync throughput for a SyncedModel using synthetic data"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("model", help="Model to sync, as app_label.ModelName")
+        parser.add_argument(
+            "--resources",
+            type=int,
+            default=1000,
+            help="Number of synthetic resources to sync",
+        )
+        parser.add_argument(
+            "--fanout",
+            type=int,
+            default=10,
+            help="Number of resources referencing each related resource",
+        )
+        parser.add_argument(
+            "--m2m-width",
+            type=int,
+            default=3,
+            help="Number of related resources in each many-to-many relationship",
+        )
+        parser.add_argument(
+            "--embedded-ratio",
+            type=float,
+            default=0.0,
+            help="Proportion of foreign keys given as embedded resources",
+        )
+        parser.add_argument(
+            "--commit",
+            action="store_true",
+            help="Keep the synced rows instead of rolling back",
+        )
+        parser.add_argument(
+            "--save-baseline",
+            metavar="PATH",
+            help="Save the results as a baseline JSON file",
+        )
+        parser.add_argument(
+            "--baseline",
+            metavar="PATH",
+            help="Compare the results against a baseline JSON file and fail if they regress",
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.1,
+            help="Proportion by which a metric may regress before failing",
+        )
+
+    def handle(
+        self,
+        *args,
+        model,
+        resources,
+        fanout,
+        m2m_width,
+        embedded_ratio,
+        commit,
+        save_baseline,
+        baseline,
+        tolerance,
+        **options,
+    ):
+        try:
+            model_class = apps.get_model(model)
+        except (LookupError, ValueError):
+            raise CommandError(f"Unknown model: {model}")
+
+        if not issubclass(model_class, SyncedModel):
+            raise CommandError(f"{model} is not a SyncedModel")
+
+        result = run_sync_benchmark(
+            model_class,
+            BenchmarkOptions(
+                resources=resources,
+                fanout=fanout,
+                m2m_width=m2m_width,
+                embedded_ratio=embedded_ratio,
+            ),
+            commit=commit,
+        )
+
+        self.write_result(result)
+
+        if save_baseline:
+            with open(save_baseline, "w", encoding="utf8") as f:
+                f.write(result.to_json())
+
+        if baseline:
+            with open(baseline, encoding="utf8") as f:
+                baseline_result = BenchmarkResult.from_json(f.read())
+
+            try:
+                regressions = compare_to_baseline(result, baseline_result, tolerance)
+            except ValueError as e:
+                raise CommandError(str(e))
+
+            if regressions:
+                raise CommandError(
+                    "Sync performance regressed:\n" + "\n".join(regressions)
+                )
+
+            self.stdout.write(self.style.SUCCESS("No regressions against baseline"))
+
+    def write_result(self, result: BenchmarkResult) -> None:
+        peak_rss = "n/a" if result.peak_rss_mb is None else f"{result.peak_rss_mb:.1f}"
+
+        self.stdout.write(f"Model:          {result.model}")
+        self.stdout.write(f"Rows synced:    {result.rows}")
+        self.stdout.write(f"Duration:       {result.duration:.3f}s")
+        self.stdout.write(f"Rows/s:         {result.rows_per_second:.1f}")
+        self.stdout.write(f"Queries:        {result.queries}")
+        self.stdout.write(f"Queries/row:    {result.queries_per_row:.2f}")
+        self.stdout.write(f"Peak RSS (MB):  {peak_rss}")
+
+        self.stdout.write("Time per phase:")
+        for phase, duration in sorted(result.timings.items()):
+            self.stdout.write(f"  {phase:<14}{duration:.3f}s")
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandParser
+
+from groundwork.core.internal.cache_stats import (
+    CacheReport,
+    flush_cache_stats,
+    get_cache_reports,
+    reset_cache_stats,
+)
+
+
+class Command(BaseCommand):
+    help = "Rank cached functions by the time they save, with hit rates, recompute times and value sizes"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--reset",
+            action="store_true",
+            help="Clear the recorded statistics after printing them",
+        )
+
+    def handle(self, *args, reset, **options):
+        flush_cache_stats()
+        reports = get_cache_reports()
+
+        if not reports:
+            self.stdout.write("No cached function calls recorded")
+        else:
+            for report in reports:
+                self.write_report(report)
+
+        if reset:
+            reset_cache_stats()
+
+    def write_report(self, report: CacheReport) -> None:
+        self.stdout.write(self.style.MIGRATE_HEADING(report.prefix))
+        self.stdout.write(
+            f"  Hits:          {report.hits} of {report.hits + report.misses} "
+            f"({_percent(report.hit_rate)})"
+        )
+        self.stdout.write(
+            f"  Recompute:     {report.recomputes} times, mean {_milliseconds(report.mean_recompute_time)}"
+        )
+        self.stdout.write(f"  Value size:    {_bytes(report.mean_value_bytes)}")
+        self.stdout.write(
+            f"  Lookup:        mean {_milliseconds(report.mean_lookup_time)}"
+        )
+        self.stdout.write(f"  Time saved:    {report.time_saved:.1f}s")
+
+
+def _percent(value):
+    return "n/a" if value is None else f"{value:.0%}"
+
+
+def _milliseconds(value):
+    return "n/a" if value is None else f"{value * 1000:.1f}ms"
+
+
+def _bytes(value):
+    return "n/a" if value is None else f"{value / 1024:.1f}KiB"
@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.utils import timezone
+
+from groundwork.core.internal.cron_report import CronTaskReport, get_cron_reports
+
+
+class Command(BaseCommand):
+    help = "Summarise recent cron task runs: durations, failures, overruns and lag"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--days",
+            type=float,
+            default=7,
+            help="Summarise runs from this many days ago onwards",
+        )
+        parser.add_argument(
+            "--timeline",
+            type=int,
+            default=48,
+            help="Number of recent runs to show in each task's timeline",
+        )
+
+    def handle(self, *args, days, timeline, **options):
+        reports = get_cron_reports(
+            timezone.now() - timedelta(days=days), timeline_length=timeline
+        )
+
+        if not reports:
+            self.stdout.write("No cron task runs recorded")
+            return
+
+        for report in reports:
+            self.write_report(report)
+
+        self.stdout.write(
+            "Timeline: . succeeded, F failed, s skipped, r running, O overran its interval"
+        )
+
+    def write_report(self, report: CronTaskReport) -> None:
+        self.stdout.write(self.style.MIGRATE_HEADING(report.name))
+        self.stdout.write(f"  Interval:      {report.interval or 'not registered'}")
+        self.stdout.write(
+            f"  Runs:          {report.runs} ({report.failures} failed, {report.skipped} skipped)"
+        )
+        self.stdout.write(
+            f"  Duration:      p50 {_seconds(report.p50)}, p95 {_seconds(report.p95)}, "
+            f"max {_seconds(report.max)}"
+        )
+        self.stdout.write(f"  Overruns:      {report.overruns}")
+        self.stdout.write(f"  Lag (p95):     {_seconds(report.lag_p95)}")
+        self.stdout.write(f"  Timeline:      {report.get_timeline_text()}")
+
+
+def _seconds(value):
+    return "n/a" if value is None else f"{value:.1f}s"
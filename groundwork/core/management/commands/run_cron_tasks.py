@@ -1,8 +1,19 @@
-from time import sleep
+import signal
+import threading
+from datetime import timedelta
 
-from django.core.management.base import BaseCommand, CommandParser
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.utils import timezone
 
-from groundwork.core.cron import run_pending_cron_tasks
+from groundwork.core.cron import (
+    CronExecutor,
+    CronWakeup,
+    InlineExecutor,
+    IsolatedExecutor,
+    PoolExecutor,
+    get_next_run_time,
+    run_pending_cron_tasks,
+)
 
 
 class Command(BaseCommand):
@@ -14,12 +25,128 @@ class Command(BaseCommand):
             action="store_true",
             help="Run all registered tasks once, then exit",
         )
+        parser.add_argument(
+            "--pending",
+            action="store_true",
+            help="Run tasks that are due, including missed runs, then exit",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=0,
+            help="Run up to this many tasks concurrently. By default, tasks run one after another",
+        )
+        parser.add_argument(
+            "--processes",
+            action="store_true",
+            help="With --workers, run concurrent tasks in worker processes rather than threads",
+        )
+        parser.add_argument(
+            "--isolated",
+            action="store_true",
+            help="Run each task in a recyclable child process",
+        )
+        parser.add_argument(
+            "--max-tasks-per-worker",
+            type=int,
+            help="With --isolated, recycle each child process after this many tasks",
+        )
+        parser.add_argument(
+            "--max-worker-memory",
+            type=float,
+            metavar="MB",
+            help="With --isolated, recycle each child process once it uses this much memory",
+        )
+        parser.add_argument(
+            "--memory-limit",
+            type=float,
+            metavar="MB",
+            help="With --isolated, fail tasks that use more than this much memory",
+        )
+        parser.add_argument(
+            "--time-limit",
+            type=float,
+            metavar="SECONDS",
+            help="With --isolated, kill tasks that run for longer than this",
+        )
+        parser.add_argument(
+            "--max-sleep",
+            type=float,
+            default=300.0,
+            help="Check for due tasks at least this often (in seconds), even if not notified of changes",
+        )
+
+    def handle(
+        self,
+        *args,
+        once,
+        pending,
+        workers,
+        processes,
+        isolated,
+        max_tasks_per_worker,
+        max_worker_memory,
+        memory_limit,
+        time_limit,
+        max_sleep,
+        **options,
+    ):
+        if processes and workers <= 0:
+            raise CommandError("--processes requires --workers")
+
+        executor: CronExecutor
+        if isolated:
+            executor = IsolatedExecutor(
+                max_workers=max(workers, 1),
+                max_tasks_per_worker=max_tasks_per_worker,
+                max_worker_memory_mb=max_worker_memory,
+                memory_limit_mb=memory_limit,
+                time_limit=None
+                if time_limit is None
+                else timedelta(seconds=time_limit),
+            )
+        elif workers > 0:
+            executor = PoolExecutor(max_workers=workers, processes=processes)
+        else:
+            executor = InlineExecutor()
+
+        # Stop scheduling new tasks on SIGTERM, but let running tasks finish.
+        stopping = threading.Event()
+        wakeup = CronWakeup()
+
+        def stop(*args):
+            stopping.set()
+            wakeup.wake()
+
+        previous_handlers = {
+            signal.SIGTERM: signal.signal(signal.SIGTERM, stop),
+            signal.SIGUSR1: signal.signal(signal.SIGUSR1, lambda *args: wakeup.wake()),
+        }
+
+        try:
+            if once:
+                run_pending_cron_tasks(
+                    all=True, executor=executor, should_stop=stopping.is_set
+                )
+                return
+
+            if pending:
+                run_pending_cron_tasks(executor=executor, should_stop=stopping.is_set)
+                return
+
+            while not stopping.is_set():
+                run_pending_cron_tasks(executor=executor, should_stop=stopping.is_set)
+
+                # Sleep until the next task is due, unless woken early
+                timeout = max_sleep
+                next_run = get_next_run_time()
+                if next_run is not None:
+                    timeout = min(timeout, (next_run - timezone.now()).total_seconds())
 
-    def handle(self, *args, once, **options):
-        if once:
-            run_pending_cron_tasks(all=True)
-            return
+                wakeup.wait(timeout)
+        finally:
+            executor.shutdown(wait=True)
+            wakeup.close()
 
-        while True:
-            run_pending_cron_tasks()
-            sleep(30.0)
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
@@ -0,0 +1,447 @@
+"""
+Instrumentation for syncs and other background work, with pluggable exporters.
+
+Metrics are exported to every exporter listed in `settings.GROUNDWORK_METRICS_EXPORTERS`, or registered by calling
+`register_exporter()`. For example:
+
+```python
+GROUNDWORK_METRICS_EXPORTERS = [
+    "groundwork.core.metrics.LoggingExporter",
+    {"class": "groundwork.core.metrics.StatsdExporter", "host": "statsd.internal"},
+]
+```
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import logging
+import socket
+import threading
+import time
+from abc import ABCMeta, abstractmethod
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+@dataclass
+class Metric:
+    """
+    A single measurement passed to exporters.
+    """
+
+    name: str
+    """
+    Dot-separated metric name, for example `sync.rows_created`.
+    """
+
+    value: float
+    """
+    Measured value. Timers are measured in seconds.
+    """
+
+    kind: str = "counter"
+    """
+    One of `counter`, `timer` or `gauge`.
+    """
+
+    labels: Dict[str, str] = field(default_factory=dict)
+    """
+    Dimensions the metric applies to, for example the model being synced.
+    """
+
+
+@dataclass
+class SyncSummary:
+    """
+    Structured summary of a sync, returned by `SyncedModel.sync()`.
+
+    Phase timings are exclusive: time spent fetching a related resource while resolving a foreign key is counted as
+    `fetch`, not `resolve`.
+    """
+
+    model: str
+    """
+    Label of the synced model.
+    """
+
+    counters: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    """
+    Counts of things that happened during the sync. Includes `pages_fetched`, `bytes_fetched`, `rows_deserialized`,
+    `rows_synced`, `rows_created`, `rows_updated`, `rows_unchanged`, `fk_lookups`, `fk_cache_hits` and
+    `fk_remote_resolutions`. Targeted syncs also count `rows_missing` and `rows_failed`.
+    """
+
+    timings: Dict[str, float] = field(default_factory=lambda: defaultdict(float))
+    """
+    Seconds spent in each phase of the sync: `fetch`, `deserialize`, `resolve`, `write` and `sweep`.
+    """
+
+    duration: float = 0.0
+    """
+    Total duration of the sync in seconds.
+    """
+
+    def __post_init__(self) -> None:
+        self.counters = defaultdict(int, self.counters)
+        self.timings = defaultdict(float, self.timings)
+        self._phases: List[List[Any]] = []
+
+    def merge(self, other: "SyncSummary") -> None:
+        """
+        Add the counters and timings of another summary to this one.
+
+        Args:
+            other: Summary to add to this one.
+        """
+
+        for key, value in other.counters.items():
+            self.counters[key] += value
+
+        for key, duration in other.timings.items():
+            self.timings[key] += duration
+
+    def as_metrics(self) -> List[Metric]:
+        """
+        Returns:
+            This summary as a list of metrics suitable for passing to exporters.
+        """
+
+        labels = {"model": self.model}
+
+        return [
+            *(
+                Metric(f"sync.{key}", value, "counter", labels)
+                for key, value in self.counters.items()
+            ),
+            *(
+                Metric(f"sync.phase.{key}", value, "timer", labels)
+                for key, value in self.timings.items()
+            ),
+            Metric("sync.duration", self.duration, "timer", labels),
+        ]
+
+
+_active_summary: ContextVar[Optional[SyncSummary]] = ContextVar(
+    "groundwork_sync_summary", default=None
+)
+_captured_metrics: ContextVar[Optional[List[Metric]]] = ContextVar(
+    "groundwork_captured_metrics", default=None
+)
+
+
+@contextmanager
+def recording(summary: SyncSummary) -> Iterator[SyncSummary]:
+    """
+    Record counters and phase timings in the current context into `summary`.
+
+    Args:
+        summary: The summary to record into.
+
+    Yields:
+        The summary.
+    """
+
+    token = _active_summary.set(summary)
+    try:
+        yield summary
+    finally:
+        _active_summary.reset(token)
+
+
+def incr(name: str, value: int = 1) -> None:
+    """
+    Increment a counter in the summary currently being recorded. Does nothing if no summary is being recorded.
+
+    Args:
+        name: Name of the counter.
+        value: Amount to increment by.
+    """
+
+    summary = _active_summary.get()
+    if summary is not None:
+        summary.counters[name] += value
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Time a phase in the summary currently being recorded. Does nothing if no summary is being recorded.
+
+    Phases may be nested. Time spent in a nested phase is not counted towards the enclosing phase.
+
+    Args:
+        name: Name of the phase.
+
+    Yields:
+        Nothing.
+    """
+
+    summary = _active_summary.get()
+    if summary is None:
+        yield
+        return
+
+    stack = summary._phases
+    start = time.perf_counter()
+    if stack:
+        outer = stack[-1]
+        summary.timings[outer[0]] += start - outer[1]
+
+    entry = [name, start]
+    stack.append(entry)
+
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        summary.timings[name] += end - entry[1]
+        stack.remove(entry)
+
+        if stack:
+            stack[-1][1] = end
+
+
+@contextmanager
+def capturing() -> Iterator[List[Metric]]:
+    """
+    Collect metrics exported in the current context into a list, rather than sending them to exporters. Used to pass
+    metrics from worker processes back to their parent.
+
+    Yields:
+        The list that exported metrics are added to.
+    """
+
+    captured: List[Metric] = []
+    token = _captured_metrics.set(captured)
+    try:
+        yield captured
+    finally:
+        _captured_metrics.reset(token)
+
+
+class MetricsExporter(metaclass=ABCMeta):
+    """
+    Abstract interface for sending metrics to a monitoring system.
+    """
+
+    @abstractmethod
+    def export(self, metrics: Iterable[Metric]) -> None:
+        """
+        Send metrics to the monitoring system.
+
+        Args:
+            metrics: The metrics to send.
+        """
+
+
+class LoggingExporter(MetricsExporter):
+    """
+    Writes metrics to the python logger.
+    """
+
+    def __init__(self, level: int = logging.INFO) -> None:
+        self.level = level
+
+    def export(self, metrics: Iterable[Metric]) -> None:
+        for metric in metrics:
+            labels = ",".join(f"{key}={val}" for key, val in metric.labels.items())
+            logging.log(
+                self.level,
+                "%s{%s} %s %g",
+                metric.name,
+                labels,
+                metric.kind,
+                metric.value,
+            )
+
+
+class StatsdExporter(MetricsExporter):
+    """
+    Sends metrics to a statsd server over UDP.
+
+    Labels are appended to the metric name, so `sync.rows_created` for the model `uk.Constituency` is sent as
+    `groundwork.sync.rows_created.uk_constituency`.
+    """
+
+    def __init__(
+        self, host: str = "localhost", port: int = 8125, prefix: str = "groundwork"
+    ) -> None:
+        self.address = (host, port)
+        self.prefix = prefix
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    def export(self, metrics: Iterable[Metric]) -> None:
+        lines = [self.format(metric) for metric in metrics]
+        if lines:
+            self.socket.sendto("\n".join(lines).encode(), self.address)
+
+    def format(self, metric: Metric) -> str:
+        name = ".".join(
+            [
+                self.prefix,
+                metric.name,
+                *(_clean_label(x) for x in metric.labels.values()),
+            ]
+        )
+
+        if metric.kind == "timer":
+            return f"{name}:{metric.value * 1000:g}|ms"
+
+        if metric.kind == "gauge":
+            return f"{name}:{metric.value:g}|g"
+
+        return f"{name}:{metric.value:g}|c"
+
+
+class PrometheusExporter(MetricsExporter):
+    """
+    Accumulates metrics in memory for scraping in the Prometheus text exposition format.
+
+    Counters and timers are exposed as running totals. Timers also expose a `_count` series.
+    """
+
+    def __init__(self, prefix: str = "groundwork") -> None:
+        self.prefix = prefix
+        self.series: Dict[Tuple[str, str, Tuple[Any, ...]], float] = {}
+        self.kinds: Dict[str, str] = {}
+        self.lock = threading.Lock()
+
+    def export(self, metrics: Iterable[Metric]) -> None:
+        with self.lock:
+            for metric in metrics:
+                name = _clean_label(f"{self.prefix}.{metric.name}")
+                labels = tuple(sorted(metric.labels.items()))
+
+                if metric.kind == "gauge":
+                    self.kinds[name] = "gauge"
+                    self.series[name, name, labels] = metric.value
+
+                elif metric.kind == "timer":
+                    family = f"{name}_seconds"
+                    self.kinds[family] = "summary"
+                    self.add(family, f"{family}_sum", labels, metric.value)
+                    self.add(family, f"{family}_count", labels, 1)
+
+                else:
+                    family = f"{name}_total"
+                    self.kinds[family] = "counter"
+                    self.add(family, family, labels, metric.value)
+
+    def add(
+        self, family: str, name: str, labels: Tuple[Any, ...], value: float
+    ) -> None:
+        key = (family, name, labels)
+        self.series[key] = self.series.get(key, 0) + value
+
+    def render(self) -> str:
+        """
+        Returns:
+            Accumulated metrics in the Prometheus text exposition format.
+        """
+
+        lines = []
+        current_family = None
+
+        with self.lock:
+            for (family, name, labels), value in sorted(self.series.items()):
+                if family != current_family:
+                    lines.append(f"# TYPE {family} {self.kinds[family]}")
+                    current_family = family
+
+                label_str = ",".join(
+                    f'{key}="{_escape_label_value(val)}"' for key, val in labels
+                )
+                lines.append(f"{name}{{{label_str}}} {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+
+_registered_exporters: List[MetricsExporter] = []
+_configured_exporters: Optional[List[MetricsExporter]] = None
+
+
+def register_exporter(exporter: MetricsExporter) -> None:
+    """
+    Send metrics to an exporter, in addition to the ones configured in settings.
+
+    Args:
+        exporter: The exporter to register.
+    """
+
+    _registered_exporters.append(exporter)
+
+
+def get_exporters() -> List[MetricsExporter]:
+    """
+    Returns:
+        Every exporter configured in `settings.GROUNDWORK_METRICS_EXPORTERS` or registered with
+        `register_exporter()`.
+    """
+
+    global _configured_exporters
+
+    if _configured_exporters is None:
+        _configured_exporters = []
+
+        for config in getattr(settings, "GROUNDWORK_METRICS_EXPORTERS", []):
+            if isinstance(config, str):
+                config = {"class": config}
+
+            if isinstance(config, MetricsExporter):
+                _configured_exporters.append(config)
+            else:
+                kwargs = dict(config)
+                _configured_exporters.append(
+                    import_string(kwargs.pop("class"))(**kwargs)
+                )
+
+    return [*_configured_exporters, *_registered_exporters]
+
+
+@receiver(setting_changed)
+def _reset_exporters(setting: str, **kwargs: Any) -> None:
+    global _configured_exporters
+
+    if setting == "GROUNDWORK_METRICS_EXPORTERS":
+        _configured_exporters = None
+
+
+def export_metrics(metrics: Iterable[Metric]) -> None:
+    """
+    Send metrics to every configured exporter.
+
+    Errors raised by exporters are logged rather than raised, so that monitoring problems never interrupt the work
+    being monitored. Inside `capturing()`, metrics are collected rather than exported.
+
+    Args:
+        metrics: The metrics to send.
+    """
+
+    metrics = list(metrics)
+
+    captured = _captured_metrics.get()
+    if captured is not None:
+        captured.extend(metrics)
+        return
+
+    for exporter in get_exporters():
+        try:
+            exporter.export(metrics)
+        except Exception:
+            logging.exception("Failed to export metrics to %s", exporter)
+
+
+def _clean_label(value: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in value.lower())
+
+
+def _escape_label_value(value: Any) -> str:
+    # Escapes defined by the Prometheus text exposition format
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
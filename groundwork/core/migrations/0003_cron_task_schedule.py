@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_cron_task_runs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="crontaskstate",
+            name="schedule",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+    ]
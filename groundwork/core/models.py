@@ -0,0 +1,96 @@
+from django.db import models
+
+
+class CronTaskState(models.Model):
+    """
+    Persisted schedule of a cron task, so that schedules survive restarts and are shared between processes.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    """
+    Stable name identifying the task.
+    """
+
+    last_run = models.DateTimeField(null=True, blank=True)
+    """
+    Time the task was last started by any process.
+    """
+
+    next_run = models.DateTimeField()
+    """
+    Time the task is next due to run.
+    """
+
+    schedule = models.CharField(max_length=255, blank=True, default="")
+    """
+    Signature of the schedule `next_run` was calculated from. When the task's schedule changes, `next_run` is
+    recalculated.
+    """
+
+    class Meta:
+        verbose_name = "cron task state"
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class CronTaskRun(models.Model):
+    """
+    Record of a cron task being run, used to size workers and intervals from real data.
+    """
+
+    class Outcome(models.TextChoices):
+        RUNNING = "running"
+        SUCCEEDED = "succeeded"
+        FAILED = "failed"
+        SKIPPED = "skipped"
+
+    task_name = models.CharField(max_length=255)
+    """
+    Stable name identifying the task.
+    """
+
+    scheduled_time = models.DateTimeField(null=True, blank=True)
+    """
+    Time the run was scheduled for. Empty for runs that weren't scheduled, such as `run_cron_tasks --once`.
+    """
+
+    start_time = models.DateTimeField()
+    """
+    Time the run started.
+    """
+
+    end_time = models.DateTimeField(null=True, blank=True)
+    """
+    Time the run finished.
+    """
+
+    duration = models.FloatField(null=True, blank=True)
+    """
+    Duration of the run in seconds.
+    """
+
+    lag = models.FloatField(null=True, blank=True)
+    """
+    Seconds between the time the run was scheduled for and the time it started.
+    """
+
+    outcome = models.CharField(
+        max_length=16, choices=Outcome.choices, default=Outcome.RUNNING
+    )
+    """
+    Whether the run succeeded, failed, was skipped or is still running.
+    """
+
+    exception = models.TextField(blank=True)
+    """
+    Traceback of the exception that failed the run, or the reason it was skipped.
+    """
+
+    class Meta:
+        verbose_name = "cron task run"
+        ordering = ("-start_time",)
+        indexes = [models.Index(fields=("task_name", "start_time"))]
+
+    def __str__(self) -> str:
+        return f"{self.task_name} at {self.start_time}"
@@ -0,0 +1,8 @@
+from django.dispatch import Signal
+
+sync_completed = Signal()
+"""
+Sent after `SyncManager` finishes syncing a model, whether fully or partially.
+
+The sender is the model class. Receivers are passed `summary`, the `SyncSummary` describing the sync.
+"""
@@ -0,0 +1,184 @@
+"""
+Policies for handling local rows whose resource is no longer returned by a `SyncedModel`'s datasource.
+
+Set one on a model's `SyncConfig` to have it applied after each successful full sync:
+
+```python
+class Constituency(SyncedModel):
+    sync_config = SyncConfig(
+        datasource=parliament.constituencies,
+        stale_policy=DeleteStale(),
+    )
+```
+"""
+
+from typing import Any, Dict, List, Type
+
+from abc import ABCMeta, abstractmethod
+from datetime import datetime
+
+from django.db import connections, models, router, transaction
+
+
+class StalePolicy(metaclass=ABCMeta):
+    """
+    Abstract interface for sweeping stale rows after a full sync.
+
+    A row is stale if its `last_sync_time` is earlier than the time the full sync started. Stale rows are swept in
+    batches, each batch in its own transaction, to avoid holding long locks on the table.
+    """
+
+    batch_size: int = 1000
+    """
+    Maximum number of rows swept per statement.
+    """
+
+    def __init__(self, batch_size: int = 1000) -> None:
+        self.batch_size = batch_size
+
+    def sweep(self, model: Type[models.Model], sync_time: datetime) -> int:
+        """
+        Sweep every row that was not synced at or after `sync_time`.
+
+        Args:
+            model: The model class to sweep.
+            sync_time: Time that the full sync started.
+
+        Returns:
+            The number of rows swept.
+        """
+
+        swept = 0
+
+        while True:
+            with transaction.atomic(using=router.db_for_write(model)):
+                pks = list(
+                    self.get_stale_queryset(model, sync_time).values_list(
+                        "pk", flat=True
+                    )[: self.batch_size]
+                )
+                if not pks:
+                    return swept
+
+                self.sweep_batch(model, pks)
+
+            swept += len(pks)
+
+    def get_stale_queryset(
+        self, model: Type[models.Model], sync_time: datetime
+    ) -> models.QuerySet:
+        """
+        Return the rows that should be swept.
+
+        Args:
+            model: The model class to sweep.
+            sync_time: Time that the full sync started.
+
+        Returns:
+            A queryset of stale rows.
+        """
+
+        return model._default_manager.filter(last_sync_time__lt=sync_time)
+
+    def get_live_attrs(self) -> Dict[str, Any]:
+        """
+        Return attributes to assign to every row that is synced, for policies that need to revive rows that
+        reappear in the datasource.
+
+        Returns:
+            A dictionary of properties suitable for assigning to a synced instance.
+        """
+
+        return {}
+
+    @abstractmethod
+    def sweep_batch(self, model: Type[models.Model], pks: List[Any]) -> None:
+        """
+        Sweep a batch of stale rows.
+
+        Args:
+            model: The model class to sweep.
+            pks: Primary keys of the stale rows.
+        """
+
+
+class DeleteStale(StalePolicy):
+    """
+    Delete stale rows.
+    """
+
+    def sweep_batch(self, model: Type[models.Model], pks: List[Any]) -> None:
+        model._default_manager.filter(pk__in=pks).delete()
+
+
+class FlagStale(StalePolicy):
+    """
+    Soft-delete stale rows by setting a boolean field on them. The flag is cleared if the resource reappears in the
+    datasource.
+    """
+
+    def __init__(self, field: str = "is_stale", **kwargs: Any) -> None:
+        """
+        Args:
+            field: Name of a boolean field on the model that flags the row as stale.
+            kwargs: Keyword args passed to `StalePolicy`.
+        """
+
+        super().__init__(**kwargs)
+        self.field = field
+
+    def get_stale_queryset(
+        self, model: Type[models.Model], sync_time: datetime
+    ) -> models.QuerySet:
+        return (
+            super().get_stale_queryset(model, sync_time).filter(**{self.field: False})
+        )
+
+    def get_live_attrs(self) -> Dict[str, Any]:
+        return {self.field: False}
+
+    def sweep_batch(self, model: Type[models.Model], pks: List[Any]) -> None:
+        model._default_manager.filter(pk__in=pks).update(**{self.field: True})
+
+
+class ArchiveStale(StalePolicy):
+    """
+    Move stale rows into an archive table, then delete them.
+
+    The archive model should declare a field for each field of the synced model that you want to keep, with the
+    same name. Rows are copied with a single `INSERT … SELECT` statement per batch.
+    """
+
+    def __init__(self, archive_model: Type[models.Model], **kwargs: Any) -> None:
+        """
+        Args:
+            archive_model: Model that stale rows are copied into.
+            kwargs: Keyword args passed to `StalePolicy`.
+        """
+
+        super().__init__(**kwargs)
+        self.archive_model = archive_model
+
+    def sweep_batch(self, model: Type[models.Model], pks: List[Any]) -> None:
+        source_fields = {field.name: field for field in model._meta.concrete_fields}
+        fields = [
+            (field, source_fields[field.name])
+            for field in self.archive_model._meta.concrete_fields
+            if field.name in source_fields
+        ]
+
+        queryset = model._default_manager.filter(pk__in=pks)
+        select_sql, params = queryset.values_list(
+            *(source.attname for _, source in fields)
+        ).query.sql_with_params()
+
+        connection = connections[router.db_for_write(self.archive_model)]
+        columns = ", ".join(
+            connection.ops.quote_name(field.column) for field, _ in fields
+        )
+        table = connection.ops.quote_name(self.archive_model._meta.db_table)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {table} ({columns}) {select_sql}", params)
+
+        queryset.delete()
@@ -0,0 +1,285 @@
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Type
+
+import hashlib
+import hmac
+import json
+import logging
+import threading
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+
+from groundwork.core.datasources import SyncedModel
+from groundwork.core.internal.collection_util import batched
+
+
+def sign_webhook_payload(body: bytes, secret: str) -> str:
+    """
+    Return the signature expected by `SyncWebhookView` for a notification body.
+
+    Use this when sending notifications from your own systems, or to sign requests made in tests.
+
+    Args:
+        body: The raw request body.
+        secret: Secret shared between the sender and receiver of the notification.
+
+    Returns:
+        Hex-encoded HMAC-SHA256 digest of the body.
+    """
+
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+class TargetedSyncQueue:
+    """
+    Collects change notifications for `SyncedModel`s and syncs the changed resources in batches.
+
+    Notifications are debounced: the first notification received starts a timer, and every resource id received
+    before it fires is synced once when it does. Duplicate notifications within that window are collapsed.
+    """
+
+    def __init__(
+        self,
+        debounce: timedelta = timedelta(seconds=5),
+        batch_size: int = 100,
+        autoflush: bool = True,
+    ) -> None:
+        """
+        Args:
+            debounce: Time to wait after the first notification before syncing.
+            batch_size: Maximum number of resources to sync in one batch.
+            autoflush: Flush automatically when the debounce window ends. If `False`, `flush()` must be called
+                explicitly.
+        """
+
+        self.debounce = debounce
+        self.batch_size = batch_size
+        self.autoflush = autoflush
+        self.pending: Dict[Type[SyncedModel], Set[Any]] = {}
+
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def add(self, model: Type[SyncedModel], ids: Iterable[Any]) -> int:
+        """
+        Schedule resources to be synced at the end of the current debounce window.
+
+        Args:
+            model: The model class to sync the resources into.
+            ids: External identifiers of the changed resources.
+
+        Returns:
+            The number of resources newly scheduled, excluding ones that were already pending.
+        """
+
+        with self._lock:
+            pending = self.pending.setdefault(model, set())
+            count = len(pending)
+            pending.update(ids)
+            added = len(pending) - count
+
+            if added and self.autoflush and self._timer is None:
+                self._timer = threading.Timer(
+                    self.debounce.total_seconds(), self._autoflush
+                )
+                self._timer.daemon = True
+                self._timer.start()
+
+        return added
+
+    def flush(self) -> None:
+        """
+        Sync all pending resources immediately.
+        """
+
+        with self._lock:
+            pending, self.pending = self.pending, {}
+            self._timer = None
+
+        for model, ids in pending.items():
+            for batch in batched(sorted(ids, key=str), self.batch_size):
+                try:
+                    model.sync_ids(batch)
+                except Exception:
+                    logging.exception(
+                        "Targeted sync of %s failed", model._meta.verbose_name_plural
+                    )
+
+    def _autoflush(self) -> None:
+        """
+        Flush at the end of the debounce window. Runs in its own thread, so closes the database connections it
+        opened when it finishes.
+        """
+
+        try:
+            self.flush()
+        finally:
+            connections.close_all()
+
+
+default_sync_queue = TargetedSyncQueue()
+"""
+Queue used by `SyncWebhookView` unless another one is configured.
+"""
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class SyncWebhookView(View):
+    """
+    Receives signed change notifications and schedules targeted syncs of the resources they refer to.
+
+    By default, the request body is expected to be a JSON object (or list of objects) of the form:
+
+    ```json
+    {"model": "app_label.ModelName", "ids": ["rec123", "rec456"]}
+    ```
+
+    Where `model` is a `SyncedModel` and `ids` are the external ids of the resources that have changed. Override
+    `get_sync_targets()` to accept other notification formats.
+
+    Requests must be signed by setting the `X-Groundwork-Signature` header to the value returned by
+    `sign_webhook_payload()` for the request body.
+
+    __Example:__
+
+    ```python
+    urlpatterns = [
+        path("webhooks/sync/", SyncWebhookView.as_view(models=[Constituency])),
+    ]
+    ```
+
+    As with class-based views, configuration can all either be provided as keyword-args to `as_view()`, or
+    overridden in subclasses.
+    """
+
+    http_method_names = ["post"]
+
+    secret: Optional[str] = None
+    """
+    Secret used to verify notification signatures. If not defined, will default to the value of
+    `django.conf.settings.GROUNDWORK_WEBHOOK_SECRET`.
+    """
+
+    signature_header: str = "X-Groundwork-Signature"
+    """
+    Request header containing the notification signature.
+    """
+
+    models: Optional[Iterable[Type[SyncedModel]]] = None
+    """
+    Models that notifications may refer to. If not defined, notifications may refer to any `SyncedModel`.
+    """
+
+    queue: Optional[TargetedSyncQueue] = None
+    """
+    Queue used to schedule syncs. Defaults to `default_sync_queue`.
+    """
+
+    def post(self, request: HttpRequest) -> HttpResponse:
+        if not self.verify_signature(request):
+            return JsonResponse({"error": "Invalid signature"}, status=403)
+
+        try:
+            payload = json.loads(request.body)
+            targets = list(self.get_sync_targets(payload))
+        except ValueError as err:
+            return JsonResponse({"error": str(err)}, status=400)
+
+        queue = self.queue or default_sync_queue
+        scheduled = sum(queue.add(model, ids) for model, ids in targets)
+
+        return JsonResponse({"scheduled": scheduled}, status=202)
+
+    def verify_signature(self, request: HttpRequest) -> bool:
+        """
+        Check that the request was signed with the shared secret.
+
+        Args:
+            request: The incoming notification request.
+
+        Raises:
+            ImproperlyConfigured: If no secret has been configured.
+
+        Returns:
+            True if the request signature is valid.
+        """
+
+        secret = self.secret or getattr(settings, "GROUNDWORK_WEBHOOK_SECRET", None)
+        if not secret:
+            raise ImproperlyConfigured(
+                "SyncWebhookView requires a secret or settings.GROUNDWORK_WEBHOOK_SECRET"
+            )
+
+        signature = request.headers.get(self.signature_header, "")
+        return hmac.compare_digest(
+            signature, sign_webhook_payload(request.body, secret)
+        )
+
+    def get_sync_targets(
+        self, payload: Any
+    ) -> Iterable[Tuple[Type[SyncedModel], List[Any]]]:
+        """
+        Map a parsed notification onto the models and resources that should be synced.
+
+        Args:
+            payload: The parsed JSON request body.
+
+        Raises:
+            ValueError: If the notification is malformed or refers to a model that can't be synced.
+
+        Yields:
+            Tuples of model class and the external ids of resources to sync into it.
+        """
+
+        notifications = payload if isinstance(payload, list) else [payload]
+
+        for notification in notifications:
+            if not isinstance(notification, dict):
+                raise ValueError("Expected a notification object")
+
+            ids = notification.get("ids")
+            if not isinstance(ids, list):
+                raise ValueError("Expected a list of ids")
+
+            if not all(
+                isinstance(id, (str, int)) and not isinstance(id, bool) for id in ids
+            ):
+                raise ValueError("Expected ids to be strings or integers")
+
+            yield self.get_model(notification.get("model")), ids
+
+    def get_model(self, label: Any) -> Type[SyncedModel]:
+        """
+        Look up the model referred to by a notification.
+
+        Args:
+            label: Model label, in the form `app_label.ModelName`.
+
+        Raises:
+            ValueError: If the label doesn't refer to a model that can be synced.
+
+        Returns:
+            The referenced model class.
+        """
+
+        if not isinstance(label, str):
+            raise ValueError(f"Expected a model label, got {label!r}")
+
+        try:
+            model = apps.get_model(label)
+        except (LookupError, ValueError):
+            raise ValueError(f"Unknown model: {label}")
+
+        if not issubclass(model, SyncedModel) or (
+            self.models is not None and model not in self.models
+        ):
+            raise ValueError(f"Model cannot be synced: {label}")
+
+        return model
@@ -1,8 +1,8 @@
-from typing import TypeVar
+from typing import List, TypeVar
 
 from dataclasses import dataclass
 
-from groundwork.core.datasources import RestDatasource
+from groundwork.core.datasources import RestDatasource, SyncPartition, offset_partitions
 
 
 class OnsCodeType:
@@ -39,20 +39,30 @@ class _ONSApiDatasource(RestDatasource[ResourceT]):
     def paginate(self, **kwargs):
         kwargs.setdefault("limit", 100)
 
-        i = 0
+        # `stop` is not passed to the API – it limits pagination to the results before that offset so that the
+        # datasource can be partitioned.
+        stop = kwargs.pop("stop", None)
+        i = kwargs.get("offset", 0)
 
         while True:
             res = self.fetch_url(self.url, kwargs)
 
             for item in res["items"]:
+                if stop is not None and i >= stop:
+                    return
+
                 yield item
                 i += 1
 
-            if i >= res["total_count"]:
+            if i >= res["total_count"] or (stop is not None and i >= stop):
                 return
 
             kwargs["offset"] = i
 
+    def get_partitions(self, count: int) -> List[SyncPartition]:
+        res = self.fetch_url(self.url, {"limit": 1})
+        return offset_partitions(res["total_count"], count, "offset")
+
 
 constituency_codes: RestDatasource[OnsCode] = _ONSApiDatasource(
     path="/code-lists/parliamentary-constituencies/editions/one-off/codes",
@@ -1,4 +1,4 @@
-from typing import Any, Dict, Optional, TypeVar, cast
+from typing import Any, Dict, List, Optional, TypeVar, cast
 
 import re
 from dataclasses import dataclass, field
@@ -7,7 +7,7 @@ from datetime import datetime
 from djangorestframework_camel_case.parser import CamelCaseJSONParser
 
 from groundwork.core.cache import django_cached
-from groundwork.core.datasources import RestDatasource
+from groundwork.core.datasources import RestDatasource, SyncPartition, offset_partitions
 from groundwork.geo.territories.uk import ons
 from groundwork.geo.territories.uk.internal.serializers import embedded_value
 
@@ -112,19 +112,29 @@ class _ParliamentApiDatasource(RestDatasource[ResourceT]):
         kwargs.setdefault("searchText", "")
         url = self.url + self.list_suffix
 
-        i = 0
+        # `stop` is not passed to the API – it limits pagination to the results before that offset so that the
+        # datasource can be partitioned.
+        stop = kwargs.pop("stop", None)
+        i = kwargs.get("skip", 0)
 
         while True:
             res = self.fetch_url(url, kwargs)
 
             for item in res["items"]:
+                if stop is not None and i >= stop:
+                    return
+
                 yield item["value"]
                 i += 1
 
             kwargs["skip"] = i
-            if i >= res["total_results"]:
+            if i >= res["total_results"] or (stop is not None and i >= stop):
                 return
 
+    def get_partitions(self, count: int) -> List[SyncPartition]:
+        res = self.fetch_url(self.url + self.list_suffix, {"searchText": "", "take": 1})
+        return offset_partitions(res["total_results"], count, "skip")
+
 
 class _ParliamentSmallListApiDatasource(_ParliamentApiDatasource[ResourceT]):
     """
@@ -154,7 +164,7 @@ class _ParliamentConstituenciesDatasource(_ParliamentApiDatasource[Constituency]
         data["ons_code"] = ons_lookup[constituency_name]
         return super().deserialize(data)
 
-    @django_cached(__name__ + ".ons_code_lookup")
+    @django_cached(__name__ + ".ons_code_lookup", stampede="lock")
     def get_ons_code_lookup(self):
         # Retreive constituency codes mapped to official constituency name. This is the only common identifier shared
         # by ons and parliament APIs. Although not the most robust imaginable way of doing this, we figure it is better
@@ -0,0 +1,168 @@
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+
+class AirtableStubServer:
+    """
+    In-memory stand-in for the Airtable REST API, served over HTTP on a local port.
+
+    Supports listing (with `pageSize`, `offset` and `fields[]`), getting, creating, updating and upserting records.
+    Like Airtable, rejects writes of more than 10 records. Records with a field value of `"INVALID"` are rejected, so
+    tests can simulate partial failures.
+    """
+
+    def __init__(self):
+        self.tables = {}
+        self.requests = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/v0"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def add_records(self, base_id, table_name, *fields):
+        table = self.tables.setdefault((base_id, table_name), {})
+
+        for values in fields:
+            id = f"rec{uuid.uuid4().hex[:14]}"
+            table[id] = dict(values)
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                table, record_id, query = self.parse()
+
+                if record_id is not None:
+                    if record_id not in table:
+                        return self.reply(404, {"error": "NOT_FOUND"})
+
+                    return self.reply(200, self.format(record_id, table[record_id]))
+
+                fields = query.get("fields[]")
+                page_size = int(query.get("pageSize", ["100"])[0])
+                offset = int(query.get("offset", ["0"])[0])
+                ids = list(table)[offset : offset + page_size]
+
+                data = {"records": [self.format(id, table[id], fields) for id in ids]}
+                if offset + page_size < len(table):
+                    data["offset"] = str(offset + page_size)
+
+                self.reply(200, data)
+
+            def do_POST(self):
+                table, _, _ = self.parse()
+                body = self.read_body()
+                if not self.validate(body):
+                    return
+
+                records = []
+                for record in body["records"]:
+                    id = f"rec{uuid.uuid4().hex[:14]}"
+                    table[id] = record["fields"]
+                    records.append(self.format(id, table[id]))
+
+                self.reply(200, {"records": records})
+
+            def do_PATCH(self):
+                table, _, _ = self.parse()
+                body = self.read_body()
+                if not self.validate(body):
+                    return
+
+                upsert = body.get("performUpsert")
+                records, created, updated = [], [], []
+
+                for record in body["records"]:
+                    id = record.get("id")
+
+                    if upsert is not None:
+                        merge_on = upsert["fieldsToMergeOn"]
+                        id = next(
+                            (
+                                existing_id
+                                for existing_id, existing in table.items()
+                                if all(
+                                    existing.get(key) == record["fields"].get(key)
+                                    for key in merge_on
+                                )
+                            ),
+                            None,
+                        )
+
+                    if id is None:
+                        id = f"rec{uuid.uuid4().hex[:14]}"
+                        table[id] = {}
+                        created.append(id)
+                    elif id not in table:
+                        return self.reply(404, {"error": "NOT_FOUND"})
+                    else:
+                        updated.append(id)
+
+                    table[id].update(record["fields"])
+                    records.append(self.format(id, table[id]))
+
+                data = {"records": records}
+                if upsert is not None:
+                    data.update(createdRecords=created, updatedRecords=updated)
+
+                self.reply(200, data)
+
+            def parse(self):
+                stub.requests.append((self.command, self.path))
+                url = urlparse(self.path)
+                parts = [unquote(x) for x in url.path.split("/")[2:]]
+                table = stub.tables.setdefault((parts[0], parts[1]), {})
+                record_id = parts[2] if len(parts) > 2 and parts[2] else None
+
+                return table, record_id, parse_qs(url.query)
+
+            def read_body(self):
+                length = int(self.headers["Content-Length"])
+                return json.loads(self.rfile.read(length))
+
+            def validate(self, body):
+                records = body["records"]
+
+                if len(records) > 10:
+                    self.reply(422, {"error": "INVALID_RECORDS"})
+                    return False
+
+                if any("INVALID" in record["fields"].values() for record in records):
+                    self.reply(422, {"error": "INVALID_VALUE_FOR_COLUMN"})
+                    return False
+
+                return True
+
+            def format(self, id, values, fields=None):
+                if fields is not None:
+                    values = {key: val for key, val in values.items() if key in fields}
+
+                return {"id": id, "fields": values}
+
+            def reply(self, status, data):
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
@@ -1,6 +1,9 @@
 import os
+import time
 from dataclasses import dataclass
+from test.contrib.airtable.stub_server import AirtableStubServer
 from test.tags import integration_test
+from unittest.mock import patch
 
 from django.conf import settings
 from django.test import TestCase
@@ -33,6 +36,175 @@ class AirtableApiTests(TestCase):
         resource_type.get(resource_type.get_id(resource))
 
 
+class AirtableDatasourceTests(TestCase):
+    def setUp(self):
+        self.datasource = datasources.AirtableDatasource(
+            resource_type=MyResource,
+            api_key="key",
+            base_id="base",
+            table_name="Table 1",
+        )
+
+    def test_requests_mapped_fields(self):
+        record = {"id": "rec1", "fields": {"Name": "Clara"}}
+
+        with patch.object(
+            self.datasource, "fetch_url", side_effect=[{"records": [record]}, record]
+        ) as fetch_url:
+            (resource,) = self.datasource.list()
+            self.datasource.get("rec1")
+
+        self.assertEqual(resource.name, "Clara")
+        self.assertEqual(resource.notes, "", "substitutes falsy values")
+
+        for call in fetch_url.call_args_list:
+            self.assertEqual(call.args[1]["fields[]"], ["Name", "Notes"])
+
+    def test_deserializes_without_introspection(self):
+        record = {"id": "rec1", "fields": {"Notes": "Hello"}}
+
+        with patch.object(datasources, "get_type_info", side_effect=AssertionError):
+            resource = self.datasource.deserialize(record)
+
+        self.assertEqual((resource.name, resource.notes), ("", "Hello"))
+
+    def test_prefetches_pages(self):
+        pages = [
+            {"records": [{"id": f"rec{i}", "fields": {}}], "offset": str(i)}
+            for i in range(4)
+        ]
+        del pages[-1]["offset"]
+
+        datasource = datasources.AirtableDatasource(
+            resource_type=MyResource,
+            base_id="base",
+            table_name="Table 1",
+            prefetch=2,
+            page_size=1,
+        )
+
+        with patch.object(datasource, "fetch_url", side_effect=pages) as fetch_url:
+            resources = list(datasource.list())
+
+        self.assertEqual([x.id for x in resources], ["rec0", "rec1", "rec2", "rec3"])
+        self.assertEqual(fetch_url.call_args.args[1]["pageSize"], 1)
+
+    def test_rejects_page_sizes_over_limit(self):
+        with self.assertRaises(ValueError):
+            datasources.AirtableDatasource(
+                resource_type=MyResource, base_id="base", table_name="t", page_size=101
+            )
+
+    def test_rate_limits_requests(self):
+        limiter = datasources.RateLimiter(requests_per_second=50)
+
+        start = time.monotonic()
+        for _ in range(6):
+            limiter.wait()
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+
+
+class AirtableWriteTests(TestCase):
+    def setUp(self):
+        self.server = AirtableStubServer().__enter__()
+        self.addCleanup(self.server.__exit__)
+
+        self.datasource = datasources.AirtableDatasource(
+            resource_type=MyResource,
+            base_url=self.server.url,
+            base_id="stub",
+            table_name="Table 1",
+            requests_per_second=1000,
+        )
+
+    def test_lists_from_stub_server(self):
+        self.server.add_records(
+            "stub", "Table 1", *({"Name": str(i), "Other": "x"} for i in range(5))
+        )
+        self.datasource.page_size = 2
+        self.datasource.prefetch = 1
+
+        resources = list(self.datasource.list())
+
+        self.assertEqual([x.name for x in resources], ["0", "1", "2", "3", "4"])
+        self.assertEqual(self.datasource.get(resources[0].id).name, "0")
+
+    def test_creates_in_batches(self):
+        result = self.datasource.create_many(
+            MyResource(id="", name=str(i), notes="") for i in range(25)
+        )
+
+        self.assertTrue(result.ok)
+        self.assertEqual(len(result.created), 25)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(list(self.datasource.list())), 25)
+
+    def test_reports_partial_failures(self):
+        self.server.add_records(
+            "stub", "Table 1", *({"Name": str(i)} for i in range(25))
+        )
+        resources = list(self.datasource.list())
+        for resource in resources:
+            resource.notes = "updated"
+        resources[12].notes = "INVALID"
+
+        result = self.datasource.update_many(resources)
+
+        self.assertFalse(result.ok)
+        self.assertEqual(len(result.updated), 15)
+        (failure,) = result.failed
+        self.assertEqual(failure.resources, resources[10:20])
+        self.assertIn("422", str(failure.error))
+
+    def test_continues_after_unexpected_errors(self):
+        serialize = self.datasource.serialize
+
+        def serialize_or_fail(resource, fields=None):
+            if resource.name == "5":
+                raise ValueError("Can't serialize")
+
+            return serialize(resource, fields)
+
+        with patch.object(self.datasource, "serialize", serialize_or_fail):
+            result = self.datasource.create_many(
+                MyResource(id="", name=str(i), notes="") for i in range(25)
+            )
+
+        self.assertEqual(len(result.created), 15)
+        (failure,) = result.failed
+        self.assertIsInstance(failure.error, ValueError)
+
+    def test_upserts(self):
+        self.server.add_records("stub", "Table 1", {"Name": "Clara", "Notes": "old"})
+
+        result = self.datasource.upsert_many(
+            [
+                MyResource(id="", name="Clara", notes="new"),
+                MyResource(id="", name="Stafford", notes="new"),
+            ],
+            merge_on=["name"],
+        )
+
+        self.assertEqual((len(result.created), len(result.updated)), (1, 1))
+        self.assertEqual(
+            sorted((x.name, x.notes) for x in self.datasource.list()),
+            [("Clara", "new"), ("Stafford", "new")],
+        )
+
+    def test_validates_merge_fields_before_writing(self):
+        resources = [MyResource(id="", name="Clara", notes="new")]
+
+        for merge_on in ([], ["name", "notes", "id", "name"], ["missing"]):
+            with self.subTest(merge_on=merge_on), self.assertRaises(ValueError):
+                self.datasource.upsert_many(resources, merge_on=merge_on)
+
+        with self.assertRaisesRegex(ValueError, "name"):
+            self.datasource.upsert_many(resources, merge_on=["name"], fields=["notes"])
+
+        self.assertEqual(self.server.requests, [])
+
+
 @dataclass
 class MyResource:
     id: str
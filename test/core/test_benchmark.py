@@ -0,0 +1,99 @@
+import os
+import tempfile
+from io import StringIO
+from test.core.test_synced_model import SomeRelatedModel, SomeSyncedModel
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from groundwork.core.benchmark import (
+    BenchmarkOptions,
+    BenchmarkResult,
+    compare_to_baseline,
+    run_sync_benchmark,
+)
+
+
+class SyncBenchmarkTestCase(TestCase):
+    def setUp(self) -> None:
+        SomeSyncedModel.sync_config = SomeSyncedModel.initial_config()
+        SomeRelatedModel.sync_config = SomeRelatedModel.initial_config()
+
+    def test_runs_benchmark_and_rolls_back(self):
+        config = SomeSyncedModel.sync_config
+
+        result = run_sync_benchmark(
+            SomeSyncedModel,
+            BenchmarkOptions(resources=50, fanout=5, m2m_width=2, embedded_ratio=0.5),
+        )
+
+        self.assertEqual(result.rows, 50)
+        self.assertGreater(result.queries_per_row, 0)
+        self.assertIn("write", result.timings)
+        self.assertEqual(SomeSyncedModel.objects.count(), 0)
+        self.assertIs(SomeSyncedModel.sync_config, config, "restores sync config")
+
+    def test_detects_regressions(self):
+        baseline = BenchmarkResult(
+            model="test.SomeSyncedModel",
+            rows=100,
+            duration=1,
+            rows_per_second=100,
+            queries=500,
+            queries_per_row=5,
+            peak_rss_mb=100,
+        )
+        result = BenchmarkResult(
+            model="test.SomeSyncedModel",
+            rows=100,
+            duration=2,
+            rows_per_second=50,
+            queries=500,
+            queries_per_row=5,
+            peak_rss_mb=105,
+        )
+
+        self.assertEqual(
+            compare_to_baseline(result, baseline),
+            ["rows_per_second: 100 -> 50 (-50.0%)"],
+        )
+
+    def test_refuses_baselines_with_different_options(self):
+        baseline = run_sync_benchmark(SomeSyncedModel, BenchmarkOptions(resources=20))
+        baseline = BenchmarkResult.from_json(baseline.to_json())
+        self.assertEqual(baseline.options, BenchmarkOptions(resources=20))
+
+        result = run_sync_benchmark(SomeSyncedModel, BenchmarkOptions(resources=10))
+
+        with self.assertRaisesMessage(ValueError, "resources=20 (got 10)"):
+            compare_to_baseline(result, baseline)
+
+    def test_command_compares_against_baseline(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "baseline.json")
+            stdout = StringIO()
+
+            call_command(
+                "benchmark_sync",
+                "test.SomeSyncedModel",
+                resources=20,
+                save_baseline=path,
+                stdout=stdout,
+            )
+            self.assertIn("Rows/s:", stdout.getvalue())
+
+            with open(path) as f:
+                baseline = BenchmarkResult.from_json(f.read())
+
+            baseline.queries_per_row /= 2
+            with open(path, "w") as f:
+                f.write(baseline.to_json())
+
+            with self.assertRaisesMessage(CommandError, "queries_per_row"):
+                call_command(
+                    "benchmark_sync",
+                    "test.SomeSyncedModel",
+                    resources=20,
+                    baseline=path,
+                    stdout=StringIO(),
+                )
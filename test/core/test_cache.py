@@ -1,9 +1,37 @@
-from django.test import TestCase
+from types import SimpleNamespace
 
-from groundwork.core.cache import cache, django_cached, django_cached_model_property
+import asyncio
+import inspect
+import os
+import threading
+import time
+import uuid
+from io import StringIO
+from test.core.test_synced_model import SomeArchivedModel, SomeRelatedModel
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from groundwork.core import metrics
+from groundwork.core.cache import (
+    cache,
+    django_cached,
+    django_cached_batch,
+    django_cached_model_property,
+)
+from groundwork.core.datasources import MockDatasource, SyncConfig
+from groundwork.core.internal import cache_stats
+from groundwork.core.internal.cache_stats import flush_cache_stats, get_cache_reports
+from groundwork.core.internal.sync_manager import SyncManager
 
 
 class CacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
     def test_gets_from_cache(self):
         @django_cached("test_gets_from_cache", get_key=lambda x: x)
         def cached_fn(x):
@@ -49,3 +77,600 @@ class CacheTestCase(TestCase):
 
         res = instance.cached_fn(13)
         self.assertEqual(res, 2, "distinguishes between serialized parameters")
+
+
+class StampedeTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def call_concurrently(self, fn, count=10):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(fn())) for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+
+        return results
+
+    def test_lock_recomputes_once(self):
+        calls = []
+
+        @django_cached("test_lock_recomputes_once", stampede="lock", lock_timeout=5)
+        def slow():
+            calls.append(1)
+            time.sleep(0.2)
+            return len(calls)
+
+        results = self.call_concurrently(slow)
+
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, [1] * 10, "waiting callers get the recomputed value")
+
+    def test_lock_serves_stale_value_while_recomputing(self):
+        calls = []
+
+        @django_cached("test_lock_serves_stale", ttl=1, stampede="lock", lock_timeout=5)
+        def slow():
+            calls.append(1)
+            time.sleep(0.2)
+            return len(calls)
+
+        slow()
+        with patch("groundwork.core.cache.time.time", return_value=time.time() + 2):
+            results = self.call_concurrently(slow)
+
+        self.assertEqual(calls, [1, 1])
+        self.assertEqual(sorted(results), [1] * 9 + [2])
+
+    def test_early_expiration(self):
+        calls = []
+
+        @django_cached("test_early_expiration", ttl=100, stampede="early")
+        def fn():
+            calls.append(1)
+            time.sleep(0.05)
+            return len(calls)
+
+        with patch("groundwork.core.cache.random.random", return_value=0.5):
+            fn()
+            self.assertEqual(fn(), 1, "doesn’t recompute long before expiry")
+
+            with patch(
+                "groundwork.core.cache.time.time", return_value=time.time() + 99.99
+            ):
+                self.assertEqual(fn(), 2, "recomputes when close to expiry")
+
+
+class LocalCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_serves_from_local_cache(self):
+        calls = []
+
+        @django_cached("test_local_cache", get_key=lambda x: x, local_ttl=60)
+        def fn(x):
+            calls.append(x)
+            return x * 2
+
+        self.assertEqual(fn(1), 2)
+        cache.clear()
+
+        self.assertEqual(fn(1), 2, "serves from the local cache")
+        self.assertEqual(calls, [1])
+
+    def test_evicts_least_recently_used(self):
+        calls = []
+
+        @django_cached(
+            "test_local_evicts", get_key=lambda x: x, local_ttl=60, local_size=2
+        )
+        def fn(x):
+            calls.append(x)
+            return x
+
+        fn(1)
+        fn(2)
+        fn(1)
+        fn(3)
+        cache.clear()
+
+        fn(1)
+        fn(2)
+        self.assertEqual(calls, [1, 2, 3, 2])
+
+    def test_invalidates_other_processes(self):
+        calls = []
+
+        def fn():
+            calls.append(1)
+            return len(calls)
+
+        # Two decorated copies of the function stand in for two processes sharing a cache
+        first = django_cached("test_local_invalidate", local_ttl=60)(fn)
+        second = django_cached("test_local_invalidate", local_ttl=60)(fn)
+
+        self.assertEqual(first(), 1)
+        self.assertEqual(second(), 1)
+
+        first.cache.invalidate()
+        self.assertEqual(first(), 2, "invalidates the local cache immediately")
+
+        with patch(
+            "groundwork.core.cache.time.monotonic", return_value=time.monotonic() + 2
+        ):
+            self.assertEqual(second(), 2, "sees the new generation after a second")
+
+
+class StaleWhileRevalidateTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def wait_for_refresh(self, key):
+        deadline = time.monotonic() + 5
+        while cache.get(f"{key}.lock") is not None and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_serves_stale_value_while_refreshing(self):
+        calls = []
+
+        @django_cached("test_stale", ttl=10, stale_ttl=60)
+        def fn():
+            calls.append(1)
+            time.sleep(0.1)
+            return len(calls)
+
+        self.assertEqual(fn(), 1)
+
+        with patch("groundwork.core.cache.time.time", return_value=time.time() + 20):
+            results = [fn() for _ in range(5)]
+            self.wait_for_refresh("test_stale")
+
+            self.assertEqual(results, [1] * 5, "serves the stale value")
+            self.assertEqual(len(calls), 2, "refreshes once in the background")
+            self.assertEqual(fn(), 2)
+
+    def test_recomputes_after_hard_ttl(self):
+        calls = []
+
+        @django_cached("test_stale_hard_ttl", ttl=10, stale_ttl=60)
+        def fn():
+            calls.append(1)
+            return len(calls)
+
+        fn()
+        with patch("groundwork.core.cache.time.time", return_value=time.time() + 100):
+            self.assertEqual(fn(), 2)
+
+    def test_logs_refresh_failures(self):
+        calls = []
+
+        @django_cached("test_stale_failure", ttl=10, stale_ttl=60)
+        def fn():
+            calls.append(1)
+            if len(calls) > 1:
+                raise ValueError("upstream down")
+            return len(calls)
+
+        fn()
+        with patch("groundwork.core.cache.time.time", return_value=time.time() + 20):
+            with self.assertLogs(level="ERROR"):
+                self.assertEqual(fn(), 1)
+                self.wait_for_refresh("test_stale_failure")
+
+            self.assertEqual(fn(), 1, "keeps serving the stale value")
+
+
+class NegativeCachingTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_caches_none(self):
+        calls = []
+
+        @django_cached("test_caches_none", ttl=500, negative_ttl=10)
+        def fn():
+            calls.append(1)
+            return None
+
+        self.assertIsNone(fn())
+        self.assertIsNone(fn())
+        self.assertEqual(len(calls), 1, "doesn’t recompute cached None values")
+
+        with patch("groundwork.core.cache.time.time", return_value=time.time() + 20):
+            fn()
+            self.assertEqual(len(calls), 2, "expires after the negative TTL")
+
+    def test_caches_exceptions(self):
+        calls = []
+
+        @django_cached("test_caches_exceptions", exception_ttl=10)
+        def fn():
+            calls.append(1)
+            raise ValueError("upstream down")
+
+        for _ in range(3):
+            with self.assertRaises(ValueError):
+                fn()
+
+        self.assertEqual(len(calls), 1)
+
+    def test_doesnt_cache_exceptions_by_default(self):
+        calls = []
+
+        @django_cached("test_doesnt_cache_exceptions")
+        def fn():
+            calls.append(1)
+            raise ValueError("upstream down")
+
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                fn()
+
+        self.assertEqual(len(calls), 2)
+
+
+@override_settings(GROUNDWORK_CACHE_CHUNK_SIZE=64)
+class ChunkedStorageTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_stores_large_values_in_chunks(self):
+        calls = []
+        value = [os.urandom(16).hex() for _ in range(50)]
+
+        @django_cached("test_chunked", chunk_threshold=100)
+        def fn():
+            calls.append(1)
+            return value
+
+        self.assertEqual(fn(), value)
+        self.assertEqual(fn(), value)
+        self.assertEqual(len(calls), 1)
+
+        manifest = cache.get("test_chunked").value
+        self.assertGreater(manifest.count, 1, "splits the value into chunks")
+
+        cache.delete(manifest.get_chunk_keys("test_chunked")[-1])
+        self.assertEqual(fn(), value)
+        self.assertEqual(len(calls), 2, "recomputes values with missing chunks")
+
+    def test_deletes_chunks_of_replaced_values(self):
+        @django_cached("test_chunked_replaced", ttl=None, chunk_threshold=100)
+        def fn():
+            return os.urandom(1000)
+
+        fn()
+        old_keys = cache.get("test_chunked_replaced").value.get_chunk_keys(
+            "test_chunked_replaced"
+        )
+
+        fn.cache.recompute("test_chunked_replaced", (), {})
+        self.assertEqual(cache.get_many(old_keys), {})
+
+        new_keys = cache.get("test_chunked_replaced").value.get_chunk_keys(
+            "test_chunked_replaced"
+        )
+        fn.cache.invalidate()
+        self.assertEqual(cache.get_many(new_keys), {})
+
+    def test_concurrent_stores_leave_no_chunks_behind(self):
+        @django_cached("test_chunked_concurrent", ttl=None, chunk_threshold=100)
+        def fn():
+            return os.urandom(1000)
+
+        fn()
+        written = []
+        first_read = threading.Event()
+        release = threading.Event()
+        split = fn.cache.split
+        get_stored_chunk_keys = fn.cache.get_stored_chunk_keys
+
+        def record_split(key, entry):
+            stored, chunks, size = split(key, entry)
+            written.extend(chunks)
+            return stored, chunks, size
+
+        def pause_first_writer(key):
+            chunk_keys = get_stored_chunk_keys(key)
+            if not first_read.is_set():
+                # Hold the first writer between reading the manifest it replaces and writing its own
+                first_read.set()
+                release.wait(5)
+            return chunk_keys
+
+        def store():
+            fn.cache.recompute("test_chunked_concurrent", (), {})
+
+        with patch.object(fn.cache, "split", record_split), patch.object(
+            fn.cache, "get_stored_chunk_keys", pause_first_writer
+        ):
+            first = threading.Thread(target=store)
+            second = threading.Thread(target=store)
+
+            first.start()
+            first_read.wait(5)
+            second.start()
+            second.join(0.2)
+            release.set()
+            first.join(5)
+            second.join(5)
+
+        current = cache.get("test_chunked_concurrent").value.get_chunk_keys(
+            "test_chunked_concurrent"
+        )
+        self.assertEqual(set(cache.get_many(written)), set(current))
+        self.assertIsNotNone(
+            fn.cache.load(
+                "test_chunked_concurrent", cache.get("test_chunked_concurrent")
+            )
+        )
+
+    def test_stores_small_values_directly(self):
+        @django_cached("test_chunked_small", chunk_threshold=1000)
+        def fn():
+            return "small"
+
+        fn()
+        self.assertEqual(cache.get("test_chunked_small").value, "small")
+
+    def test_doesnt_truncate_querysets(self):
+        SomeArchivedModel.objects.bulk_create(
+            SomeArchivedModel(
+                id=uuid.uuid4(),
+                external_id=str(i),
+                required_value="x",
+                last_sync_time=timezone.now(),
+            )
+            for i in range(10050)
+        )
+
+        @django_cached("test_chunked_queryset", chunk_threshold=100 * 1024)
+        def fn():
+            return SomeArchivedModel.objects.all()
+
+        self.assertEqual(len(fn()), 10050)
+        self.assertEqual(len(fn()), 10050)
+
+
+class BatchTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_only_looks_up_misses(self):
+        batches = []
+
+        @django_cached_batch("test_batch")
+        def double(items):
+            batches.append(items)
+            return {x: x * 2 for x in items if x != 3}
+
+        self.assertEqual(double([1, 2, 3]), {1: 2, 2: 4, 3: None})
+        self.assertEqual(double([1, 2, 3, 4]), {1: 2, 2: 4, 3: None, 4: 8})
+        self.assertEqual(batches, [[1, 2, 3], [4]], "caches missing values")
+        self.assertIsNotNone(cache.get("test_batch.4"), "uses expected cache key")
+
+    def test_splits_batches(self):
+        batches = []
+
+        @django_cached_batch("test_batch_size", batch_size=2)
+        def identity(items):
+            batches.append(items)
+            return {x: x for x in items}
+
+        identity(range(5))
+        self.assertEqual(batches, [[0, 1], [2, 3], [4]])
+
+
+class ModelVersionTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sync_config = SomeRelatedModel.sync_config
+
+    def tearDown(self):
+        SomeRelatedModel.sync_config = self.sync_config
+
+    def sync(self, name):
+        SomeRelatedModel.sync_config = SyncConfig(
+            datasource=MockDatasource([SimpleNamespace(id="1", name=name)]),
+            sync_interval=None,
+        )
+        SyncManager().sync_model(SomeRelatedModel)
+
+        return SomeRelatedModel.objects.get(external_id="1")
+
+    def test_invalidates_model_properties_on_sync(self):
+        calls = []
+
+        def get_name(self):
+            calls.append(1)
+            return self.name
+
+        with patch.object(
+            SomeRelatedModel,
+            "cached_name",
+            django_cached_model_property("test_model_version", ttl=None)(get_name),
+            create=True,
+        ):
+            self.assertEqual(self.sync("first").cached_name(), "first")
+            self.assertEqual(self.sync("first").cached_name(), "first")
+            self.assertEqual(len(calls), 1, "keeps cached values if nothing changed")
+
+            self.assertEqual(self.sync("second").cached_name(), "second")
+            self.assertEqual(len(calls), 2)
+
+    def test_keeps_model_version_in_memory(self):
+        @django_cached_model_property("test_model_version_memory", ttl=None)
+        def get_name(self):
+            return self.name
+
+        instance = SomeRelatedModel(id=1, name="first")
+        get_name(instance)
+
+        with patch.object(cache, "get", wraps=cache.get) as cache_get:
+            get_name(instance)
+            get_name(instance)
+
+        self.assertTrue(
+            all(
+                call.args[0].startswith("test_model_version_memory.")
+                for call in cache_get.call_args_list
+            ),
+            "doesn't read the version from the cache on every call",
+        )
+
+        with patch(
+            "groundwork.core.cache.get_model_cache_version",
+            side_effect=AssertionError("blocks the event loop"),
+        ):
+
+            async def get_name_async(self):
+                return self.name
+
+            cached = django_cached_model_property("test_model_version_async", ttl=None)(
+                get_name_async
+            )
+            self.assertEqual(asyncio.run(cached(instance)), "first")
+
+
+@override_settings(GROUNDWORK_CACHE_STATS=True)
+class CacheStatsTestCase(TestCase):
+    def setUp(self):
+        flush_cache_stats()
+        cache.clear()
+
+    @override_settings(GROUNDWORK_CACHE_STATS_SIZES=True)
+    def test_records_hits_and_misses(self):
+        @django_cached("test_stats")
+        def fn():
+            return "x" * 1000
+
+        with metrics.capturing() as captured:
+            for _ in range(3):
+                fn()
+
+            self.assertEqual(captured, [], "buffers measurements until flushed")
+            flush_cache_stats()
+
+        self.assertIn("cache.recompute", [metric.name for metric in captured])
+
+        (report,) = get_cache_reports()
+        self.assertEqual(report.prefix, "test_stats")
+        self.assertEqual((report.hits, report.misses, report.recomputes), (2, 1, 1))
+        self.assertEqual(report.lookups, 3)
+        self.assertGreater(report.value_bytes, 1000)
+
+    def test_off_by_default(self):
+        @django_cached("test_stats_off")
+        def fn():
+            return 1
+
+        with self.settings():
+            del settings.GROUNDWORK_CACHE_STATS
+            fn()
+            fn()
+            flush_cache_stats()
+
+        self.assertEqual(get_cache_reports(), [])
+
+    def test_prints_report(self):
+        @django_cached("test_stats_report")
+        def fn():
+            return 1
+
+        fn()
+        fn()
+
+        stdout = StringIO()
+        call_command("cache_report", stdout=stdout)
+        self.assertIn("test_stats_report", stdout.getvalue())
+        self.assertIn("Hits:          1 of 2 (50%)", stdout.getvalue())
+
+    def test_only_measures_sizes_of_chunked_values(self):
+        @django_cached("test_stats_unsized")
+        def unsized():
+            return "x" * 1000
+
+        @django_cached("test_stats_chunked", chunk_threshold=100)
+        def chunked():
+            return "x" * 1000
+
+        unsized()
+        chunked()
+        flush_cache_stats()
+
+        reports = {report.prefix: report for report in get_cache_reports()}
+        self.assertIsNone(reports["test_stats_unsized"].mean_value_bytes)
+        self.assertGreater(reports["test_stats_chunked"].mean_value_bytes, 1000)
+
+    def test_flushes_outside_event_loop(self):
+        flush_threads = []
+        flush = cache_stats.flush_cache_stats
+
+        def record_flush():
+            flush_threads.append(threading.current_thread())
+            flush()
+
+        @django_cached("test_stats_async")
+        async def fn():
+            return 1
+
+        async def main():
+            for _ in range(3):
+                await fn()
+
+        with patch.object(cache_stats, "FLUSH_INTERVAL", 0), patch.object(
+            cache_stats, "flush_cache_stats", record_flush
+        ):
+            asyncio.run(main())
+
+        self.assertTrue(flush_threads)
+        self.assertNotIn(threading.main_thread(), flush_threads)
+
+        (report,) = get_cache_reports()
+        self.assertEqual((report.hits, report.misses, report.recomputes), (2, 1, 1))
+
+
+class AsyncTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_caches_coroutine_functions(self):
+        calls = []
+
+        @django_cached("test_async", get_key=lambda x: x)
+        async def double(x):
+            calls.append(x)
+            await asyncio.sleep(0.05)
+            return x * 2
+
+        async def main():
+            results = await asyncio.gather(*(double(1) for _ in range(5)))
+            return results, await double(1)
+
+        self.assertTrue(inspect.iscoroutinefunction(double))
+
+        results, again = asyncio.run(main())
+        self.assertEqual(results, [2] * 5)
+        self.assertEqual(again, 2)
+        self.assertEqual(calls, [1], "concurrent callers share one call")
+        self.assertIsNotNone(cache.get("test_async.1"), "uses expected cache key")
+
+    def test_caches_coroutine_exceptions(self):
+        calls = []
+
+        @django_cached("test_async_exceptions", exception_ttl=10)
+        async def fail():
+            calls.append(1)
+            raise ValueError("upstream down")
+
+        async def main():
+            for _ in range(2):
+                with self.assertRaises(ValueError):
+                    await fail()
+
+        asyncio.run(main())
+        self.assertEqual(len(calls), 1)
@@ -0,0 +1,564 @@
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from datetime import datetime
+from datetime import time as daytime
+from datetime import timedelta
+from datetime import timezone as dt_timezone
+from io import StringIO
+from test.core.test_synced_model import SomeSyncedModel
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from groundwork.core import cron
+from groundwork.core.cron import (
+    CacheLock,
+    CronWakeup,
+    IsolatedExecutor,
+    PoolExecutor,
+    get_cron_tasks,
+    notify_cron,
+    register_cron,
+    run_cron_task,
+    run_pending_cron_tasks,
+)
+from groundwork.core.internal.cron_report import get_cron_reports
+from groundwork.core.metrics import Metric, MetricsExporter, export_metrics
+from groundwork.core.models import CronTaskRun, CronTaskState
+
+
+class CronRegistryMixin:
+    """
+    Restores the registry of cron tasks after each test, so that tasks registered by one test are never run by
+    another.
+    """
+
+    def setUp(self):
+        super().setUp()
+        tasks = dict(cron._tasks)
+
+        def restore():
+            cron._tasks.clear()
+            cron._tasks.update(tasks)
+
+        self.addCleanup(restore)
+
+
+class CronRegistryTestCase(CronRegistryMixin, TestCase):
+    pass
+
+
+def schedule(task, next_run):
+    CronTaskState.objects.update_or_create(
+        name=task.name, defaults={"next_run": next_run}
+    )
+
+
+class CronTestCase(CronRegistryTestCase):
+    def test_registers_synced_models_with_stable_names(self):
+        names = {task.name for task in get_cron_tasks()}
+        self.assertIn("test.core.test_synced_model.SomeSyncedModel.sync", names)
+
+    def test_runs_due_tasks(self):
+        calls = []
+        task = register_cron(
+            lambda: calls.append(1), timedelta(minutes=5), name="test_runs_due_tasks"
+        )
+
+        run_pending_cron_tasks()
+        self.assertEqual(calls, [], "doesn’t run tasks before they are due")
+
+        schedule(task, timezone.now())
+        run_pending_cron_tasks()
+        self.assertEqual(calls, [1])
+
+        state = CronTaskState.objects.get(name=task.name)
+        self.assertGreater(state.next_run, timezone.now())
+        self.assertIsNotNone(state.last_run)
+
+    def test_logs_failing_tasks(self):
+        def fail():
+            raise ValueError("failed")
+
+        task = register_cron(fail, timedelta(minutes=5), name="test_logs_failing_tasks")
+        schedule(task, timezone.now())
+
+        with self.assertLogs(level="ERROR"):
+            run_pending_cron_tasks()
+
+    def test_schedule_survives_restart(self):
+        calls = []
+        register_cron(
+            lambda: calls.append(1), timedelta(days=1), name="test_schedule_survives"
+        )
+        run_pending_cron_tasks()
+        next_run = CronTaskState.objects.get(name="test_schedule_survives").next_run
+
+        # Registering the task again, as a new process would, doesn't reset its schedule
+        register_cron(
+            lambda: calls.append(1), timedelta(days=1), name="test_schedule_survives"
+        )
+        run_pending_cron_tasks()
+
+        self.assertEqual(
+            CronTaskState.objects.get(name="test_schedule_survives").next_run, next_run
+        )
+
+    def test_reschedules_when_schedule_changes(self):
+        register_cron(lambda: None, timedelta(days=1), name="test_schedule_changes")
+        run_pending_cron_tasks()
+
+        # A new release runs the task more often
+        register_cron(lambda: None, timedelta(minutes=5), name="test_schedule_changes")
+        run_pending_cron_tasks()
+
+        state = CronTaskState.objects.get(name="test_schedule_changes")
+        self.assertLessEqual(state.next_run, timezone.now() + timedelta(minutes=5))
+        self.assertEqual(
+            state.schedule,
+            cron._tasks["test_schedule_changes"].get_schedule_signature(),
+        )
+
+    def test_runs_once_across_processes(self):
+        calls = []
+        task = register_cron(
+            lambda: calls.append(1),
+            timedelta(minutes=5),
+            name="test_runs_once_across_processes",
+        )
+        run_pending_cron_tasks()
+        schedule(task, timezone.now())
+        run_pending_cron_tasks()
+
+        # Another process still thinks the task is due, but the schedule has moved on since it last looked
+        task.next_run = timezone.now() - timedelta(minutes=1)
+        run_pending_cron_tasks()
+
+        self.assertEqual(calls, [1])
+
+    def test_catch_up_policies(self):
+        scheduled = timezone.now() - timedelta(hours=2, minutes=30)
+
+        for policy, expected_calls in (("once", 1), ("skip", 0), ("all", 3)):
+            with self.subTest(policy):
+                calls = []
+                task = register_cron(
+                    lambda: calls.append(1),
+                    timedelta(hours=1),
+                    name=f"test_catch_up_{policy}",
+                    catch_up=policy,
+                    offset=scheduled - datetime(1970, 1, 1, tzinfo=dt_timezone.utc),
+                )
+                schedule(task, scheduled)
+
+                for _ in range(5):
+                    run_pending_cron_tasks()
+
+                self.assertEqual(len(calls), expected_calls)
+
+                next_run = CronTaskState.objects.get(name=task.name).next_run
+                self.assertGreater(next_run, timezone.now())
+                self.assertLess(next_run, timezone.now() + timedelta(hours=1))
+
+    def test_spreads_tasks_across_interval(self):
+        now = timezone.now()
+        tasks = [
+            register_cron(lambda: None, timedelta(hours=1), name=f"test_spread_{i}")
+            for i in range(20)
+        ]
+        next_runs = [task.get_scheduled_time(now) for task in tasks]
+
+        self.assertTrue(all(now < x <= now + timedelta(hours=1) for x in next_runs))
+        self.assertGreater(len({x.minute // 15 for x in next_runs}), 1)
+        self.assertEqual(
+            next_runs,
+            [task.get_scheduled_time(now) for task in tasks],
+            "the offset is stable",
+        )
+
+    def test_schedules_within_window(self):
+        task = register_cron(
+            lambda: None,
+            timedelta(hours=1),
+            name="test_schedules_within_window",
+            jitter=timedelta(minutes=10),
+            window=(daytime(2), daytime(4)),
+        )
+
+        for hour in range(24):
+            after = timezone.make_aware(datetime(2022, 1, 1, hour, 30))
+            scheduled = timezone.localtime(task.get_scheduled_time(after))
+
+            self.assertGreater(scheduled, after)
+            self.assertLess(scheduled, after + timedelta(days=1, hours=1))
+            self.assertTrue(daytime(2) <= scheduled.time() < daytime(4, 10))
+
+    def test_limits_concurrent_tasks_per_upstream(self):
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow(i):
+            calls.append(i)
+            started.set()
+            release.wait(5)
+
+        tasks = [
+            register_cron(
+                lambda i=i: slow(i),
+                timedelta(minutes=5),
+                name=f"test_limits_concurrent_tasks_{i}",
+                upstream="api.example.com",
+            )
+            for i in range(2)
+        ]
+        for task in tasks:
+            schedule(task, timezone.now())
+
+        executor = PoolExecutor(max_workers=2)
+
+        try:
+            run_pending_cron_tasks(executor=executor)
+            started.wait(5)
+            self.assertEqual(len(calls), 1)
+            self.assertEqual([task.waiting for task in tasks].count(True), 1)
+        finally:
+            release.set()
+            executor.shutdown()
+
+        run_pending_cron_tasks()
+        self.assertEqual(sorted(calls), [0, 1])
+
+    def test_pool_never_runs_task_concurrently(self):
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+
+        task = register_cron(
+            slow, timedelta(minutes=5), name="test_pool_never_runs_task_concurrently"
+        )
+        executor = PoolExecutor(max_workers=2)
+
+        try:
+            self.assertTrue(executor.submit(task))
+            started.wait(5)
+
+            with self.assertLogs(level="WARNING"):
+                self.assertFalse(executor.submit(task))
+        finally:
+            release.set()
+            executor.shutdown()
+
+        self.assertEqual(calls, [1])
+        self.assertEqual(executor.running, {})
+
+    def test_shutdown_reschedules_tasks_that_have_not_started(self):
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            started.set()
+            release.wait(5)
+
+        running = register_cron(slow, timedelta(minutes=5), name="test_shutdown_slow")
+        queued = register_cron(
+            lambda: calls.append(1), timedelta(minutes=5), name="test_shutdown_queued"
+        )
+        scheduled_time = timezone.now()
+        schedule(queued, queued.next_run)
+
+        executor = PoolExecutor(max_workers=1)
+
+        try:
+            executor.submit(running)
+            started.wait(5)
+            executor.submit(queued, scheduled_time)
+
+            with self.assertLogs(level="WARNING"):
+                executor.shutdown(wait=False)
+        finally:
+            release.set()
+
+        executor.pool.shutdown()
+        self.assertEqual(calls, [])
+
+        run = CronTaskRun.objects.get(task_name=queued.name)
+        self.assertEqual(run.outcome, CronTaskRun.Outcome.SKIPPED)
+        self.assertEqual(
+            CronTaskState.objects.get(name=queued.name).next_run,
+            scheduled_time,
+            "runs the task again as soon as possible",
+        )
+
+    def test_sigterm_stops_pass_before_remaining_tasks(self):
+        calls = []
+
+        first = register_cron(
+            lambda: os.kill(os.getpid(), signal.SIGTERM),
+            timedelta(minutes=5),
+            name="test_sigterm_first",
+        )
+        second = register_cron(
+            lambda: calls.append(1), timedelta(minutes=5), name="test_sigterm_second"
+        )
+        due = timezone.now()
+        schedule(first, due)
+        schedule(second, due)
+        handler = signal.getsignal(signal.SIGTERM)
+
+        call_command("run_cron_tasks", pending=True)
+
+        self.assertEqual(calls, [])
+        self.assertEqual(
+            CronTaskState.objects.get(name=second.name).next_run,
+            due,
+            "leaves the remaining tasks due",
+        )
+        self.assertIs(signal.getsignal(signal.SIGTERM), handler)
+
+    def test_rejects_processes_without_workers(self):
+        with self.assertRaises(CommandError):
+            call_command("run_cron_tasks", pending=True, processes=True)
+
+
+class CronLockTestCase(CronRegistryTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_cache_lock_is_exclusive(self):
+        lock = CacheLock(lease=timedelta(seconds=0.3))
+        token = lock.acquire("task")
+
+        self.assertIsNotNone(token)
+        time.sleep(0.5)
+        self.assertIsNone(lock.acquire("task"), "renews the lease while held")
+
+        lock.release("task", token)
+        self.assertIsNotNone(lock.acquire("task"))
+
+    def test_cache_lock_expires_when_holder_crashes(self):
+        lock = CacheLock(lease=timedelta(seconds=0.3))
+        token = lock.acquire("task")
+
+        # Simulate the holder crashing by stopping it from renewing the lease
+        lock.renewals.pop(token).set()
+        time.sleep(0.5)
+
+        self.assertIsNotNone(lock.acquire("task"))
+
+    def test_skips_tasks_running_in_another_process(self):
+        calls = []
+        register_cron(
+            lambda: calls.append(1),
+            timedelta(minutes=5),
+            name="test_skips_tasks_running_in_another_process",
+        )
+        lock = CacheLock()
+
+        with override_settings(GROUNDWORK_CRON_LOCK=lock):
+            token = lock.acquire("test_skips_tasks_running_in_another_process")
+            run_cron_task("test_skips_tasks_running_in_another_process")
+            self.assertEqual(calls, [])
+
+            lock.release("test_skips_tasks_running_in_another_process", token)
+            run_cron_task("test_skips_tasks_running_in_another_process")
+            self.assertEqual(calls, [1])
+
+
+def run_pending_in_child(barrier):
+    barrier.wait(10)
+    run_pending_cron_tasks()
+    connections.close_all()
+
+
+class CronAcrossProcessesTestCase(CronRegistryMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("Child processes can't share an in-memory database")
+
+    def test_runs_each_due_task_once_across_processes(self):
+        tasks = [
+            register_cron(lambda: None, timedelta(minutes=5), name=f"test_shared_{i}")
+            for i in range(3)
+        ]
+        for task in tasks:
+            schedule(task, timezone.now())
+
+        # Forked processes must not share the parent's database connections
+        connections.close_all()
+
+        context = multiprocessing.get_context("fork")
+        barrier = context.Barrier(4)
+        processes = [
+            context.Process(target=run_pending_in_child, args=(barrier,))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(30)
+
+        self.assertEqual([process.exitcode for process in processes], [0] * 4)
+
+        for task in tasks:
+            self.assertEqual(
+                CronTaskRun.objects.filter(
+                    task_name=task.name, outcome=CronTaskRun.Outcome.SUCCEEDED
+                ).count(),
+                1,
+                task.name,
+            )
+
+
+class CronWakeupTestCase(CronRegistryTestCase):
+    def test_sleeps_until_woken(self):
+        wakeup = CronWakeup()
+
+        try:
+            self.assertFalse(wakeup.wait(0.05), "times out if not woken")
+
+            threading.Timer(0.05, notify_cron).start()
+            start = time.perf_counter()
+            self.assertTrue(wakeup.wait(5))
+            self.assertLess(time.perf_counter() - start, 1)
+        finally:
+            wakeup.close()
+
+    def test_notify_runs_task_immediately(self):
+        calls = []
+        task = register_cron(
+            lambda: calls.append(1), timedelta(days=1), name="test_notify_runs_task"
+        )
+        run_pending_cron_tasks()
+        self.assertGreater(task.next_run, timezone.now())
+
+        notify_cron(task.name)
+        run_pending_cron_tasks()
+        self.assertEqual(calls, [1])
+
+
+class CronHistoryTestCase(CronRegistryTestCase):
+    def test_records_runs(self):
+        def fail():
+            raise ValueError("failed")
+
+        ok = register_cron(lambda: None, timedelta(minutes=5), name="test_records_ok")
+        failing = register_cron(fail, timedelta(minutes=5), name="test_records_fail")
+        scheduled = timezone.now() - timedelta(seconds=30)
+        schedule(ok, scheduled)
+        schedule(failing, scheduled)
+
+        with self.assertLogs(level="ERROR"):
+            run_pending_cron_tasks()
+
+        run = CronTaskRun.objects.get(task_name=ok.name)
+        self.assertEqual(run.outcome, CronTaskRun.Outcome.SUCCEEDED)
+        self.assertEqual(run.scheduled_time, scheduled)
+        self.assertGreaterEqual(run.lag, 30)
+        self.assertIsNotNone(run.duration)
+
+        run = CronTaskRun.objects.get(task_name=failing.name)
+        self.assertEqual(run.outcome, CronTaskRun.Outcome.FAILED)
+        self.assertIn("ValueError: failed", run.exception)
+
+    def test_reports_runs(self):
+        register_cron(lambda: None, timedelta(seconds=10), name="test_reports_runs")
+        now = timezone.now()
+
+        for i, (duration, outcome) in enumerate(
+            [(1, "succeeded")] * 8 + [(20, "succeeded"), (2, "failed"), (0, "skipped")]
+        ):
+            CronTaskRun.objects.create(
+                task_name="test_reports_runs",
+                start_time=now - timedelta(minutes=20 - i),
+                duration=duration,
+                lag=i,
+                outcome=outcome,
+            )
+
+        (report,) = get_cron_reports(now - timedelta(days=1))
+        self.assertEqual(report.runs, 10)
+        self.assertEqual(report.failures, 1)
+        self.assertEqual(report.skipped, 1)
+        self.assertEqual(report.overruns, 1)
+        self.assertEqual(report.p50, 1)
+        self.assertEqual(report.p95, 20)
+        self.assertEqual(report.get_timeline_text(), "........OFs")
+
+        out = StringIO()
+        call_command("cron_report", stdout=out)
+        self.assertIn("p50 1.0s, p95 20.0s, max 20.0s", out.getvalue())
+
+
+class CollectingExporter(MetricsExporter):
+    def __init__(self):
+        self.metrics = []
+
+    def export(self, metrics):
+        self.metrics.extend(metrics)
+
+
+def report_pid():
+    export_metrics([Metric("test.pid", os.getpid(), "gauge")])
+
+
+def sleep_forever():
+    time.sleep(60)
+
+
+class IsolatedExecutorTestCase(CronRegistryTestCase):
+    def run_tasks(self, executor, *tasks):
+        exporter = CollectingExporter()
+
+        with override_settings(GROUNDWORK_METRICS_EXPORTERS=[exporter]):
+            try:
+                for task in tasks:
+                    executor.submit(task)
+                    self.assertTrue(executor.wait(10))
+            finally:
+                executor.shutdown()
+
+        return exporter.metrics
+
+    def test_runs_tasks_in_recycled_child_processes(self):
+        task = register_cron(report_pid, timedelta(minutes=5), name="test_isolated")
+        executor = IsolatedExecutor(max_tasks_per_worker=2)
+
+        with self.assertLogs(level="INFO") as logs:
+            exported = self.run_tasks(executor, task, task, task)
+
+        pids = [metric.value for metric in exported if metric.name == "test.pid"]
+        self.assertEqual(len(pids), 3, "metrics are passed back to the parent")
+        self.assertNotIn(os.getpid(), pids)
+        self.assertEqual(pids[0], pids[1])
+        self.assertNotEqual(pids[1], pids[2])
+        self.assertTrue(any("Recycling cron worker" in x for x in logs.output))
+
+    def test_kills_tasks_over_time_limit(self):
+        task = register_cron(
+            sleep_forever, timedelta(minutes=5), name="test_isolated_time_limit"
+        )
+        executor = IsolatedExecutor(time_limit=timedelta(seconds=0.5))
+        start = time.perf_counter()
+
+        with self.assertLogs(level="ERROR"):
+            self.run_tasks(executor, task)
+
+        self.assertLess(time.perf_counter() - start, 10)
+        self.assertEqual(executor.workers, [])
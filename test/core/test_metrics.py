@@ -0,0 +1,102 @@
+from test.core.test_synced_model import SomeRelatedModel, SomeResource, SomeSyncedModel
+
+from django.test import TestCase, override_settings
+
+from groundwork.core.metrics import (
+    Metric,
+    MetricsExporter,
+    PrometheusExporter,
+    StatsdExporter,
+)
+from groundwork.core.signals import sync_completed
+
+
+class SyncInstrumentationTestCase(TestCase):
+    def setUp(self) -> None:
+        SomeSyncedModel.sync_config = SomeSyncedModel.initial_config()
+        SomeRelatedModel.sync_config = SomeRelatedModel.initial_config()
+
+    def test_summarises_sync(self):
+        SomeSyncedModel.sync_config.datasource.data = [
+            SomeResource(id="1", required_relationship="1"),
+            SomeResource(id="2", required_relationship="1"),
+        ]
+
+        summary = SomeSyncedModel.sync()
+
+        self.assertEqual(summary.model, "test.SomeSyncedModel")
+        self.assertEqual(summary.counters["rows_synced"], 2)
+        self.assertEqual(summary.counters["rows_created"], 3, "includes related rows")
+        self.assertEqual(summary.counters["fk_lookups"], 2)
+        self.assertEqual(summary.counters["fk_cache_hits"], 1)
+        self.assertEqual(summary.counters["fk_remote_resolutions"], 1)
+        self.assertGreater(summary.timings["write"], 0)
+
+        SomeSyncedModel.sync_config.datasource.data[0].required_value = "changed"
+        summary = SomeSyncedModel.sync()
+
+        self.assertEqual(summary.counters["rows_created"], 0)
+        self.assertEqual(summary.counters["rows_updated"], 1)
+        self.assertEqual(summary.counters["rows_unchanged"], 1)
+
+    def test_reports_sync(self):
+        exporter = RecordingExporter()
+        summaries = []
+
+        def receiver(sender, summary, **kwargs):
+            summaries.append((sender, summary))
+
+        sync_completed.connect(receiver)
+        try:
+            with override_settings(GROUNDWORK_METRICS_EXPORTERS=[exporter]):
+                summary = SomeSyncedModel.sync()
+        finally:
+            sync_completed.disconnect(receiver)
+
+        self.assertEqual(summaries, [(SomeSyncedModel, summary)])
+        self.assertIn(
+            Metric("sync.rows_synced", 1, "counter", {"model": "test.SomeSyncedModel"}),
+            exporter.metrics,
+        )
+
+
+class ExporterTestCase(TestCase):
+    def test_formats_statsd(self):
+        exporter = StatsdExporter()
+
+        self.assertEqual(
+            exporter.format(Metric("sync.duration", 1.5, "timer", {"model": "a.B"})),
+            "groundwork.sync.duration.a_b:1500|ms",
+        )
+
+    def test_renders_prometheus(self):
+        exporter = PrometheusExporter()
+        exporter.export([Metric("sync.rows_created", 2, "counter", {"model": "a.B"})])
+        exporter.export([Metric("sync.rows_created", 3, "counter", {"model": "a.B"})])
+        exporter.export([Metric("sync.duration", 1.5, "timer")])
+
+        self.assertEqual(
+            exporter.render(),
+            "# TYPE groundwork_sync_duration_seconds summary\n"
+            "groundwork_sync_duration_seconds_count{} 1\n"
+            "groundwork_sync_duration_seconds_sum{} 1.5\n"
+            "# TYPE groundwork_sync_rows_created_total counter\n"
+            'groundwork_sync_rows_created_total{model="a.B"} 5\n',
+        )
+
+    def test_escapes_prometheus_label_values(self):
+        exporter = PrometheusExporter()
+        exporter.export([Metric("cache.hits", 1, "counter", {"prefix": 'a\\b"c\nd'})])
+
+        self.assertIn(
+            'groundwork_cache_hits_total{prefix="a\\\\b\\"c\\nd"} 1',
+            exporter.render(),
+        )
+
+
+class RecordingExporter(MetricsExporter):
+    def __init__(self):
+        self.metrics = []
+
+    def export(self, metrics):
+        self.metrics.extend(metrics)
@@ -1,11 +1,16 @@
 from typing import Any, List, Optional
 
 from dataclasses import dataclass, field
+from unittest.mock import patch
 
-from django.db import models
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, models
 from django.test import TestCase
+from django.utils import timezone
 
 from groundwork.core.datasources import MockDatasource, SyncConfig, SyncedModel
+from groundwork.core.internal.sync_manager import SyncManager
+from groundwork.core.stale import ArchiveStale, DeleteStale, FlagStale
 
 
 class SyncedModelTestCase(TestCase):
@@ -206,6 +211,114 @@ class SyncedModelTestCase(TestCase):
             SomeRelatedModel, external_id="3", m2m_of__external_id="1"
         )
 
+    def test_handles_partitioned_sync(self):
+        SomeSyncedModel.sync_config.datasource.data = [
+            SomeResource(id=str(i)) for i in range(10)
+        ]
+
+        with patch.object(SyncManager, "complete_sync") as complete_sync:
+            SomeSyncedModel.sync_partitioned(3, processes=0)
+
+        complete_sync.assert_called_once_with(SomeSyncedModel)
+        self.assertModelCount(SomeSyncedModel, 10)
+
+    def test_requires_unique_external_ids_for_parallel_partitions(self):
+        with self.assertRaises(ImproperlyConfigured):
+            SomeSyncedModel.sync_partitioned(2, processes=2)
+
+    def test_merges_rows_created_concurrently(self):
+        existing = SomeRelatedModel.objects.create(
+            external_id="1", name="old", last_sync_time=timezone.now()
+        )
+        manager = SyncManager()
+        save_instance = manager.save_instance
+
+        def save_with_unique_external_id(instance, attrs):
+            if instance._state.adding:
+                raise IntegrityError("duplicate external_id")
+
+            save_instance(instance, attrs)
+
+        with patch.object(manager, "save_instance", save_with_unique_external_id):
+            instance = manager.save_or_merge_instance(
+                SomeRelatedModel(),
+                {"external_id": "1", "name": "new"},
+                {"external_id": "1"},
+            )
+
+        self.assertEqual(instance.pk, existing.pk)
+        self.assertModelExists(SomeRelatedModel, external_id="1", name="new")
+        self.assertModelCount(SomeRelatedModel, 1)
+
+    def test_handles_configured_partitions(self):
+        SomeSyncedModel.sync_config.partitions = [{"ids": ["1"]}, {"ids": ["2", "3"]}]
+        SomeSyncedModel.sync_config.datasource = FilteredMockDatasource(
+            [SomeResource(id=str(i)) for i in range(10)]
+        )
+        progress = []
+
+        SomeSyncedModel.sync_partitioned(5, processes=0, on_progress=progress.append)
+
+        self.assertModelCount(SomeSyncedModel, 3)
+        self.assertEqual(
+            [(p.index, p.count, p.synced) for p in progress if p.done],
+            [(0, 2, 1), (1, 2, 2)],
+        )
+
+    def test_deletes_stale_rows(self):
+        SomeSyncedModel.sync_config.stale_policy = DeleteStale(batch_size=1)
+        self.sync_then_remove_upstream()
+
+        self.assertModelCount(SomeSyncedModel, 1)
+        self.assertModelExists(SomeSyncedModel, external_id="1")
+
+    def test_flags_stale_rows(self):
+        SomeSyncedModel.sync_config.stale_policy = FlagStale(batch_size=1)
+        self.sync_then_remove_upstream()
+
+        self.assertModelCount(SomeSyncedModel, 3)
+        self.assertModelExists(SomeSyncedModel, external_id="1", is_stale=False)
+        self.assertModelCount(SomeSyncedModel, 2, is_stale=True)
+
+        SomeSyncedModel.sync_config.datasource.data.append(SomeResource(id="2"))
+        SomeSyncedModel.sync()
+
+        self.assertModelExists(SomeSyncedModel, external_id="2", is_stale=False)
+
+    def test_archives_stale_rows(self):
+        SomeSyncedModel.sync_config.stale_policy = ArchiveStale(SomeArchivedModel)
+        self.sync_then_remove_upstream()
+
+        self.assertModelCount(SomeSyncedModel, 1)
+        self.assertEqual(
+            set(SomeArchivedModel.objects.values_list("external_id", flat=True)),
+            {"2", "3"},
+        )
+
+    def test_does_not_sweep_after_partial_or_empty_syncs(self):
+        SomeSyncedModel.sync_config.stale_policy = DeleteStale()
+        SomeSyncedModel.sync_config.datasource.data = [
+            SomeResource(id=str(i)) for i in range(1, 4)
+        ]
+        SomeSyncedModel.sync()
+
+        SomeSyncedModel.sync_ids(["1"])
+        self.assertModelCount(SomeSyncedModel, 3)
+
+        SomeSyncedModel.sync_config.datasource.data = []
+        SomeSyncedModel.sync()
+        self.assertModelCount(SomeSyncedModel, 3)
+
+    def sync_then_remove_upstream(self):
+        SomeSyncedModel.sync_config.datasource.data = [
+            SomeResource(id=str(i)) for i in range(1, 4)
+        ]
+        SomeSyncedModel.sync()
+        self.assertModelCount(SomeSyncedModel, 3)
+
+        SomeSyncedModel.sync_config.datasource.data = [SomeResource(id="1")]
+        SomeSyncedModel.sync()
+
     def test_syncs_multiple_times_without_error(self):
         SomeSyncedModel.sync()
         SomeSyncedModel.sync()
@@ -217,6 +330,11 @@ class SyncedModelTestCase(TestCase):
         self.assertModelCount(model, 1, **kwargs)
 
 
+class FilteredMockDatasource(MockDatasource):
+    def list(self, ids=None, **kwargs):
+        return [x for x in self.data if ids is None or x.id in ids]
+
+
 @dataclass
 class SomeResource:
     id: str
@@ -267,6 +385,14 @@ class SomeSyncedModel(SyncedModel):
     embedded = models.ForeignKey(
         "SomeRelatedModel", null=True, on_delete=models.SET_NULL
     )
+    is_stale = models.BooleanField(default=False)
+
+
+class SomeArchivedModel(models.Model):
+    id = models.UUIDField(primary_key=True)
+    external_id = models.CharField(max_length=128)
+    required_value = models.CharField(max_length=128)
+    last_sync_time = models.DateTimeField()
 
 
 class SomeRelatedModel(SyncedModel):
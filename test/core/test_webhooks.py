@@ -0,0 +1,125 @@
+import json
+from datetime import timedelta
+from test.core.test_synced_model import SomeRelatedModel, SomeResource
+
+from django.test import TestCase, override_settings
+from django.urls import path
+from django.utils import timezone
+
+from groundwork.core.datasources import MockDatasource, SyncConfig
+from groundwork.core.stale import DeleteStale
+from groundwork.core.webhooks import (
+    SyncWebhookView,
+    TargetedSyncQueue,
+    sign_webhook_payload,
+)
+
+SECRET = "test-secret"
+
+
+class FailingDatasource(MockDatasource):
+    def get(self, id):
+        if id == "2":
+            raise OSError("http 500")
+
+        return super().get(id)
+
+
+queue = TargetedSyncQueue(debounce=timedelta(seconds=60), autoflush=False)
+
+urlpatterns = [
+    path(
+        "webhook/",
+        SyncWebhookView.as_view(secret=SECRET, queue=queue, models=[SomeRelatedModel]),
+    ),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class SyncWebhookViewTestCase(TestCase):
+    def setUp(self):
+        queue.pending = {}
+        SomeRelatedModel.sync_config = SyncConfig(
+            datasource=MockDatasource(
+                [SomeResource(id="1"), SomeResource(id="2"), SomeResource(id="3")]
+            ),
+            sync_interval=None,
+        )
+
+    def test_syncs_notified_resources(self):
+        res = self.notify({"model": "test.SomeRelatedModel", "ids": ["1", "2"]})
+        self.assertEqual(res.status_code, 202)
+        self.assertEqual(res.json(), {"scheduled": 2})
+        self.assertEqual(SomeRelatedModel.objects.count(), 0, "waits for flush")
+
+        queue.flush()
+
+        self.assertEqual(
+            set(SomeRelatedModel.objects.values_list("external_id", flat=True)),
+            {"1", "2"},
+        )
+
+    def test_collapses_duplicate_notifications(self):
+        self.notify({"model": "test.SomeRelatedModel", "ids": ["1", "2"]})
+        res = self.notify([{"model": "test.SomeRelatedModel", "ids": ["2", "3"]}])
+
+        self.assertEqual(res.json(), {"scheduled": 1})
+        self.assertEqual(queue.pending[SomeRelatedModel], {"1", "2", "3"})
+
+    def test_rejects_invalid_signature(self):
+        res = self.notify(
+            {"model": "test.SomeRelatedModel", "ids": ["1"]}, signature="nope"
+        )
+        self.assertEqual(res.status_code, 403)
+        self.assertEqual(queue.pending, {})
+
+    def test_rejects_models_not_allowed(self):
+        res = self.notify({"model": "test.SomeSyncedModel", "ids": ["1"]})
+        self.assertEqual(res.status_code, 400)
+
+        res = self.notify({"model": "test.DoesNotExist", "ids": ["1"]})
+        self.assertEqual(res.status_code, 400)
+
+    def test_rejects_invalid_model_labels(self):
+        for payload in (
+            {"ids": ["1"]},
+            {"model": None, "ids": ["1"]},
+            {"model": 5, "ids": ["1"]},
+        ):
+            with self.subTest(payload=payload):
+                self.assertEqual(self.notify(payload).status_code, 400)
+
+    def test_rejects_invalid_ids(self):
+        res = self.notify({"model": "test.SomeRelatedModel", "ids": [{"id": "1"}]})
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(queue.pending, {})
+
+    def test_skips_failed_and_missing_resources(self):
+        SomeRelatedModel.sync_config = SyncConfig(
+            datasource=FailingDatasource(
+                [SomeResource(id="1"), SomeResource(id="2"), SomeResource(id="3")]
+            ),
+            stale_policy=DeleteStale(),
+            sync_interval=None,
+        )
+        SomeRelatedModel.objects.create(external_id="4", last_sync_time=timezone.now())
+
+        queue.add(SomeRelatedModel, ["1", "2", "3", "4"])
+        with self.assertLogs(level="ERROR"):
+            queue.flush()
+
+        self.assertEqual(
+            set(SomeRelatedModel.objects.values_list("external_id", flat=True)),
+            {"1", "3"},
+            "syncs the rest of the batch, and deletes resources deleted upstream",
+        )
+
+    def notify(self, payload, signature=None):
+        body = json.dumps(payload).encode()
+
+        return self.client.post(
+            "/webhook/",
+            body,
+            content_type="application/json",
+            HTTP_X_GROUNDWORK_SIGNATURE=signature or sign_webhook_payload(body, SECRET),
+        )
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-19 08:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("test", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SomeArchivedModel",
+            fields=[
+                ("id", models.UUIDField(primary_key=True, serialize=False)),
+                ("external_id", models.CharField(max_length=128)),
+                ("required_value", models.CharField(max_length=128)),
+                ("last_sync_time", models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name="somesyncedmodel",
+            name="is_stale",
+            field=models.BooleanField(default=False),
+        ),
+    ]